@@ -0,0 +1,86 @@
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from workflow.alerts import AttentionBatch, needs_attention, needs_attention_batch, np  # noqa: E402
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def synthetic_payloads(rows: int, seed: int) -> list[dict]:
+    """History-like payloads, including the odd values the scalar path tolerates."""
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    odd_dates = [None, "", "  2024-02-29 ", "2023-02-29", "2024-1-5", "31/12/2024", "2024-W01-1"]
+    odd_totals = [None, "", "$16,000.00", "n/a", 15000, 15000.01, True]
+    payloads = []
+    for idx in range(rows):
+        order = start + timedelta(days=rng.randrange(2000))
+        due = order + timedelta(days=rng.randrange(-3, 30))
+        order_value = order.isoformat() if rng.random() > 0.02 else rng.choice(odd_dates)
+        due_value = due.isoformat() if rng.random() > 0.02 else rng.choice(odd_dates)
+        total = round(rng.uniform(100, 30000), 2) if rng.random() > 0.02 else rng.choice(odd_totals)
+        subject = rng.choice(["Purchase Order", "URGENT: Purchase Order", "Re: urgent reorder", None, ""])
+        payloads.append(
+            {
+                "email": {"subject": subject},
+                "purchase_order": {
+                    "po_number": f"PO-{idx}" if rng.random() > 0.01 else rng.choice([None, ""]),
+                    "vendor": "Example Supply Co." if rng.random() > 0.01 else None,
+                    "order_date": order_value,
+                    "due_date": due_value,
+                    "totals": {"total": total},
+                },
+            }
+        )
+    return payloads
+
+
+def suite_payloads() -> list[dict]:
+    return [
+        json.loads(path.read_text(encoding="utf-8"))
+        for path in sorted(ROOT.glob("tests/*/parsed/*.json"))
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare scalar and batch attention-rule evaluation.")
+    parser.add_argument("--rows", type=int, default=200_000, help="Synthetic payloads to score (default: 200000).")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repeats; the best is reported (default: 3).")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    payloads = suite_payloads() + synthetic_payloads(args.rows, args.seed)
+    batch = AttentionBatch.from_payloads(payloads)
+    expected = [needs_attention(payload) for payload in payloads]
+    if needs_attention_batch(batch) != expected:
+        raise SystemExit("needs_attention_batch disagrees with needs_attention.")
+
+    runs = {
+        "scalar": lambda: [needs_attention(payload) for payload in payloads],
+        "batch": lambda: needs_attention_batch(batch),
+        "batch+columns": lambda: needs_attention_batch(AttentionBatch.from_payloads(payloads)),
+    }
+    best = {name: float("inf") for name in runs}
+    for _ in range(args.repeat):
+        for name, run in runs.items():
+            # Keep collector pauses from the previous run out of this one's timing.
+            gc.collect()
+            started = time.perf_counter()
+            run()
+            best[name] = min(best[name], time.perf_counter() - started)
+
+    print(f"{len(payloads)} rows, same reasons on every row (numpy: {'yes' if np is not None else 'no'})")
+    for name, seconds in best.items():
+        print(f"{name:>14}: {len(payloads) / seconds:12,.0f} rows/s  ({best['scalar'] / seconds:.2f}x vs scalar)")
+
+
+if __name__ == "__main__":
+    main()
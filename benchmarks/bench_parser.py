@@ -0,0 +1,79 @@
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from parse_txt import PARSER_ENGINES, parse_purchase_order_text  # noqa: E402
+
+
+def synthetic_purchase_order(line_items: int) -> str:
+    rows = "\n".join(
+        f"{idx}  Industrial fastener kit, size {idx % 12}  {idx % 40 + 1:,}  ${idx % 90 + 1}.25  "
+        f"${(idx % 40 + 1) * (idx % 90 + 1):,}.50"
+        for idx in range(1, line_items + 1)
+    )
+    return (
+        "From: buyer@example.com\n"
+        "To: orders@example.com\n"
+        "Subject: Purchase order\n"
+        "\n"
+        "Hello team,\n"
+        "Please process the order below.\n"
+        "\n"
+        "PURCHASE ORDER\n"
+        "PO Number: PO-BENCH-1\n"
+        "Vendor: Example Supply Co.\n"
+        "Ship To: Example Plant\n"
+        "100 Main Street\n"
+        "Springfield, IL 62701\n"
+        "Order Date: 2024-01-01\n"
+        "Due Date: 2024-02-01\n"
+        "Payment Terms: Net 30\n"
+        "\n"
+        "LINE ITEMS\n"
+        "Item Description Qty Unit Price Total\n"
+        f"{rows}\n"
+        "Subtotal: $1,000.00\n"
+        "Tax (8%): $80.00\n"
+        "Shipping: $25.00\n"
+        "TOTAL: $1,105.00\n"
+        "\n"
+        "Notes:\n"
+        "Deliver to dock 4.\n"
+        "\n"
+        "Thank you,\n"
+        "Pat Buyer\n"
+        "Purchasing Manager\n"
+        "Example Plant\n"
+        "(555) 555-0100\n"
+        "pat@example.com\n"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time the purchase-order parser engines on a synthetic PO body.")
+    parser.add_argument("--line-items", type=int, default=500, help="Line items in the synthetic PO (default: 500).")
+    parser.add_argument("--repeat", type=int, default=7, help="Timing repeats; the best is reported (default: 7).")
+    parser.add_argument("--number", type=int, default=20, help="Parses per repeat (default: 20).")
+    args = parser.parse_args()
+
+    text = synthetic_purchase_order(args.line_items)
+    results = {engine: parse_purchase_order_text(text, engine=engine) for engine in PARSER_ENGINES}
+    if any(result != results["legacy"] for result in results.values()):
+        raise SystemExit("Parser engines disagree on the synthetic PO.")
+
+    # Interleave engines so machine noise hits them alike; report the best run.
+    timings = {engine: float("inf") for engine in PARSER_ENGINES}
+    for _ in range(args.repeat):
+        for engine in PARSER_ENGINES:
+            seconds = timeit.timeit(lambda: parse_purchase_order_text(text, engine=engine), number=args.number)
+            timings[engine] = min(timings[engine], seconds / args.number)
+    for engine, seconds in timings.items():
+        speedup = timings["legacy"] / seconds
+        print(f"{engine:>12}: {seconds * 1000:8.3f} ms/parse  ({speedup:.2f}x vs legacy)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from workflow.models import PurchaseOrder  # noqa: E402
+
+
+@dataclass
+class LegacyPurchaseOrder:
+    """The previous dataclass model, kept here as the memory reference."""
+
+    name: str
+    txt_path: Path
+    attention_priority_hint: int = 2
+    order_date_hint: date | None = None
+    req: dict[str, Any] | None = None
+    state: str = "PENDING"
+    dependencies: list[str] = field(default_factory=list)
+
+
+def sample_payload() -> dict[str, Any]:
+    path = next(iter(sorted(ROOT.glob("tests/*/parsed/*.json"))))
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def measure(build) -> tuple[int, list[Any]]:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, kept
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Resident memory of a finished plan: old vs slotted task model.")
+    parser.add_argument("--tasks", type=int, default=100_000, help="Tasks in the plan (default: 100000).")
+    parser.add_argument("--suites", type=int, default=10, help="Suites the tasks are spread over (default: 10).")
+    args = parser.parse_args()
+
+    payload = sample_payload()
+    encoded = json.dumps(payload)
+    # Paths and names are built outside the measurement so both models start from the same inputs.
+    names = [f"suite_{idx % args.suites}/po_{idx}" for idx in range(args.tasks)]
+    paths = [Path(f"tests/suite_{idx % args.suites}/input/po_{idx}.txt") for idx in range(args.tasks)]
+
+    def build_legacy() -> list[Any]:
+        tasks = []
+        for name, path in zip(names, paths):
+            # Every task holds its own parsed dict, as after parsing.
+            tasks.append(LegacyPurchaseOrder(name=name, txt_path=path, req=json.loads(encoded), state="SUCCESS"))
+        return tasks
+
+    def build_slotted() -> list[Any]:
+        tasks = []
+        for name, path in zip(names, paths):
+            po = PurchaseOrder(name=name, txt_path=path, req=json.loads(encoded), state="SUCCESS")
+            po.json_path, po.alert_path  # noqa: B018 - touched by every finished task
+            po.compact()
+            tasks.append(po)
+        return tasks
+
+    legacy_bytes, legacy = measure(build_legacy)
+    del legacy
+    slotted_bytes, slotted = measure(build_slotted)
+    if slotted[0].req != payload:
+        raise SystemExit("Compacted payload does not round-trip.")
+    print(f"{args.tasks} finished tasks:")
+    print(f"  dataclass + dict payload:  {legacy_bytes / 2**20:8.1f} MiB ({legacy_bytes // args.tasks} B/task)")
+    print(f"  slotted + compact payload: {slotted_bytes / 2**20:8.1f} MiB ({slotted_bytes // args.tasks} B/task)")
+
+
+if __name__ == "__main__":
+    main()
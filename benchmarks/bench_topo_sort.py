@@ -0,0 +1,107 @@
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from workflow.dag import CycleError, topo_sort  # noqa: E402
+from workflow.models import PurchaseOrder  # noqa: E402
+
+
+def synthetic_tasks(nodes: int, max_deps: int, seed: int) -> dict[str, PurchaseOrder]:
+    """Wide layered DAG: each task depends on up to ``max_deps`` random earlier tasks."""
+    rng = random.Random(seed)
+    shared_path = Path("synthetic.txt")
+    start = date(2024, 1, 1)
+    names = [f"suite_{idx % 1000}/po_{idx}" for idx in range(nodes)]
+    tasks: dict[str, PurchaseOrder] = {}
+    for idx, name in enumerate(names):
+        deps = sorted({names[rng.randrange(idx)] for _ in range(rng.randint(0, max_deps))}) if idx else []
+        tasks[name] = PurchaseOrder(
+            name=name,
+            txt_path=shared_path,
+            attention_priority_hint=rng.randint(1, 4),
+            order_date_hint=None if rng.random() < 0.1 else start + timedelta(days=rng.randrange(365)),
+            dependencies=deps,
+        )
+    return tasks
+
+
+def legacy_topo_sort(tasks: dict[str, PurchaseOrder]) -> list[str]:
+    """The previous list-based implementation, kept here as the ordering reference."""
+    indegree = {name: 0 for name in tasks}
+    children: dict[str, list[str]] = {name: [] for name in tasks}
+    for name, task in tasks.items():
+        for dep in task.dependencies:
+            indegree[name] += 1
+            children[dep].append(name)
+
+    def task_sort_key(task_name: str) -> tuple[int, bool, date, str]:
+        task = tasks[task_name]
+        return (task.attention_priority_hint, task.order_date_hint is None, task.order_date_hint or date.max, task_name)
+
+    ready = sorted([name for name, count in indegree.items() if count == 0], key=task_sort_key)
+    ordered: list[str] = []
+    while ready:
+        node = ready.pop(0)
+        ordered.append(node)
+        for child in sorted(children[node], key=task_sort_key):
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                ready.append(child)
+                ready.sort(key=task_sort_key)
+    return ordered
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time topo_sort on synthetic purchase-order DAGs.")
+    parser.add_argument(
+        "--nodes",
+        type=int,
+        nargs="+",
+        default=[100_000, 1_000_000],
+        help="Graph sizes to time (default: 100000 1000000).",
+    )
+    parser.add_argument("--max-deps", type=int, default=3, help="Max dependencies per task (default: 3).")
+    parser.add_argument(
+        "--legacy-max-nodes",
+        type=int,
+        default=5_000,
+        help="Also run and compare the old implementation on graphs up to this size (default: 5000).",
+    )
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    for nodes in args.nodes:
+        tasks = synthetic_tasks(nodes, args.max_deps, args.seed)
+        edges = sum(len(task.dependencies) for task in tasks.values())
+        started = time.perf_counter()
+        order = topo_sort(tasks)
+        elapsed = time.perf_counter() - started
+        line = f"{nodes:>9} nodes {edges:>9} edges: topo_sort {elapsed:8.3f}s"
+        if nodes <= args.legacy_max_nodes:
+            started = time.perf_counter()
+            reference = legacy_topo_sort(tasks)
+            legacy_elapsed = time.perf_counter() - started
+            if reference != order:
+                raise SystemExit(f"Ordering differs from the previous implementation at {nodes} nodes.")
+            line += f" | previous {legacy_elapsed:8.3f}s (same order)"
+        print(line)
+
+    cyclic = synthetic_tasks(1_000, args.max_deps, args.seed)
+    names = list(cyclic)
+    cyclic[names[10]].dependencies.append(names[900])
+    cyclic[names[900]].dependencies.append(names[10])
+    try:
+        topo_sort(cyclic)
+    except CycleError as exc:
+        print(f"cycle check: {len(exc.nodes)} task(s) on {len(exc.cycles)} cycle(s)")
+    else:
+        raise SystemExit("Expected a CycleError for the cyclic graph.")
+
+
+if __name__ == "__main__":
+    main()
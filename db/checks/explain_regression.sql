@@ -0,0 +1,245 @@
+-- EXPLAIN regression check for the visibility and needs-attention queries.
+-- Loads synthetic rows (millions by default) inside one transaction, ANALYZEs,
+-- EXPLAINs each query and fails if any plan sequentially scans a large table
+-- or partition. Everything is rolled back, so it is safe to run against a dev
+-- database that has 004_indexes_partitioning.sql applied. From db/:
+--   docker compose run --rm dbcli -v ON_ERROR_STOP=1 -f /work/db/checks/explain_regression.sql
+-- Sizes can be overridden, e.g. -v task_runs=200000 -v alerts=100000.
+-- Keep the query texts below in sync with db/queries/03 and 04.
+
+\if :{?workflow_runs}
+\else
+\set workflow_runs 20000
+\endif
+\if :{?task_runs}
+\else
+\set task_runs 2000000
+\endif
+\if :{?history_per_task}
+\else
+\set history_per_task 3
+\endif
+\if :{?purchase_orders}
+\else
+\set purchase_orders 200000
+\endif
+\if :{?alerts}
+\else
+\set alerts 1000000
+\endif
+\if :{?months}
+\else
+\set months 18
+\endif
+\if :{?large_table_rows}
+\else
+\set large_table_rows 10000
+\endif
+
+\timing on
+BEGIN;
+
+-- Spread the synthetic history over :months past months.
+SELECT
+    create_monthly_partition('purchase_order_run_state_history', month_start),
+    create_monthly_partition('po_alerts', month_start)
+FROM (
+    SELECT (date_trunc('month', NOW() AT TIME ZONE 'UTC') - make_interval(months => m))::date AS month_start
+    FROM generate_series(1, :months) m
+) months;
+
+CREATE TEMP TABLE synthetic_runs (n BIGINT PRIMARY KEY, id BIGINT NOT NULL, started_at TIMESTAMPTZ NOT NULL);
+CREATE TEMP TABLE synthetic_tasks (id BIGINT NOT NULL, started_at TIMESTAMPTZ NOT NULL);
+CREATE TEMP TABLE synthetic_pos (n BIGINT PRIMARY KEY, id BIGINT NOT NULL, po_number TEXT NOT NULL);
+
+WITH inserted AS (
+    INSERT INTO workflow_runs (state, started_at, finished_at)
+    SELECT
+        CASE WHEN g % 1000 = 0 THEN 'RUNNING' WHEN g % 10 = 0 THEN 'FAILED' ELSE 'SUCCESS' END,
+        started_at,
+        CASE WHEN g % 1000 = 0 THEN NULL ELSE started_at + INTERVAL '5 minutes' END
+    FROM generate_series(1, :workflow_runs) g
+    CROSS JOIN LATERAL (
+        SELECT NOW() - (:workflow_runs - g) * (:months * 30 * 86400.0 / :workflow_runs) * INTERVAL '1 second' AS started_at
+    ) t
+    RETURNING id, started_at
+)
+INSERT INTO synthetic_runs (n, id, started_at)
+SELECT row_number() OVER (ORDER BY id), id, started_at
+FROM inserted;
+
+WITH inserted AS (
+    INSERT INTO purchase_order_runs (workflow_run_id, test_name, po_number, state, req, attempts, created_at, updated_at)
+    SELECT
+        r.id,
+        'synthetic_' || (g % 50),
+        'PO-SYNTH-' || (g % :purchase_orders + 1),
+        CASE WHEN g % 2000 = 0 THEN 'RUNNING' WHEN g % 25 = 0 THEN 'FAILED' ELSE 'SUCCESS' END,
+        '{}'::jsonb,
+        1,
+        r.started_at,
+        r.started_at + INTERVAL '1 minute'
+    FROM generate_series(1, :task_runs) g
+    JOIN synthetic_runs r ON r.n = g % :workflow_runs + 1
+    RETURNING id, created_at
+)
+INSERT INTO synthetic_tasks (id, started_at)
+SELECT id, created_at
+FROM inserted;
+
+INSERT INTO purchase_order_run_state_history (purchase_order_run_id, from_state, to_state, changed_at)
+SELECT
+    t.id,
+    (ARRAY[NULL, 'PENDING', 'RUNNING'])[LEAST(k, 3)],
+    (ARRAY['PENDING', 'RUNNING', 'SUCCESS'])[LEAST(k, 3)],
+    t.started_at + k * INTERVAL '1 second'
+FROM synthetic_tasks t
+CROSS JOIN generate_series(1, :history_per_task) k;
+
+WITH inserted AS (
+    INSERT INTO purchase_orders (po_number, vendor, raw_payload)
+    SELECT 'PO-SYNTH-' || g, 'Synthetic Vendor', '{}'::jsonb
+    FROM generate_series(1, :purchase_orders) g
+    ON CONFLICT (po_number) DO NOTHING
+    RETURNING id, po_number
+)
+INSERT INTO synthetic_pos (n, id, po_number)
+SELECT row_number() OVER (ORDER BY id), id, po_number
+FROM inserted;
+
+INSERT INTO po_alerts (purchase_order_id, po_number, reasons, created_at)
+SELECT
+    p.id,
+    p.po_number,
+    ARRAY['due_soon'],
+    NOW() - (g % (:months * 30)) * INTERVAL '1 day'
+FROM generate_series(1, :alerts) g
+JOIN synthetic_pos p ON p.n = g % (SELECT COUNT(*) FROM synthetic_pos) + 1;
+
+ANALYZE workflow_runs;
+ANALYZE purchase_order_runs;
+ANALYZE purchase_order_run_state_history;
+ANALYZE purchase_orders;
+ANALYZE po_alerts;
+
+SELECT set_config('explain_check.large_table_rows', :'large_table_rows', true);
+
+DO $$
+DECLARE
+    min_rows BIGINT := current_setting('explain_check.large_table_rows')::bigint;
+    check_name TEXT;
+    check_sql TEXT;
+    plan JSONB;
+    offenders TEXT;
+    failures TEXT[] := '{}';
+BEGIN
+    FOR check_name, check_sql IN
+        SELECT q.name, q.sql
+        FROM (VALUES
+            ('previous workflow runs', $q$
+                SELECT wr.id, wr.state, wr.started_at, wr.finished_at, wr.error_message
+                FROM workflow_runs wr
+                ORDER BY wr.id DESC
+                LIMIT 10
+            $q$),
+            ('per-workflow task state counts', $q$
+                SELECT wr.id, wr.state, wr.started_at, wr.finished_at,
+                       counts.pending_tasks, counts.running_tasks, counts.success_tasks, counts.failed_tasks
+                FROM (
+                    SELECT id, state, started_at, finished_at
+                    FROM workflow_runs
+                    ORDER BY id DESC
+                    LIMIT 10
+                ) wr
+                CROSS JOIN LATERAL (
+                    SELECT
+                        COUNT(*) FILTER (WHERE por.state = 'PENDING') AS pending_tasks,
+                        COUNT(*) FILTER (WHERE por.state = 'RUNNING') AS running_tasks,
+                        COUNT(*) FILTER (WHERE por.state = 'SUCCESS') AS success_tasks,
+                        COUNT(*) FILTER (WHERE por.state = 'FAILED') AS failed_tasks
+                    FROM purchase_order_runs por
+                    WHERE por.workflow_run_id = wr.id
+                ) counts
+                ORDER BY wr.id DESC
+            $q$),
+            ('currently running workflows', $q$
+                SELECT wr.id, wr.state, wr.started_at
+                FROM workflow_runs wr
+                WHERE wr.state = 'RUNNING'
+                ORDER BY wr.started_at DESC
+            $q$),
+            ('finished workflows', $q$
+                SELECT wr.id, wr.state, wr.started_at, wr.finished_at
+                FROM workflow_runs wr
+                WHERE wr.state IN ('SUCCESS', 'FAILED')
+                ORDER BY wr.finished_at DESC
+                LIMIT 20
+            $q$),
+            ('currently running tasks', $q$
+                SELECT por.id, por.workflow_run_id, por.test_name, por.po_number, por.state, por.updated_at,
+                       por.lease_owner, por.lease_expires_at
+                FROM purchase_order_runs por
+                WHERE por.state = 'RUNNING'
+                ORDER BY por.updated_at DESC
+            $q$),
+            ('recent tasks', $q$
+                SELECT por.id, por.workflow_run_id, por.test_name, por.po_number, por.state,
+                       por.attempts, por.error_message, por.updated_at
+                FROM purchase_order_runs por
+                ORDER BY por.id DESC
+                LIMIT 50
+            $q$),
+            ('state transition history', $q$
+                SELECT h.purchase_order_run_id, h.from_state, h.to_state, h.changed_at, h.error_message
+                FROM purchase_order_run_state_history h
+                ORDER BY h.changed_at DESC, h.id DESC
+                LIMIT 100
+            $q$),
+            ('history of one task', $q$
+                SELECT h.from_state, h.to_state, h.changed_at
+                FROM purchase_order_run_state_history h
+                WHERE h.purchase_order_run_id = (SELECT MAX(id) FROM purchase_order_runs)
+                ORDER BY h.changed_at
+            $q$),
+            ('needs attention', $q$
+                SELECT po.po_number,
+                       COALESCE(
+                           (
+                               SELECT a.reasons
+                               FROM po_alerts a
+                               WHERE a.po_number = po.po_number
+                               ORDER BY a.created_at DESC
+                               LIMIT 1
+                           ),
+                           ARRAY[]::text[]
+                       ) AS reasons
+                FROM purchase_orders po
+                WHERE po.po_number = 'PO-SYNTH-1'
+            $q$)
+        ) AS q(name, sql)
+    LOOP
+        EXECUTE 'EXPLAIN (FORMAT JSON) ' || check_sql INTO plan;
+        SELECT string_agg(DISTINCT scanned.relation || ' (~' || c.reltuples::bigint || ' rows)', ', ')
+        INTO offenders
+        FROM (
+            SELECT node #>> '{}' AS relation
+            FROM jsonb_path_query(plan, '$.** ? (@."Node Type" == "Seq Scan")."Relation Name"') AS node
+        ) scanned
+        JOIN pg_class c ON c.oid = to_regclass(quote_ident(scanned.relation))
+        WHERE c.reltuples >= min_rows;
+
+        IF offenders IS NULL THEN
+            RAISE NOTICE 'ok: %', check_name;
+        ELSE
+            RAISE NOTICE 'SEQ SCAN: % -> %', check_name, offenders;
+            failures := failures || check_name;
+        END IF;
+    END LOOP;
+
+    IF cardinality(failures) > 0 THEN
+        RAISE EXCEPTION 'EXPLAIN regression: sequential scan of a large table in: %', array_to_string(failures, ', ');
+    END IF;
+END;
+$$;
+
+ROLLBACK;
@@ -1,3 +1,11 @@
+-- Bumped whenever this file changes; the workflow runner re-applies the file
+-- only when the recorded version is older than the one it expects.
+CREATE TABLE IF NOT EXISTS schema_versions (
+    component TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
 CREATE TABLE IF NOT EXISTS purchase_orders (
     id BIGSERIAL PRIMARY KEY,
     po_number TEXT NOT NULL UNIQUE,
@@ -24,10 +32,14 @@ CREATE TABLE IF NOT EXISTS purchase_orders (
     contact_phone TEXT,
     contact_email TEXT,
     raw_payload JSONB NOT NULL,
+    payload_hash BYTEA,
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
+-- sha256 of raw_payload::text (jsonb text is normalized, so equal payloads hash equal).
+ALTER TABLE purchase_orders ADD COLUMN IF NOT EXISTS payload_hash BYTEA;
+
 CREATE TABLE IF NOT EXISTS purchase_order_line_items (
     id BIGSERIAL PRIMARY KEY,
     purchase_order_id BIGINT NOT NULL REFERENCES purchase_orders(id) ON DELETE CASCADE,
@@ -62,13 +74,30 @@ BEFORE UPDATE ON purchase_orders
 FOR EACH ROW
 EXECUTE FUNCTION set_updated_at();
 
-CREATE OR REPLACE FUNCTION upsert_purchase_order(payload JSONB)
-RETURNS BIGINT
+-- Returns the purchase order id and whether anything was written. An identical
+-- payload (same hash) is a no-op: no row update, no updated_at bump, no line
+-- item churn. Otherwise the order row is upserted and line items are merged by
+-- (purchase_order_id, item_no): removed items are deleted, new ones inserted,
+-- and existing ones updated only when a value differs.
+DROP FUNCTION IF EXISTS upsert_purchase_order(JSONB);
+
+CREATE FUNCTION upsert_purchase_order(payload JSONB, OUT po_id BIGINT, OUT changed BOOLEAN)
 LANGUAGE plpgsql
 AS $$
 DECLARE
-    po_id BIGINT;
+    new_hash BYTEA := sha256(convert_to(payload::text, 'UTF8'));
+    items JSONB := COALESCE(payload #> '{purchase_order,line_items}', '[]'::jsonb);
 BEGIN
+    SELECT id INTO po_id
+    FROM purchase_orders
+    WHERE po_number = payload #>> '{purchase_order,po_number}'
+      AND payload_hash = new_hash;
+
+    IF FOUND THEN
+        changed := FALSE;
+        RETURN;
+    END IF;
+
     INSERT INTO purchase_orders (
         po_number,
         vendor,
@@ -93,7 +122,8 @@ BEGIN
         contact_company,
         contact_phone,
         contact_email,
-        raw_payload
+        raw_payload,
+        payload_hash
     )
     VALUES (
         payload #>> '{purchase_order,po_number}',
@@ -119,7 +149,8 @@ BEGIN
         payload #>> '{purchase_order,contact,company}',
         payload #>> '{purchase_order,contact,phone}',
         payload #>> '{purchase_order,contact,email}',
-        payload
+        payload,
+        new_hash
     )
     ON CONFLICT (po_number) DO UPDATE
     SET
@@ -145,10 +176,21 @@ BEGIN
         contact_company = EXCLUDED.contact_company,
         contact_phone = EXCLUDED.contact_phone,
         contact_email = EXCLUDED.contact_email,
-        raw_payload = EXCLUDED.raw_payload
+        raw_payload = EXCLUDED.raw_payload,
+        payload_hash = EXCLUDED.payload_hash
     RETURNING id INTO po_id;
 
-    DELETE FROM purchase_order_line_items WHERE purchase_order_id = po_id;
+    changed := TRUE;
+
+    -- NOT EXISTS rather than <> ALL (...): one item without an item_no would make
+    -- every comparison NULL and leave removed items behind.
+    DELETE FROM purchase_order_line_items li
+    WHERE li.purchase_order_id = po_id
+      AND NOT EXISTS (
+          SELECT 1
+          FROM jsonb_array_elements(items) item
+          WHERE (item->>'item_no')::int = li.item_no
+      );
 
     INSERT INTO purchase_order_line_items (
         purchase_order_id,
@@ -165,8 +207,28 @@ BEGIN
         (item->>'qty')::int,
         (item->>'unit_price')::numeric,
         (item->>'total')::numeric
-    FROM jsonb_array_elements(COALESCE(payload #> '{purchase_order,line_items}', '[]'::jsonb)) item;
-
-    RETURN po_id;
+    FROM jsonb_array_elements(items) item
+    ON CONFLICT (purchase_order_id, item_no) DO UPDATE
+    SET
+        description = EXCLUDED.description,
+        qty = EXCLUDED.qty,
+        unit_price = EXCLUDED.unit_price,
+        line_total = EXCLUDED.line_total
+    WHERE (
+        purchase_order_line_items.description,
+        purchase_order_line_items.qty,
+        purchase_order_line_items.unit_price,
+        purchase_order_line_items.line_total
+    ) IS DISTINCT FROM (
+        EXCLUDED.description,
+        EXCLUDED.qty,
+        EXCLUDED.unit_price,
+        EXCLUDED.line_total
+    );
 END;
 $$;
+
+INSERT INTO schema_versions (component, version) VALUES ('purchase_orders', 3)
+ON CONFLICT (component) DO UPDATE
+SET version = EXCLUDED.version,
+    applied_at = NOW();
@@ -29,6 +29,35 @@ CREATE TABLE IF NOT EXISTS purchase_order_run_state_history (
     error_message TEXT
 );
 
+-- Task-queue mode (run_workflow.py --enqueue / --worker): runs carry what a
+-- worker on any node needs to execute them, plus a lease. Classic runs leave
+-- these columns at their defaults.
+ALTER TABLE purchase_order_runs
+    ADD COLUMN IF NOT EXISTS input_path TEXT,
+    ADD COLUMN IF NOT EXISTS queue_position INTEGER,
+    ADD COLUMN IF NOT EXISTS dependencies TEXT[] NOT NULL DEFAULT '{}',
+    ADD COLUMN IF NOT EXISTS unmet_dependencies INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS lease_owner TEXT,
+    ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMPTZ;
+
+CREATE TABLE IF NOT EXISTS purchase_order_run_dependencies (
+    purchase_order_run_id BIGINT NOT NULL REFERENCES purchase_order_runs(id) ON DELETE CASCADE,
+    depends_on_run_id BIGINT NOT NULL REFERENCES purchase_order_runs(id) ON DELETE CASCADE,
+    PRIMARY KEY (purchase_order_run_id, depends_on_run_id)
+);
+
+CREATE INDEX IF NOT EXISTS purchase_order_run_dependencies_upstream_idx
+    ON purchase_order_run_dependencies (depends_on_run_id);
+
+CREATE INDEX IF NOT EXISTS purchase_order_runs_claimable_idx
+    ON purchase_order_runs (workflow_run_id, queue_position)
+    WHERE state = 'PENDING' AND unmet_dependencies = 0;
+
+CREATE INDEX IF NOT EXISTS purchase_order_runs_lease_owner_idx
+    ON purchase_order_runs (lease_owner)
+    WHERE lease_owner IS NOT NULL;
+
 CREATE OR REPLACE FUNCTION create_purchase_order_run(
     p_workflow_run_id BIGINT,
     p_test_name TEXT,
@@ -55,10 +84,13 @@ BEGIN
 END;
 $$;
 
+DROP FUNCTION IF EXISTS transition_purchase_order_run(BIGINT, TEXT, TEXT);
+
 CREATE OR REPLACE FUNCTION transition_purchase_order_run(
     p_run_id BIGINT,
     p_new_state TEXT,
-    p_error_message TEXT DEFAULT NULL
+    p_error_message TEXT DEFAULT NULL,
+    p_changed_at TIMESTAMPTZ DEFAULT NULL
 )
 RETURNS VOID
 LANGUAGE plpgsql
@@ -75,25 +107,237 @@ BEGIN
         RAISE EXCEPTION 'purchase_order_run % not found', p_run_id;
     END IF;
 
+    -- RUNNING -> PENDING is the recovery transition for a task whose worker is
+    -- gone (expired lease, interrupted run). It must name its reason, which
+    -- the history row keeps.
     IF NOT (
         (current_state = 'PENDING' AND p_new_state = 'RUNNING') OR
-        (current_state = 'RUNNING' AND p_new_state IN ('SUCCESS', 'FAILED'))
+        (current_state = 'RUNNING' AND p_new_state IN ('SUCCESS', 'FAILED', 'PENDING'))
     ) THEN
         RAISE EXCEPTION 'invalid state transition % -> %', current_state, p_new_state;
     END IF;
 
+    IF p_new_state = 'PENDING' AND p_error_message IS NULL THEN
+        RAISE EXCEPTION 'recovery transition RUNNING -> PENDING of purchase_order_run % needs a reason', p_run_id;
+    END IF;
+
     UPDATE purchase_order_runs
     SET state = p_new_state,
-        error_message = COALESCE(p_error_message, error_message),
-        updated_at = NOW()
+        error_message = CASE
+            WHEN p_new_state = 'PENDING' THEN error_message
+            ELSE COALESCE(p_error_message, error_message)
+        END,
+        updated_at = COALESCE(p_changed_at, NOW()),
+        lease_owner = CASE WHEN p_new_state = 'RUNNING' THEN lease_owner END,
+        lease_expires_at = CASE WHEN p_new_state = 'RUNNING' THEN lease_expires_at END
     WHERE id = p_run_id;
 
+    -- Dependency release: a downstream run becomes claimable once every
+    -- upstream run has succeeded.
+    IF p_new_state = 'SUCCESS' THEN
+        UPDATE purchase_order_runs downstream
+        SET unmet_dependencies = downstream.unmet_dependencies - 1
+        FROM purchase_order_run_dependencies d
+        WHERE d.depends_on_run_id = p_run_id
+          AND downstream.id = d.purchase_order_run_id;
+    END IF;
+
     INSERT INTO purchase_order_run_state_history (
         purchase_order_run_id,
         from_state,
         to_state,
+        changed_at,
         error_message
-    ) VALUES (p_run_id, current_state, p_new_state, p_error_message);
+    ) VALUES (p_run_id, current_state, p_new_state, COALESCE(p_changed_at, NOW()), p_error_message);
+END;
+$$;
+
+-- One row per update of a write-behind batch, in array order (seq). Each
+-- update carries the client-side time it was journaled (`at`) so
+-- updated_at/changed_at reflect when the change happened.
+CREATE OR REPLACE FUNCTION purchase_order_run_update_rows(p_updates JSONB)
+RETURNS TABLE (
+    seq BIGINT,
+    op TEXT,
+    run_id BIGINT,
+    changed_at TIMESTAMPTZ,
+    attempts INTEGER,
+    po_number TEXT,
+    req JSONB,
+    output JSONB,
+    state TEXT,
+    error_message TEXT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        u.seq,
+        u.value->>'op',
+        (u.value->>'run_id')::bigint,
+        COALESCE((u.value->>'at')::timestamptz, NOW()),
+        (u.value->>'attempts')::int,
+        u.value->>'po_number',
+        u.value->'req',
+        u.value->'output',
+        u.value->>'state',
+        u.value->>'error_message'
+    FROM jsonb_array_elements(p_updates) WITH ORDINALITY AS u(value, seq);
+$$;
+
+-- Applies a write-behind batch of purchase_order_runs updates in one round-trip,
+-- with one statement per kind of change instead of one per update. The result
+-- is the same as applying the updates one by one in array order: the last
+-- value of each field wins, a run may go through several transitions (checked
+-- as a chain against the same rules as transition_purchase_order_run), and any
+-- invalid transition rejects the whole batch.
+CREATE OR REPLACE FUNCTION apply_purchase_order_run_updates(p_updates JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    problem TEXT;
+BEGIN
+    SELECT format('unknown purchase_order_run update %s', u.op) INTO problem
+    FROM purchase_order_run_update_rows(p_updates) u
+    WHERE u.op IS NULL OR u.op NOT IN ('attempts', 'request', 'output', 'transition')
+    ORDER BY u.seq
+    LIMIT 1;
+    IF problem IS NOT NULL THEN
+        RAISE EXCEPTION '%', problem;
+    END IF;
+
+    -- Lock every touched run up front, in id order, so concurrent batches
+    -- cannot deadlock and the states checked below cannot change.
+    PERFORM 1
+    FROM purchase_order_runs r
+    WHERE r.id IN (SELECT u.run_id FROM purchase_order_run_update_rows(p_updates) u)
+    ORDER BY r.id
+    FOR UPDATE;
+
+    SELECT CASE
+        WHEN chain.current_state IS NULL THEN format('purchase_order_run %s not found', chain.run_id)
+        WHEN NOT chain.allowed THEN format('invalid state transition %s -> %s', chain.from_state, chain.to_state)
+        ELSE format('recovery transition RUNNING -> PENDING of purchase_order_run %s needs a reason', chain.run_id)
+    END INTO problem
+    FROM (
+        SELECT
+            steps.*,
+            COALESCE(
+                (steps.from_state = 'PENDING' AND steps.to_state = 'RUNNING')
+                OR (steps.from_state = 'RUNNING' AND steps.to_state IN ('SUCCESS', 'FAILED', 'PENDING')),
+                FALSE
+            ) AS allowed
+        FROM (
+            SELECT
+                u.seq,
+                u.run_id,
+                u.state AS to_state,
+                u.error_message,
+                r.state AS current_state,
+                COALESCE(LAG(u.state) OVER (PARTITION BY u.run_id ORDER BY u.seq), r.state) AS from_state
+            FROM purchase_order_run_update_rows(p_updates) u
+            LEFT JOIN purchase_order_runs r ON r.id = u.run_id
+            WHERE u.op = 'transition'
+        ) steps
+    ) chain
+    WHERE chain.current_state IS NULL
+       OR NOT chain.allowed
+       OR (chain.to_state = 'PENDING' AND chain.error_message IS NULL)
+    ORDER BY chain.seq
+    LIMIT 1;
+    IF problem IS NOT NULL THEN
+        RAISE EXCEPTION '%', problem;
+    END IF;
+
+    -- History first: from_state comes from the run's state before this batch.
+    INSERT INTO purchase_order_run_state_history (
+        purchase_order_run_id,
+        from_state,
+        to_state,
+        changed_at,
+        error_message
+    )
+    SELECT steps.run_id, steps.from_state, steps.to_state, steps.changed_at, steps.error_message
+    FROM (
+        SELECT
+            u.seq,
+            u.run_id,
+            u.state AS to_state,
+            u.changed_at,
+            u.error_message,
+            COALESCE(LAG(u.state) OVER (PARTITION BY u.run_id ORDER BY u.seq), r.state) AS from_state
+        FROM purchase_order_run_update_rows(p_updates) u
+        JOIN purchase_order_runs r ON r.id = u.run_id
+        WHERE u.op = 'transition'
+    ) steps
+    ORDER BY steps.seq;
+
+    -- Dependency release for every run that reached SUCCESS in this batch.
+    UPDATE purchase_order_runs downstream
+    SET unmet_dependencies = downstream.unmet_dependencies - released.upstream_count
+    FROM (
+        SELECT d.purchase_order_run_id, count(*) AS upstream_count
+        FROM purchase_order_run_update_rows(p_updates) u
+        JOIN purchase_order_run_dependencies d ON d.depends_on_run_id = u.run_id
+        WHERE u.op = 'transition' AND u.state = 'SUCCESS'
+        GROUP BY d.purchase_order_run_id
+    ) released
+    WHERE downstream.id = released.purchase_order_run_id;
+
+    UPDATE purchase_order_runs r
+    SET attempts = CASE WHEN latest.sets_attempts THEN latest.attempts ELSE r.attempts END,
+        po_number = COALESCE(latest.po_number, r.po_number),
+        req = CASE WHEN latest.sets_req THEN latest.req ELSE r.req END,
+        output = CASE WHEN latest.sets_output THEN latest.output ELSE r.output END,
+        state = COALESCE(latest.state, r.state),
+        error_message = COALESCE(latest.error_message, r.error_message),
+        updated_at = latest.changed_at,
+        lease_owner = CASE WHEN latest.releases_lease THEN NULL ELSE r.lease_owner END,
+        lease_expires_at = CASE WHEN latest.releases_lease THEN NULL ELSE r.lease_expires_at END
+    FROM (
+        SELECT
+            u.run_id,
+            (array_agg(u.changed_at ORDER BY u.seq DESC))[1] AS changed_at,
+            bool_or(u.op = 'attempts') AS sets_attempts,
+            (array_agg(u.attempts ORDER BY u.seq DESC) FILTER (WHERE u.op = 'attempts'))[1] AS attempts,
+            bool_or(u.op = 'request') AS sets_req,
+            (array_agg(u.req ORDER BY u.seq DESC) FILTER (WHERE u.op = 'request'))[1] AS req,
+            (array_agg(u.po_number ORDER BY u.seq DESC)
+                FILTER (WHERE u.op = 'request' AND u.po_number IS NOT NULL))[1] AS po_number,
+            bool_or(u.op = 'output') AS sets_output,
+            (array_agg(u.output ORDER BY u.seq DESC) FILTER (WHERE u.op = 'output'))[1] AS output,
+            (array_agg(u.state ORDER BY u.seq DESC) FILTER (WHERE u.op = 'transition'))[1] AS state,
+            -- A recovery transition keeps the previous error; others replace it when given.
+            (array_agg(u.error_message ORDER BY u.seq DESC)
+                FILTER (WHERE u.op = 'transition' AND u.state <> 'PENDING' AND u.error_message IS NOT NULL))[1]
+                AS error_message,
+            COALESCE(bool_or(u.op = 'transition' AND u.state <> 'RUNNING'), FALSE) AS releases_lease
+        FROM purchase_order_run_update_rows(p_updates) u
+        GROUP BY u.run_id
+    ) latest
+    WHERE r.id = latest.run_id;
+
+    RETURN jsonb_array_length(p_updates);
+END;
+$$;
+
+-- Bulk variant of create_purchase_order_run used at workflow start.
+-- p_tasks is a JSON array of {"test_name", "po_number", "req", "input_path",
+-- "dependencies"} objects in planned order. Runs are stored like queued ones
+-- (see enqueue_purchase_order_runs below), so an interrupted run can be
+-- reloaded by resume_workflow_run.
+CREATE OR REPLACE FUNCTION create_purchase_order_runs(
+    p_workflow_run_id BIGINT,
+    p_tasks JSONB
+)
+RETURNS TABLE (test_name TEXT, purchase_order_run_id BIGINT)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    SELECT queued.test_name, queued.purchase_order_run_id
+    FROM enqueue_purchase_order_runs(p_workflow_run_id, p_tasks) AS queued;
 END;
 $$;
 
@@ -131,3 +375,399 @@ BEGIN
     WHERE id = p_run_id;
 END;
 $$;
+
+-- Creates a run's tasks as claimable queue entries (classic runs go through
+-- here too, via create_purchase_order_runs). p_tasks is a JSON array, in
+-- planned order, of {"test_name", "po_number", "req", "input_path",
+-- "dependencies": [test names]}. Dependencies on tasks outside the run are
+-- never released, so such a task stays PENDING (blocked), as in a classic run.
+CREATE OR REPLACE FUNCTION enqueue_purchase_order_runs(
+    p_workflow_run_id BIGINT,
+    p_tasks JSONB
+)
+RETURNS TABLE (test_name TEXT, purchase_order_run_id BIGINT)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    WITH tasks AS (
+        SELECT
+            task,
+            position,
+            ARRAY(
+                SELECT d.dep
+                FROM jsonb_array_elements_text(COALESCE(task->'dependencies', '[]'::jsonb)) WITH ORDINALITY AS d(dep, ord)
+                GROUP BY d.dep
+                ORDER BY MIN(d.ord)
+            ) AS deps
+        FROM jsonb_array_elements(p_tasks) WITH ORDINALITY AS t(task, position)
+    ),
+    inserted AS (
+        INSERT INTO purchase_order_runs (
+            workflow_run_id,
+            test_name,
+            po_number,
+            state,
+            req,
+            input_path,
+            queue_position,
+            dependencies,
+            unmet_dependencies
+        )
+        SELECT
+            p_workflow_run_id,
+            tasks.task->>'test_name',
+            tasks.task->>'po_number',
+            'PENDING',
+            COALESCE(tasks.task->'req', '{}'::jsonb),
+            tasks.task->>'input_path',
+            tasks.position::int,
+            tasks.deps,
+            cardinality(tasks.deps)
+        FROM tasks
+        ORDER BY tasks.position
+        RETURNING purchase_order_runs.id, purchase_order_runs.test_name, purchase_order_runs.dependencies
+    ),
+    history AS (
+        INSERT INTO purchase_order_run_state_history (purchase_order_run_id, from_state, to_state)
+        SELECT inserted.id, NULL, 'PENDING'
+        FROM inserted
+    ),
+    edges AS (
+        INSERT INTO purchase_order_run_dependencies (purchase_order_run_id, depends_on_run_id)
+        SELECT downstream.id, upstream.id
+        FROM inserted downstream
+        CROSS JOIN LATERAL unnest(downstream.dependencies) AS dep(name)
+        JOIN inserted upstream ON upstream.test_name = dep.name
+    )
+    SELECT inserted.test_name, inserted.id
+    FROM inserted;
+END;
+$$;
+
+-- Claims the next runnable task of a queued workflow run for p_worker:
+-- PENDING, every dependency released, not leased by a live worker. Rows other
+-- workers are claiming right now are skipped, not waited on. The claim only
+-- takes the lease; the worker moves the task to RUNNING itself.
+CREATE OR REPLACE FUNCTION claim_purchase_order_run(
+    p_workflow_run_id BIGINT,
+    p_worker TEXT,
+    p_lease_seconds INTEGER
+)
+RETURNS TABLE (purchase_order_run_id BIGINT, test_name TEXT, input_path TEXT, dependencies TEXT[])
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    claimed BIGINT;
+BEGIN
+    SELECT r.id INTO claimed
+    FROM purchase_order_runs r
+    WHERE r.workflow_run_id = p_workflow_run_id
+      AND r.state = 'PENDING'
+      AND r.unmet_dependencies = 0
+      AND (r.lease_expires_at IS NULL OR r.lease_expires_at < NOW())
+    ORDER BY r.queue_position
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED;
+
+    IF claimed IS NULL THEN
+        RETURN;
+    END IF;
+
+    UPDATE purchase_order_runs r
+    SET lease_owner = p_worker,
+        lease_expires_at = NOW() + make_interval(secs => p_lease_seconds),
+        heartbeat_at = NOW()
+    WHERE r.id = claimed;
+
+    RETURN QUERY
+    SELECT r.id, r.test_name, r.input_path, r.dependencies
+    FROM purchase_order_runs r
+    WHERE r.id = claimed;
+END;
+$$;
+
+-- Extends every lease p_worker still holds; returns how many.
+CREATE OR REPLACE FUNCTION heartbeat_purchase_order_runs(p_worker TEXT, p_lease_seconds INTEGER)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    extended INTEGER;
+BEGIN
+    UPDATE purchase_order_runs r
+    SET lease_expires_at = NOW() + make_interval(secs => p_lease_seconds),
+        heartbeat_at = NOW()
+    WHERE r.lease_owner = p_worker
+      AND r.state IN ('PENDING', 'RUNNING');
+    GET DIAGNOSTICS extended = ROW_COUNT;
+    RETURN extended;
+END;
+$$;
+
+-- Fenced variant of apply_purchase_order_run_updates for queue workers:
+-- updates are applied only to runs whose lease p_worker still holds (locked
+-- first, so recovery cannot move them in between). Runs it lost, e.g. to
+-- lease-expiry recovery and another worker's claim, are skipped and
+-- returned, so a stalled worker cannot overwrite or finish the new owner's
+-- attempt.
+CREATE OR REPLACE FUNCTION apply_leased_purchase_order_run_updates(p_worker TEXT, p_updates JSONB)
+RETURNS BIGINT[]
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    requested BIGINT[];
+    held BIGINT[];
+BEGIN
+    requested := ARRAY(
+        SELECT DISTINCT (u.value->>'run_id')::bigint
+        FROM jsonb_array_elements(p_updates) AS u(value)
+    );
+
+    held := ARRAY(
+        SELECT r.id
+        FROM purchase_order_runs r
+        WHERE r.id = ANY(requested)
+          AND r.lease_owner = p_worker
+        ORDER BY r.id
+        FOR UPDATE
+    );
+
+    PERFORM apply_purchase_order_run_updates(
+        COALESCE(
+            (
+                SELECT jsonb_agg(u.value ORDER BY u.position)
+                FROM jsonb_array_elements(p_updates) WITH ORDINALITY AS u(value, position)
+                WHERE (u.value->>'run_id')::bigint = ANY(held)
+            ),
+            '[]'::jsonb
+        )
+    );
+
+    RETURN ARRAY(SELECT id FROM unnest(requested) AS id WHERE id <> ALL(held) ORDER BY id);
+END;
+$$;
+
+-- Lease-expiry recovery: RUNNING tasks whose worker stopped heartbeating go
+-- back to PENDING through transition_purchase_order_run, with the lost
+-- worker recorded in the history row. (An expired lease on a task that never
+-- reached RUNNING simply makes it claimable again.)
+CREATE OR REPLACE FUNCTION recover_expired_purchase_order_runs(p_workflow_run_id BIGINT)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    expired RECORD;
+    recovered INTEGER := 0;
+BEGIN
+    FOR expired IN
+        SELECT r.id, r.lease_owner
+        FROM purchase_order_runs r
+        WHERE r.workflow_run_id = p_workflow_run_id
+          AND r.state = 'RUNNING'
+          AND r.lease_expires_at < NOW()
+        ORDER BY r.id
+        FOR UPDATE SKIP LOCKED
+    LOOP
+        PERFORM transition_purchase_order_run(expired.id, 'PENDING', format('lease_expired: %s', expired.lease_owner));
+        recovered := recovered + 1;
+    END LOOP;
+    RETURN recovered;
+END;
+$$;
+
+-- Closes a queued workflow run once nothing is running or runnable. Tasks
+-- left PENDING are blocked by a failed or blocked upstream: they get the same
+-- output a classic run writes and are returned so the caller can write their
+-- alert files. Returns no row when the run is not finished yet or another
+-- worker already closed it.
+CREATE OR REPLACE FUNCTION finish_queued_workflow_run(p_workflow_run_id BIGINT)
+RETURNS TABLE (final_state TEXT, blocked_tasks JSONB)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    workflow_state TEXT;
+    blocked_json JSONB;
+BEGIN
+    SELECT wr.state INTO workflow_state
+    FROM workflow_runs wr
+    WHERE wr.id = p_workflow_run_id
+    FOR UPDATE;
+
+    IF workflow_state IS DISTINCT FROM 'RUNNING' THEN
+        RETURN;
+    END IF;
+
+    IF EXISTS (
+        SELECT 1
+        FROM purchase_order_runs r
+        WHERE r.workflow_run_id = p_workflow_run_id
+          AND (r.state = 'RUNNING' OR (r.state = 'PENDING' AND r.unmet_dependencies = 0))
+    ) THEN
+        RETURN;
+    END IF;
+
+    WITH waiting AS (
+        SELECT
+            r.id,
+            r.test_name,
+            r.input_path,
+            ARRAY(
+                SELECT dep
+                FROM unnest(r.dependencies) WITH ORDINALITY AS d(dep, position)
+                WHERE NOT EXISTS (
+                    SELECT 1
+                    FROM purchase_order_runs u
+                    WHERE u.workflow_run_id = r.workflow_run_id
+                      AND u.test_name = d.dep
+                      AND u.state = 'SUCCESS'
+                )
+                ORDER BY d.position
+            ) AS unmet,
+            EXISTS (
+                SELECT 1
+                FROM purchase_order_runs u
+                WHERE u.workflow_run_id = r.workflow_run_id
+                  AND u.test_name = ANY(r.dependencies)
+                  AND u.state = 'FAILED'
+            ) AS upstream_failed
+        FROM purchase_order_runs r
+        WHERE r.workflow_run_id = p_workflow_run_id
+          AND r.state = 'PENDING'
+    ),
+    described AS (
+        SELECT
+            w.id,
+            w.test_name,
+            w.input_path,
+            CASE WHEN w.upstream_failed THEN 'waiting_on_upstream' ELSE 'waiting_on_dependency' END AS flag,
+            format('Dependencies not satisfied for %s: %s', w.test_name, array_to_string(w.unmet, ', ')) AS message
+        FROM waiting w
+    ),
+    updated AS (
+        UPDATE purchase_order_runs r
+        SET output = jsonb_build_object('status', 'PENDING', 'reasons', jsonb_build_array(d.flag), 'error', d.message),
+            updated_at = NOW()
+        FROM described d
+        WHERE r.id = d.id
+        RETURNING r.id
+    )
+    SELECT COALESCE(
+        jsonb_agg(
+            jsonb_build_object('test_name', d.test_name, 'input_path', d.input_path, 'reason', d.flag, 'message', d.message)
+            ORDER BY d.id
+        ),
+        '[]'::jsonb
+    )
+    INTO blocked_json
+    FROM described d;
+
+    IF EXISTS (
+        SELECT 1
+        FROM purchase_order_runs r
+        WHERE r.workflow_run_id = p_workflow_run_id
+          AND r.state = 'FAILED'
+    ) THEN
+        PERFORM transition_workflow_run(p_workflow_run_id, 'FAILED', 'one_or_more_tasks_failed');
+        final_state := 'FAILED';
+    ELSE
+        PERFORM transition_workflow_run(p_workflow_run_id, 'SUCCESS');
+        final_state := 'SUCCESS';
+    END IF;
+    blocked_tasks := blocked_json;
+    RETURN NEXT;
+END;
+$$;
+
+-- Crash-resume (run_workflow.py --resume): reopens an interrupted workflow
+-- run and returns every task in planned order. Tasks left RUNNING by the dead
+-- process go back to PENDING through the recovery transition, recorded in
+-- the history as "resumed: ...". Refuses finished runs and runs whose tasks
+-- are still leased by a live queue worker. A classic run holds no lease, so
+-- a run with any task updated in the last p_idle_seconds is taken to still
+-- be executing somewhere and is refused too (pass 0 to skip that check).
+DROP FUNCTION IF EXISTS resume_workflow_run(BIGINT);
+
+CREATE OR REPLACE FUNCTION resume_workflow_run(p_workflow_run_id BIGINT, p_idle_seconds INTEGER DEFAULT 300)
+RETURNS TABLE (
+    purchase_order_run_id BIGINT,
+    test_name TEXT,
+    state TEXT,
+    input_path TEXT,
+    dependencies TEXT[],
+    recovered BOOLEAN
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    workflow_state TEXT;
+    orphan RECORD;
+    recovered_ids BIGINT[] := '{}';
+    last_activity TIMESTAMPTZ;
+BEGIN
+    SELECT wr.state INTO workflow_state
+    FROM workflow_runs wr
+    WHERE wr.id = p_workflow_run_id
+    FOR UPDATE;
+
+    IF workflow_state IS NULL THEN
+        RAISE EXCEPTION 'workflow_run % not found', p_workflow_run_id;
+    END IF;
+    IF workflow_state NOT IN ('PENDING', 'RUNNING') THEN
+        RAISE EXCEPTION 'workflow_run % already finished (%)', p_workflow_run_id, workflow_state;
+    END IF;
+
+    IF EXISTS (
+        SELECT 1
+        FROM purchase_order_runs r
+        WHERE r.workflow_run_id = p_workflow_run_id
+          AND r.state IN ('PENDING', 'RUNNING')
+          AND r.lease_expires_at >= NOW()
+    ) THEN
+        RAISE EXCEPTION 'workflow_run % has tasks leased by a live worker; start another --worker instead', p_workflow_run_id;
+    END IF;
+
+    SELECT MAX(r.updated_at) INTO last_activity
+    FROM purchase_order_runs r
+    WHERE r.workflow_run_id = p_workflow_run_id;
+    IF p_idle_seconds > 0 AND last_activity > NOW() - make_interval(secs => p_idle_seconds) THEN
+        RAISE EXCEPTION 'workflow_run % had task activity % ago and may still be running; %',
+            p_workflow_run_id,
+            date_trunc('second', NOW() - last_activity),
+            format('retry once it has been idle for %s s, or force the resume', p_idle_seconds);
+    END IF;
+
+    IF workflow_state = 'PENDING' THEN
+        PERFORM transition_workflow_run(p_workflow_run_id, 'RUNNING');
+    END IF;
+
+    FOR orphan IN
+        SELECT r.id
+        FROM purchase_order_runs r
+        WHERE r.workflow_run_id = p_workflow_run_id
+          AND r.state = 'RUNNING'
+        ORDER BY r.id
+        FOR UPDATE
+    LOOP
+        PERFORM transition_purchase_order_run(orphan.id, 'PENDING', 'resumed: orphaned by an interrupted run');
+        recovered_ids := recovered_ids || orphan.id;
+    END LOOP;
+
+    RETURN QUERY
+    SELECT r.id, r.test_name, r.state, r.input_path, r.dependencies, r.id = ANY(recovered_ids)
+    FROM purchase_order_runs r
+    WHERE r.workflow_run_id = p_workflow_run_id
+    ORDER BY r.queue_position NULLS LAST, r.id;
+END;
+$$;
+
+CREATE TABLE IF NOT EXISTS schema_versions (
+    component TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO schema_versions (component, version) VALUES ('workflow', 6)
+ON CONFLICT (component) DO UPDATE
+SET version = EXCLUDED.version,
+    applied_at = NOW();
@@ -0,0 +1,288 @@
+-- Secondary indexes for the visibility/attention queries, and monthly range
+-- partitioning of the two append-only history tables:
+--   purchase_order_run_state_history by changed_at, po_alerts by created_at.
+-- Partitions are named <table>_pYYYYMM (UTC months); each table also has a
+-- <table>_default partition so an insert never fails for a missing month.
+-- Idempotent. On a database created before this file, run it once by hand
+-- (see README); existing history/alert rows are copied into the partitioned
+-- tables inside the same transaction.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS schema_versions (
+    component TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Per-run task counts (04_workflow_visibility.sql) read only this index.
+CREATE INDEX IF NOT EXISTS purchase_order_runs_workflow_state_idx
+    ON purchase_order_runs (workflow_run_id, state);
+
+-- "Currently running tasks": RUNNING rows are a tiny, hot slice of the table.
+CREATE INDEX IF NOT EXISTS purchase_order_runs_running_idx
+    ON purchase_order_runs (updated_at DESC)
+    INCLUDE (workflow_run_id, test_name, po_number)
+    WHERE state = 'RUNNING';
+
+CREATE INDEX IF NOT EXISTS workflow_runs_running_idx
+    ON workflow_runs (started_at DESC)
+    WHERE state = 'RUNNING';
+
+CREATE INDEX IF NOT EXISTS workflow_runs_finished_idx
+    ON workflow_runs (finished_at DESC)
+    WHERE state IN ('SUCCESS', 'FAILED');
+
+CREATE OR REPLACE FUNCTION partition_key_column(p_parent REGCLASS)
+RETURNS TEXT
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT a.attname::text
+    FROM pg_partitioned_table pt
+    JOIN pg_attribute a ON a.attrelid = pt.partrelid AND a.attnum = pt.partattrs[0]
+    WHERE pt.partrelid = p_parent;
+$$;
+
+CREATE OR REPLACE FUNCTION default_partition_of(p_parent REGCLASS)
+RETURNS REGCLASS
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT c.oid::regclass
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = p_parent
+      AND pg_get_expr(c.relpartbound, c.oid) = 'DEFAULT';
+$$;
+
+-- Creates <parent>_pYYYYMM for the UTC month containing p_month and returns its
+-- name (NULL when it already exists). Rows that landed in the default partition
+-- for that month are moved into the new partition before it is attached.
+CREATE OR REPLACE FUNCTION create_monthly_partition(p_parent REGCLASS, p_month DATE)
+RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    key_column TEXT := partition_key_column(p_parent);
+    default_part REGCLASS := default_partition_of(p_parent);
+    month_start DATE := date_trunc('month', p_month::timestamp)::date;
+    lower_bound TIMESTAMPTZ;
+    upper_bound TIMESTAMPTZ;
+    part_name TEXT;
+BEGIN
+    IF key_column IS NULL THEN
+        RAISE EXCEPTION '% is not a partitioned table', p_parent;
+    END IF;
+
+    part_name := format('%s_p%s', (SELECT relname FROM pg_class WHERE oid = p_parent), to_char(month_start, 'YYYYMM'));
+    IF to_regclass(quote_ident(part_name)) IS NOT NULL THEN
+        RETURN NULL;
+    END IF;
+
+    lower_bound := month_start::timestamp AT TIME ZONE 'UTC';
+    upper_bound := (month_start + INTERVAL '1 month') AT TIME ZONE 'UTC';
+
+    EXECUTE format('CREATE TABLE %I (LIKE %s INCLUDING DEFAULTS)', part_name, p_parent);
+    IF default_part IS NOT NULL THEN
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM %s WHERE %I >= %L AND %I < %L RETURNING *) INSERT INTO %I SELECT * FROM moved',
+            default_part, key_column, lower_bound, key_column, upper_bound, part_name
+        );
+    END IF;
+    EXECUTE format(
+        'ALTER TABLE %s ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        p_parent, part_name, lower_bound, upper_bound
+    );
+    RETURN part_name;
+END;
+$$;
+
+-- Retention/maintenance for one monthly-partitioned table: makes sure the
+-- current month and p_months_ahead future months have partitions, then (unless
+-- p_keep_months is NULL) drops partitions that ended more than p_keep_months
+-- whole months ago and purges equally old rows from the default partition.
+CREATE OR REPLACE FUNCTION maintain_monthly_partitions(
+    p_parent REGCLASS,
+    p_keep_months INTEGER,
+    p_months_ahead INTEGER DEFAULT 3
+)
+RETURNS TABLE (action TEXT, partition_name TEXT)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    this_month DATE := date_trunc('month', NOW() AT TIME ZONE 'UTC')::date;
+    cutoff DATE;
+    created TEXT;
+    expired RECORD;
+    default_part REGCLASS := default_partition_of(p_parent);
+    removed BIGINT;
+BEGIN
+    FOR months_ahead IN 0..GREATEST(p_months_ahead, 0) LOOP
+        created := create_monthly_partition(p_parent, (this_month + make_interval(months => months_ahead))::date);
+        IF created IS NOT NULL THEN
+            action := 'created';
+            partition_name := created;
+            RETURN NEXT;
+        END IF;
+    END LOOP;
+
+    IF p_keep_months IS NULL THEN
+        RETURN;
+    END IF;
+    IF p_keep_months < 1 THEN
+        RAISE EXCEPTION 'p_keep_months must be at least 1 (got %)', p_keep_months;
+    END IF;
+    cutoff := (this_month - make_interval(months => p_keep_months))::date;
+
+    FOR expired IN
+        SELECT c.relname::text AS relname, c.oid::regclass AS part
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = p_parent
+          AND substring(c.relname FROM '_p([0-9]{6})$') IS NOT NULL
+          AND to_date(substring(c.relname FROM '_p([0-9]{6})$'), 'YYYYMM') < cutoff
+        ORDER BY c.relname
+    LOOP
+        EXECUTE format('DROP TABLE %s', expired.part);
+        action := 'dropped';
+        partition_name := expired.relname;
+        RETURN NEXT;
+    END LOOP;
+
+    IF default_part IS NOT NULL THEN
+        EXECUTE format(
+            'DELETE FROM %s WHERE %I < %L',
+            default_part, partition_key_column(p_parent), cutoff::timestamp AT TIME ZONE 'UTC'
+        );
+        GET DIAGNOSTICS removed = ROW_COUNT;
+        IF removed > 0 THEN
+            action := format('purged %s row(s)', removed);
+            partition_name := default_part::text;
+            RETURN NEXT;
+        END IF;
+    END IF;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION maintain_workflow_partitions(
+    p_keep_months INTEGER DEFAULT 12,
+    p_months_ahead INTEGER DEFAULT 3
+)
+RETURNS TABLE (table_name TEXT, action TEXT, partition_name TEXT)
+LANGUAGE sql
+AS $$
+    SELECT 'purchase_order_run_state_history', m.action, m.partition_name
+    FROM maintain_monthly_partitions('purchase_order_run_state_history', p_keep_months, p_months_ahead) m
+    UNION ALL
+    SELECT 'po_alerts', m.action, m.partition_name
+    FROM maintain_monthly_partitions('po_alerts', p_keep_months, p_months_ahead) m;
+$$;
+
+-- Convert purchase_order_run_state_history (skipped once it is partitioned).
+DO $$
+DECLARE
+    oldest TIMESTAMPTZ;
+    month_cursor DATE;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'purchase_order_run_state_history'::regclass) = 'p' THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE purchase_order_run_state_history RENAME TO purchase_order_run_state_history_unpartitioned;
+    ALTER TABLE purchase_order_run_state_history_unpartitioned
+        RENAME CONSTRAINT purchase_order_run_state_history_pkey
+        TO purchase_order_run_state_history_unpartitioned_pkey;
+
+    CREATE TABLE purchase_order_run_state_history (
+        id BIGINT NOT NULL DEFAULT nextval('purchase_order_run_state_history_id_seq'),
+        purchase_order_run_id BIGINT NOT NULL REFERENCES purchase_order_runs(id) ON DELETE CASCADE,
+        from_state TEXT,
+        to_state TEXT NOT NULL,
+        changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        error_message TEXT,
+        PRIMARY KEY (id, changed_at)
+    ) PARTITION BY RANGE (changed_at);
+    ALTER SEQUENCE purchase_order_run_state_history_id_seq OWNED BY purchase_order_run_state_history.id;
+    CREATE TABLE purchase_order_run_state_history_default
+        PARTITION OF purchase_order_run_state_history DEFAULT;
+
+    SELECT MIN(changed_at) INTO oldest FROM purchase_order_run_state_history_unpartitioned;
+    month_cursor := date_trunc('month', COALESCE(oldest, NOW()) AT TIME ZONE 'UTC')::date;
+    WHILE month_cursor <= date_trunc('month', NOW() AT TIME ZONE 'UTC')::date LOOP
+        PERFORM create_monthly_partition('purchase_order_run_state_history', month_cursor);
+        month_cursor := (month_cursor + INTERVAL '1 month')::date;
+    END LOOP;
+
+    INSERT INTO purchase_order_run_state_history (
+        id, purchase_order_run_id, from_state, to_state, changed_at, error_message
+    )
+    SELECT id, purchase_order_run_id, from_state, to_state, changed_at, error_message
+    FROM purchase_order_run_state_history_unpartitioned;
+    DROP TABLE purchase_order_run_state_history_unpartitioned;
+END;
+$$;
+
+-- Convert po_alerts (skipped once it is partitioned).
+DO $$
+DECLARE
+    oldest TIMESTAMPTZ;
+    month_cursor DATE;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'po_alerts'::regclass) = 'p' THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE po_alerts RENAME TO po_alerts_unpartitioned;
+    ALTER TABLE po_alerts_unpartitioned RENAME CONSTRAINT po_alerts_pkey TO po_alerts_unpartitioned_pkey;
+
+    CREATE TABLE po_alerts (
+        id BIGINT NOT NULL DEFAULT nextval('po_alerts_id_seq'),
+        purchase_order_id BIGINT NOT NULL REFERENCES purchase_orders(id) ON DELETE CASCADE,
+        po_number TEXT NOT NULL,
+        reasons TEXT[] NOT NULL,
+        fields JSONB NOT NULL DEFAULT '{}'::jsonb,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
+    ALTER SEQUENCE po_alerts_id_seq OWNED BY po_alerts.id;
+    CREATE TABLE po_alerts_default PARTITION OF po_alerts DEFAULT;
+
+    SELECT MIN(created_at) INTO oldest FROM po_alerts_unpartitioned;
+    month_cursor := date_trunc('month', COALESCE(oldest, NOW()) AT TIME ZONE 'UTC')::date;
+    WHILE month_cursor <= date_trunc('month', NOW() AT TIME ZONE 'UTC')::date LOOP
+        PERFORM create_monthly_partition('po_alerts', month_cursor);
+        month_cursor := (month_cursor + INTERVAL '1 month')::date;
+    END LOOP;
+
+    INSERT INTO po_alerts (id, purchase_order_id, po_number, reasons, fields, created_at)
+    SELECT id, purchase_order_id, po_number, reasons, fields, created_at
+    FROM po_alerts_unpartitioned;
+    DROP TABLE po_alerts_unpartitioned;
+END;
+$$;
+
+-- Partitioned indexes; every existing and future partition gets its own copy.
+CREATE INDEX IF NOT EXISTS purchase_order_run_state_history_run_idx
+    ON purchase_order_run_state_history (purchase_order_run_id, changed_at);
+
+CREATE INDEX IF NOT EXISTS purchase_order_run_state_history_changed_idx
+    ON purchase_order_run_state_history (changed_at, id);
+
+-- Latest alert per PO (03_needs_attention.sql) without touching the heap.
+CREATE INDEX IF NOT EXISTS po_alerts_po_number_created_idx
+    ON po_alerts (po_number, created_at DESC)
+    INCLUDE (reasons);
+
+CREATE INDEX IF NOT EXISTS po_alerts_purchase_order_idx
+    ON po_alerts (purchase_order_id);
+
+-- Current month plus three ahead; retention is left to 06_partition_retention.sql.
+SELECT * FROM maintain_workflow_partitions(NULL, 3);
+
+INSERT INTO schema_versions (component, version) VALUES ('workflow_storage', 1)
+ON CONFLICT (component) DO UPDATE
+SET version = EXCLUDED.version,
+    applied_at = NOW();
+
+COMMIT;
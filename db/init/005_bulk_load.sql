@@ -0,0 +1,241 @@
+-- Set-based counterpart of upsert_purchase_order + the runner's alert insert,
+-- used by src/load_parsed.py. The loader COPYs one batch of parsed payloads
+-- into the session's po_stage table and calls merge_staged_purchase_orders()
+-- in the same transaction. Results match calling upsert_purchase_order (and
+-- inserting an alert when it reports a change) once per staged row in seq
+-- order: a PO staged several times is merged in that many rounds.
+-- Keep the column mapping in sync with upsert_purchase_order in 001_schema.sql.
+
+CREATE TABLE IF NOT EXISTS schema_versions (
+    component TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION create_purchase_order_stage()
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    CREATE TEMP TABLE IF NOT EXISTS po_stage (
+        seq BIGINT NOT NULL,
+        payload JSONB NOT NULL,
+        reasons TEXT[] NOT NULL DEFAULT '{}'
+    ) ON COMMIT DELETE ROWS;
+
+    CREATE TEMP TABLE IF NOT EXISTS po_merge_work (
+        po_number TEXT PRIMARY KEY,
+        payload JSONB NOT NULL,
+        payload_hash BYTEA NOT NULL,
+        reasons TEXT[] NOT NULL,
+        po_id BIGINT,
+        existed BOOLEAN NOT NULL DEFAULT FALSE,
+        changed BOOLEAN NOT NULL DEFAULT TRUE
+    ) ON COMMIT DELETE ROWS;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION merge_staged_purchase_orders(
+    OUT inserted BIGINT,
+    OUT updated BIGINT,
+    OUT unchanged BIGINT,
+    OUT alerts BIGINT
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    rounds INTEGER;
+    step BIGINT;
+BEGIN
+    inserted := 0;
+    updated := 0;
+    unchanged := 0;
+    alerts := 0;
+
+    SELECT COALESCE(MAX(occurrences), 0) INTO rounds
+    FROM (
+        SELECT COUNT(*) AS occurrences
+        FROM po_stage
+        GROUP BY payload #>> '{purchase_order,po_number}'
+    ) per_po;
+
+    FOR round_no IN 1..rounds LOOP
+        TRUNCATE po_merge_work;
+
+        INSERT INTO po_merge_work (po_number, payload, payload_hash, reasons)
+        SELECT s.po_number, s.payload, sha256(convert_to(s.payload::text, 'UTF8')), s.reasons
+        FROM (
+            SELECT
+                payload #>> '{purchase_order,po_number}' AS po_number,
+                payload,
+                reasons,
+                row_number() OVER (PARTITION BY payload #>> '{purchase_order,po_number}' ORDER BY seq) AS occurrence
+            FROM po_stage
+        ) s
+        WHERE s.occurrence = round_no;
+
+        UPDATE po_merge_work w
+        SET
+            po_id = po.id,
+            existed = TRUE,
+            changed = po.payload_hash IS DISTINCT FROM w.payload_hash
+        FROM purchase_orders po
+        WHERE po.po_number = w.po_number;
+
+        WITH upserted AS (
+            INSERT INTO purchase_orders (
+                po_number,
+                vendor,
+                ship_to_name,
+                ship_to_address,
+                order_date,
+                due_date,
+                payment_terms,
+                subtotal,
+                tax_rate,
+                tax_amount,
+                shipping_amount,
+                total_amount,
+                subject,
+                sender_email,
+                recipient_email,
+                email_date,
+                is_urgent,
+                notes,
+                contact_name,
+                contact_title,
+                contact_company,
+                contact_phone,
+                contact_email,
+                raw_payload,
+                payload_hash
+            )
+            SELECT
+                w.po_number,
+                w.payload #>> '{purchase_order,vendor}',
+                w.payload #>> '{purchase_order,ship_to,name}',
+                w.payload #>> '{purchase_order,ship_to,full}',
+                NULLIF(w.payload #>> '{purchase_order,order_date}', '')::date,
+                NULLIF(w.payload #>> '{purchase_order,due_date}', '')::date,
+                w.payload #>> '{purchase_order,payment_terms}',
+                NULLIF(w.payload #>> '{purchase_order,totals,subtotal}', '')::numeric,
+                w.payload #>> '{purchase_order,totals,tax,rate}',
+                NULLIF(w.payload #>> '{purchase_order,totals,tax,amount}', '')::numeric,
+                NULLIF(w.payload #>> '{purchase_order,totals,shipping}', '')::numeric,
+                NULLIF(w.payload #>> '{purchase_order,totals,total}', '')::numeric,
+                w.payload #>> '{email,subject}',
+                w.payload #>> '{email,from}',
+                w.payload #>> '{email,to}',
+                w.payload #>> '{email,date}',
+                POSITION('urgent' IN LOWER(COALESCE(w.payload #>> '{email,subject}', ''))) > 0,
+                COALESCE(ARRAY(SELECT jsonb_array_elements_text(w.payload #> '{purchase_order,notes}')), '{}'),
+                w.payload #>> '{purchase_order,contact,name}',
+                w.payload #>> '{purchase_order,contact,title}',
+                w.payload #>> '{purchase_order,contact,company}',
+                w.payload #>> '{purchase_order,contact,phone}',
+                w.payload #>> '{purchase_order,contact,email}',
+                w.payload,
+                w.payload_hash
+            FROM po_merge_work w
+            WHERE w.changed
+            ON CONFLICT (po_number) DO UPDATE
+            SET
+                vendor = EXCLUDED.vendor,
+                ship_to_name = EXCLUDED.ship_to_name,
+                ship_to_address = EXCLUDED.ship_to_address,
+                order_date = EXCLUDED.order_date,
+                due_date = EXCLUDED.due_date,
+                payment_terms = EXCLUDED.payment_terms,
+                subtotal = EXCLUDED.subtotal,
+                tax_rate = EXCLUDED.tax_rate,
+                tax_amount = EXCLUDED.tax_amount,
+                shipping_amount = EXCLUDED.shipping_amount,
+                total_amount = EXCLUDED.total_amount,
+                subject = EXCLUDED.subject,
+                sender_email = EXCLUDED.sender_email,
+                recipient_email = EXCLUDED.recipient_email,
+                email_date = EXCLUDED.email_date,
+                is_urgent = EXCLUDED.is_urgent,
+                notes = EXCLUDED.notes,
+                contact_name = EXCLUDED.contact_name,
+                contact_title = EXCLUDED.contact_title,
+                contact_company = EXCLUDED.contact_company,
+                contact_phone = EXCLUDED.contact_phone,
+                contact_email = EXCLUDED.contact_email,
+                raw_payload = EXCLUDED.raw_payload,
+                payload_hash = EXCLUDED.payload_hash
+            RETURNING id, po_number
+        )
+        UPDATE po_merge_work w
+        SET po_id = u.id
+        FROM upserted u
+        WHERE w.po_number = u.po_number;
+
+        DELETE FROM purchase_order_line_items li
+        USING po_merge_work w
+        WHERE w.changed
+          AND li.purchase_order_id = w.po_id
+          AND NOT EXISTS (
+              SELECT 1
+              FROM jsonb_array_elements(COALESCE(w.payload #> '{purchase_order,line_items}', '[]'::jsonb)) item
+              WHERE (item->>'item_no')::int = li.item_no
+          );
+
+        INSERT INTO purchase_order_line_items (
+            purchase_order_id,
+            item_no,
+            description,
+            qty,
+            unit_price,
+            line_total
+        )
+        SELECT
+            w.po_id,
+            (item->>'item_no')::int,
+            item->>'description',
+            (item->>'qty')::int,
+            (item->>'unit_price')::numeric,
+            (item->>'total')::numeric
+        FROM po_merge_work w
+        CROSS JOIN LATERAL jsonb_array_elements(COALESCE(w.payload #> '{purchase_order,line_items}', '[]'::jsonb)) item
+        WHERE w.changed
+        ON CONFLICT (purchase_order_id, item_no) DO UPDATE
+        SET
+            description = EXCLUDED.description,
+            qty = EXCLUDED.qty,
+            unit_price = EXCLUDED.unit_price,
+            line_total = EXCLUDED.line_total
+        WHERE (
+            purchase_order_line_items.description,
+            purchase_order_line_items.qty,
+            purchase_order_line_items.unit_price,
+            purchase_order_line_items.line_total
+        ) IS DISTINCT FROM (
+            EXCLUDED.description,
+            EXCLUDED.qty,
+            EXCLUDED.unit_price,
+            EXCLUDED.line_total
+        );
+
+        INSERT INTO po_alerts (purchase_order_id, po_number, reasons, fields)
+        SELECT w.po_id, w.po_number, w.reasons, w.payload
+        FROM po_merge_work w
+        WHERE w.changed
+          AND cardinality(w.reasons) > 0;
+        GET DIAGNOSTICS step = ROW_COUNT;
+        alerts := alerts + step;
+
+        SELECT
+            inserted + COUNT(*) FILTER (WHERE w.changed AND NOT w.existed),
+            updated + COUNT(*) FILTER (WHERE w.changed AND w.existed),
+            unchanged + COUNT(*) FILTER (WHERE NOT w.changed)
+        INTO inserted, updated, unchanged
+        FROM po_merge_work w;
+    END LOOP;
+END;
+$$;
+
+INSERT INTO schema_versions (component, version) VALUES ('bulk_load', 2)
+ON CONFLICT (component) DO UPDATE
+SET version = EXCLUDED.version,
+    applied_at = NOW();
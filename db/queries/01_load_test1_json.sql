@@ -1,3 +1,4 @@
-SELECT upsert_purchase_order(
+SELECT po_id AS purchase_order_id, changed
+FROM upsert_purchase_order(
     pg_read_file('/work/tests/attention_suite/parsed/no_flags.json')::jsonb
-) AS purchase_order_id;
+);
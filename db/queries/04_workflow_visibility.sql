@@ -8,20 +8,33 @@ FROM workflow_runs wr
 ORDER BY wr.id DESC
 LIMIT 10;
 
+-- Counts only for the ten newest runs; each lateral probe is an index-only
+-- scan of purchase_order_runs_workflow_state_idx.
 SELECT
     wr.id,
     wr.state,
     wr.started_at,
     wr.finished_at,
-    COUNT(*) FILTER (WHERE por.state = 'PENDING') AS pending_tasks,
-    COUNT(*) FILTER (WHERE por.state = 'RUNNING') AS running_tasks,
-    COUNT(*) FILTER (WHERE por.state = 'SUCCESS') AS success_tasks,
-    COUNT(*) FILTER (WHERE por.state = 'FAILED') AS failed_tasks
-FROM workflow_runs wr
-LEFT JOIN purchase_order_runs por ON por.workflow_run_id = wr.id
-GROUP BY wr.id, wr.state, wr.started_at, wr.finished_at
-ORDER BY wr.id DESC
-LIMIT 10;
+    counts.pending_tasks,
+    counts.running_tasks,
+    counts.success_tasks,
+    counts.failed_tasks
+FROM (
+    SELECT id, state, started_at, finished_at
+    FROM workflow_runs
+    ORDER BY id DESC
+    LIMIT 10
+) wr
+CROSS JOIN LATERAL (
+    SELECT
+        COUNT(*) FILTER (WHERE por.state = 'PENDING') AS pending_tasks,
+        COUNT(*) FILTER (WHERE por.state = 'RUNNING') AS running_tasks,
+        COUNT(*) FILTER (WHERE por.state = 'SUCCESS') AS success_tasks,
+        COUNT(*) FILTER (WHERE por.state = 'FAILED') AS failed_tasks
+    FROM purchase_order_runs por
+    WHERE por.workflow_run_id = wr.id
+) counts
+ORDER BY wr.id DESC;
 
 SELECT
     wr.id,
@@ -47,7 +60,9 @@ SELECT
     por.test_name,
     por.po_number,
     por.state,
-    por.updated_at
+    por.updated_at,
+    por.lease_owner,
+    por.lease_expires_at
 FROM purchase_order_runs por
 WHERE por.state = 'RUNNING'
 ORDER BY por.updated_at DESC;
@@ -72,5 +87,5 @@ SELECT
     h.changed_at,
     h.error_message
 FROM purchase_order_run_state_history h
-ORDER BY h.id DESC
+ORDER BY h.changed_at DESC, h.id DESC
 LIMIT 100;
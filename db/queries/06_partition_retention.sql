@@ -0,0 +1,18 @@
+-- Partition upkeep for purchase_order_run_state_history and po_alerts.
+-- Run on a schedule (e.g. nightly):
+--   docker compose run --rm dbcli -f /work/db/queries/06_partition_retention.sql
+-- Keeps the current month plus 12 whole months, pre-creates 3 months ahead,
+-- and lists every partition it created or dropped.
+SELECT *
+FROM maintain_workflow_partitions(p_keep_months => 12, p_months_ahead => 3);
+
+SELECT
+    parent.relname AS table_name,
+    child.relname AS partition_name,
+    pg_get_expr(child.relpartbound, child.oid) AS bounds,
+    child.reltuples::bigint AS approx_rows
+FROM pg_inherits i
+JOIN pg_class parent ON parent.oid = i.inhparent
+JOIN pg_class child ON child.oid = i.inhrelid
+WHERE parent.relname IN ('purchase_order_run_state_history', 'po_alerts')
+ORDER BY parent.relname, child.relname;
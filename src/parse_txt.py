@@ -1,8 +1,24 @@
 import argparse
+import collections
+import functools
+import glob
+import gzip
+import io
+import itertools
 import json
+import math
+import multiprocessing
+import os
 import re
+import signal
+import sys
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
 
 try:
     from pypdf import PdfReader  # type: ignore
@@ -25,6 +41,7 @@ TOTAL_PATTERN = re.compile(
 )
 PHONE_PATTERN = re.compile(r"\(?\d{3}\)?[-.\s]\d{3}[-.\s]\d{4}|\(\d{3}\)\s*\d{3}-\d{4}")
 EMAIL_PATTERN = re.compile(r"[^@\s]+@[^@\s]+\.[^@\s]+")
+INPUT_SUFFIXES = (".txt", ".pdf")
 
 
 def to_float(value: str) -> float:
@@ -61,8 +78,8 @@ def parse_email_headers(lines: list[str]) -> tuple[dict[str, str], int]:
     return headers, idx
 
 
-def parse_po_fields(lines: list[str]) -> dict[str, Any]:
-    po: dict[str, Any] = {
+def empty_po_fields() -> dict[str, Any]:
+    return {
         "po_number": None,
         "vendor": None,
         "ship_to": {"name": None, "address_lines": [], "full": None},
@@ -70,6 +87,10 @@ def parse_po_fields(lines: list[str]) -> dict[str, Any]:
         "due_date": None,
         "payment_terms": None,
     }
+
+
+def parse_po_fields(lines: list[str]) -> dict[str, Any]:
+    po = empty_po_fields()
     idx = 0
     while idx < len(lines):
         raw = lines[idx].strip()
@@ -183,7 +204,18 @@ def parse_notes_and_signoff(lines: list[str]) -> tuple[list[str], dict[str, Any]
 
     notes = [line.strip() for line in lines[:thank_you_index] if line.strip()]
     closing = [line.strip() for line in lines[thank_you_index + 1 :] if line.strip()]
-    signoff["raw_lines"] = closing
+    return notes, build_signoff(closing)
+
+
+def build_signoff(closing: list[str]) -> dict[str, Any]:
+    signoff: dict[str, Any] = {
+        "name": None,
+        "title": None,
+        "company": None,
+        "phone": None,
+        "email": None,
+        "raw_lines": closing,
+    }
 
     if closing:
         signoff["name"] = closing[0]
@@ -202,11 +234,14 @@ def parse_notes_and_signoff(lines: list[str]) -> tuple[list[str], dict[str, Any]
             if email_match:
                 signoff["email"] = email_match.group(0)
 
-    return notes, signoff
+    return signoff
+
 
+def parse_purchase_order_text_legacy(text: str) -> dict[str, Any]:
+    return parse_purchase_order_lines_legacy(text.splitlines())
 
-def parse_purchase_order_text(text: str) -> dict[str, Any]:
-    lines = text.splitlines()
+
+def parse_purchase_order_lines_legacy(lines: list[str]) -> dict[str, Any]:
     headers, body_start = parse_email_headers(lines)
 
     po_start = find_line(lines, "PURCHASE ORDER")
@@ -249,17 +284,298 @@ def parse_purchase_order_text(text: str) -> dict[str, Any]:
     }
 
 
-def extract_text_from_pdf(path: Path) -> str:
+# Section markers in the order a well-formed PO presents them.
+SECTION_MARKERS = {"purchase order": 1, "line items": 2, "notes:": 3}
+SECTION_MARKER_LENGTHS = {len(marker) for marker in SECTION_MARKERS}
+PO_FIELD_PREFIXES = (
+    ("PO Number:", "po_number"),
+    ("Vendor:", "vendor"),
+    ("Order Date:", "order_date"),
+    ("Due Date:", "due_date"),
+    ("Payment Terms:", "payment_terms"),
+)
+SHIP_TO_STOP_PREFIXES = ("Order Date:", "Due Date:", "Payment Terms:")
+
+_INTRO, _PO_FIELDS, _LINE_ITEMS, _NOTES = range(4)
+
+
+def _close_ship_to(ship_to: dict[str, Any]) -> None:
+    ship_to["full"] = ", ".join([part for part in [ship_to["name"], *ship_to["address_lines"]] if part])
+
+
+def parse_line_item_rows(rows: list[str]) -> list[dict[str, Any]]:
+    """``parse_line_items`` for rows that are already stripped and start with a digit.
+
+    Most rows are split with ``str`` methods: the item number, the description
+    and the last three whitespace-separated tokens, which is cheaper than a
+    ``LINE_ITEM_PATTERN`` match. A row whose tokens are not plainly well formed
+    goes through the pattern instead, so the items are the same as
+    ``parse_line_items`` would return.
+    """
+    items: list[dict[str, Any]] = []
+    append = items.append
+    for row in rows:
+        parts = row.rsplit(None, 3)
+        if len(parts) == 4:
+            head, qty, unit_price, total = parts
+            item = head.split(None, 1)
+            qty_digits = qty.replace(",", "")
+            unit_digits = unit_price.removeprefix("$").replace(",", "")
+            total_digits = total.removeprefix("$").replace(",", "")
+            # Two digits after the dot before and after dropping commas, one dot, a digit before it.
+            if (
+                len(item) == 2
+                and item[0].isdecimal()
+                and qty_digits.isdecimal()
+                and unit_price[-3:-2] == unit_digits[-3:-2] == "."
+                and len(unit_digits) > 3
+                and unit_digits.replace(".", "", 1).isdecimal()
+                and total[-3:-2] == total_digits[-3:-2] == "."
+                and len(total_digits) > 3
+                and total_digits.replace(".", "", 1).isdecimal()
+            ):
+                append(
+                    {
+                        "item_no": int(item[0]),
+                        "description": item[1],
+                        "qty": int(qty_digits),
+                        "unit_price": float(unit_digits),
+                        "total": float(total_digits),
+                    }
+                )
+                continue
+        match = LINE_ITEM_PATTERN.match(row)
+        if match is None:
+            continue
+        item_no, description, qty, unit_price, total = match.groups()
+        append(
+            {
+                "item_no": int(item_no),
+                "description": description.strip(),
+                "qty": to_int(qty),
+                "unit_price": to_float(unit_price),
+                "total": to_float(total),
+            }
+        )
+    return items
+
+
+def parse_purchase_order_lines(
+    lines: Iterable[str], on_signoff: Callable[[], None] | None = None
+) -> dict[str, Any]:
+    """Single-pass parser: every line is stripped and classified exactly once.
+
+    Header labels are collected up to the first blank line, then each section
+    (PURCHASE ORDER, LINE ITEMS, Notes:) begins at the first occurrence of its
+    marker. A marker only opens a section that comes after the current one; a
+    repeated or out-of-order marker is an ordinary line of the current section.
+    For documents whose markers are in order this is the same result as
+    ``parse_purchase_order_lines_legacy``.
+
+    ``on_signoff`` is called when the "Thank you" sign-off line is reached, so
+    a lazy line source can stop producing input soon after.
+    """
+    headers: dict[str, str] = {}
+    intro: list[str] = []
+    po = empty_po_fields()
+    ship_to: dict[str, Any] | None = None
+    item_rows: list[str] = []
+    totals: dict[str, Any] = {
+        "subtotal": None,
+        "tax": {"rate": None, "amount": None},
+        "shipping": None,
+        "total": None,
+    }
+    notes: list[str] = []
+    closing: list[str] | None = None
+    found: set[int] = set()
+    section = 0
+    state = _INTRO
+    in_headers = True
+
+    for line in lines:
+        candidate = line.strip()
+        if not candidate:
+            in_headers = False
+            continue
+        if in_headers:
+            match = LABEL_PATTERN.match(candidate)
+            if match:
+                headers[normalize_key(match.group("label"))] = match.group("value").strip()
+
+        # Markers never start with a digit, so item rows skip the marker check.
+        if state == _LINE_ITEMS and candidate[0].isdigit():
+            item_rows.append(candidate)
+            continue
+        if len(candidate) in SECTION_MARKER_LENGTHS:
+            rank = SECTION_MARKERS.get(candidate.lower())
+            if rank is not None and rank > section:
+                found.add(rank)
+                section = rank
+                state = _INTRO + rank
+                if ship_to is not None:
+                    _close_ship_to(ship_to)
+                    ship_to = None
+                continue
+
+        if state == _LINE_ITEMS:
+            match = TOTAL_PATTERN.match(candidate)
+            if match is None:
+                continue
+            label = match.group("label").lower()
+            amount = to_float(match.group("amount"))
+            if label.startswith("subtotal"):
+                totals["subtotal"] = amount
+            elif label.startswith("shipping"):
+                totals["shipping"] = amount
+            elif label.startswith("total"):
+                totals["total"] = amount
+            elif label.startswith("tax"):
+                totals["tax"]["amount"] = amount
+                totals["tax"]["rate"] = match.group("tax_rate")
+        elif state == _INTRO:
+            if not in_headers:
+                intro.append(candidate)
+        elif state == _NOTES:
+            if closing is not None:
+                closing.append(candidate)
+            elif candidate[:9].lower() == "thank you":
+                closing = []
+                if on_signoff is not None:
+                    on_signoff()
+            else:
+                notes.append(candidate)
+        else:
+            if ship_to is not None:
+                if not candidate.startswith(SHIP_TO_STOP_PREFIXES) and not LABEL_PATTERN.match(candidate):
+                    ship_to["address_lines"].append(candidate)
+                    continue
+                _close_ship_to(ship_to)
+                ship_to = None
+            if candidate.startswith("Ship To:"):
+                ship_to = {"name": candidate.split(":", 1)[1].strip() or None, "address_lines": [], "full": None}
+                po["ship_to"] = ship_to
+                continue
+            for prefix, key in PO_FIELD_PREFIXES:
+                if candidate.startswith(prefix):
+                    po[key] = candidate.split(":", 1)[1].strip()
+                    break
+
+    if ship_to is not None:
+        _close_ship_to(ship_to)
+    has_line_items = 2 in found
+    has_notes = 3 in found
+    if not (1 in found and has_line_items):
+        po = empty_po_fields()
+    if has_line_items and has_notes:
+        items = parse_line_item_rows(item_rows)
+    else:
+        items = []
+        totals = {"subtotal": None, "tax": {"rate": None, "amount": None}, "shipping": None, "total": None}
+
+    return {
+        "email": headers,
+        "message_intro": intro if 1 in found else [],
+        "purchase_order": {
+            **po,
+            "line_items": items,
+            "totals": totals,
+            "notes": notes,
+            "contact": build_signoff(closing or []),
+        },
+    }
+
+
+PARSER_ENGINES = {
+    "single-pass": parse_purchase_order_lines,
+    "legacy": parse_purchase_order_lines_legacy,
+}
+DEFAULT_PARSER_ENGINE = "single-pass"
+
+
+def resolve_parser_engine(engine: str | None = None) -> str:
+    engine = engine or os.getenv("PO_PARSER_ENGINE", DEFAULT_PARSER_ENGINE)
+    if engine not in PARSER_ENGINES:
+        raise ValueError(f"Unknown parser engine {engine!r}; expected one of {sorted(PARSER_ENGINES)}")
+    return engine
+
+
+def parse_purchase_order_text(text: str, engine: str | None = None) -> dict[str, Any]:
+    return PARSER_ENGINES[resolve_parser_engine(engine)](text.splitlines())
+
+
+def parse_purchase_order_stream(
+    lines: Iterable[str],
+    engine: str | None = None,
+    on_signoff: Callable[[], None] | None = None,
+) -> dict[str, Any]:
+    """Parse lines as they are produced; only the single-pass engine reports the sign-off."""
+    engine = resolve_parser_engine(engine)
+    if engine == "single-pass":
+        return parse_purchase_order_lines(lines, on_signoff=on_signoff)
+    return PARSER_ENGINES[engine](list(lines))
+
+
+def extract_text_from_pdf(path: Path | io.BytesIO) -> str:
     if PdfReader is None:
         raise RuntimeError("PDF input requires pypdf. Install with: pip install pypdf")
 
-    reader = PdfReader(str(path))
+    reader = PdfReader(path if isinstance(path, io.BytesIO) else str(path))
     pages: list[str] = []
     for page in reader.pages:
         pages.append(page.extract_text() or "")
     return "\n".join(pages)
 
 
+class PdfLineSource:
+    """Lines of a PDF's text, extracted one page at a time as they are consumed.
+
+    Yields exactly the lines of ``extract_text_from_pdf(...).splitlines()``, but
+    a page is only extracted once the parser reaches it. After
+    ``stop_after_next_page`` (the parser's sign-off hook) one more page is
+    read, because the closing block under "Thank you" can continue there, and
+    then no further pages, so trailing terms-and-conditions pages cost
+    nothing. At most ``max_pages`` pages are read (default: PDF_MAX_PAGES env
+    or 100; 0 means no limit).
+    """
+
+    def __init__(self, source: Path | io.BytesIO, max_pages: int | None = None) -> None:
+        if PdfReader is None:
+            raise RuntimeError("PDF input requires pypdf. Install with: pip install pypdf")
+        self._reader = PdfReader(source if isinstance(source, io.BytesIO) else str(source))
+        self.page_count = len(self._reader.pages)
+        self.max_pages = int(os.getenv("PDF_MAX_PAGES", "100")) if max_pages is None else max_pages
+        self.pages_read = 0
+        self._page_texts: list[str] = []
+        self._stop_before: int | None = None
+
+    def stop_after_next_page(self) -> None:
+        if self._stop_before is None:
+            self._stop_before = self.pages_read + 1
+
+    def text(self) -> str:
+        """Text of the pages read so far, joined like ``extract_text_from_pdf``."""
+        return "\n".join(self._page_texts)
+
+    def __iter__(self) -> Iterator[str]:
+        limit = self.page_count if self.max_pages <= 0 else min(self.page_count, self.max_pages)
+        for index in range(limit):
+            if self._stop_before is not None and index >= self._stop_before:
+                return
+            page_text = self._reader.pages[index].extract_text() or ""
+            self._page_texts.append(page_text)
+            self.pages_read += 1
+            # A page followed by the "\n" join separator splits exactly as it would inside the joined text.
+            yield from (page_text if index == self.page_count - 1 else page_text + "\n").splitlines()
+
+
+def parse_pdf(
+    source: Path | io.BytesIO, engine: str | None = None, max_pages: int | None = None
+) -> tuple[dict[str, Any], PdfLineSource]:
+    pdf = PdfLineSource(source, max_pages=max_pages)
+    return parse_purchase_order_stream(pdf, engine=engine, on_signoff=pdf.stop_after_next_page), pdf
+
+
 def load_input_text(path: Path) -> str:
     suffix = path.suffix.lower()
     if suffix == ".pdf":
@@ -267,6 +583,161 @@ def load_input_text(path: Path) -> str:
     return path.read_text(encoding="utf-8", errors="replace")
 
 
+def decode_input_bytes(data: bytes, suffix: str) -> str:
+    # Same result as load_input_text for a file whose content is `data`.
+    if suffix.lower() == ".pdf":
+        return extract_text_from_pdf(io.BytesIO(data))
+    text = data.decode("utf-8", errors="replace")
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def parse_input_file(path: Path, engine: str | None = None, max_pages: int | None = None) -> dict[str, Any]:
+    if path.suffix.lower() == ".pdf":
+        return parse_pdf(path, engine=engine, max_pages=max_pages)[0]
+    return parse_purchase_order_text(load_input_text(path), engine=engine)
+
+
+def ndjson_record(path: Path, parsed: dict[str, Any] | None = None, error: str | None = None) -> str:
+    record: dict[str, Any] = {"path": str(path)}
+    if error is not None:
+        record["error"] = error
+    else:
+        record["parsed"] = parsed
+    return json.dumps(record, separators=(",", ":"))
+
+
+def parse_input_file_to_ndjson(path: Path, engine: str | None = None, max_pages: int | None = None) -> str:
+    # Serialized in the worker so the writer only copies lines.
+    return ndjson_record(path, parse_input_file(path, engine=engine, max_pages=max_pages))
+
+
+def _parse_farm_task(worker: Callable[[Path], Any], path: Path) -> tuple[Any, str | None]:
+    try:
+        return worker(path), None
+    except Exception as exc:  # noqa: BLE001
+        return None, str(exc) or type(exc).__name__
+
+
+def _register_farm_worker(worker_pids: Any) -> None:
+    worker_pids.put(os.getpid())
+
+
+def _stop_farm_workers(worker_pids: Any) -> None:
+    # The executor cannot stop a busy worker. Once one worker is killed the
+    # pool is broken and the executor shuts down the rest itself.
+    while not worker_pids.empty():
+        try:
+            os.kill(worker_pids.get(), signal.SIGTERM)
+        except OSError:
+            pass
+
+
+def parse_in_processes(
+    paths: Iterable[Path],
+    procs: int,
+    worker: Callable[[Path], Any] = parse_input_file,
+    timeout: float | None = None,
+) -> Iterator[tuple[Path, Any, str | None]]:
+    """Run ``worker`` over ``paths`` on ``procs`` processes, yielding ``(path, result, error)`` as files finish.
+
+    PDF extraction and parsing are CPU-bound, so this is how a batch uses more
+    than one core. A worker exception, or a result that cannot be sent back
+    from the worker, comes back as ``error`` for that file. A file that runs
+    longer than ``timeout`` seconds (default: PARSE_TIMEOUT_SECONDS env or
+    120; 0 disables) is reported as timed out. The pool is then replaced,
+    because that is the only way to stop a stuck worker, and the other files
+    that were in flight are resubmitted. At most ``procs`` files are in
+    flight, so each deadline starts close to when its file actually starts
+    parsing.
+
+    If a worker process dies (crash, OOM kill), the pool breaks and the files
+    it may have held are re-run one at a time; the one that kills its worker
+    on its own is reported as an error. Every input is yielded exactly once.
+    """
+    if timeout is None:
+        timeout = float(os.getenv("PARSE_TIMEOUT_SECONDS", "120"))
+    procs = max(1, procs)
+    pending = iter(paths)
+    retry: collections.deque[Path] = collections.deque()
+    suspects: set[Path] = set()
+    in_flight: dict[Future[tuple[Any, str | None]], tuple[Path, float]] = {}
+    context = multiprocessing.get_context()
+
+    def start_pool() -> tuple[ProcessPoolExecutor, Any]:
+        worker_pids = context.SimpleQueue()
+        executor = ProcessPoolExecutor(
+            procs, mp_context=context, initializer=_register_farm_worker, initargs=(worker_pids,)
+        )
+        return executor, worker_pids
+
+    pool, worker_pids = start_pool()
+
+    def submit(path: Path) -> None:
+        future = pool.submit(_parse_farm_task, worker, path)
+        in_flight[future] = (path, time.monotonic() + timeout if timeout else math.inf)
+
+    def restart() -> None:
+        nonlocal pool, worker_pids
+        _stop_farm_workers(worker_pids)
+        pool.shutdown(wait=False, cancel_futures=True)
+        pool, worker_pids = start_pool()
+        # Resubmitted ahead of new inputs; the old pool's futures are dropped.
+        retry.extendleft(reversed([path for path, _ in in_flight.values()]))
+        in_flight.clear()
+
+    try:
+        while True:
+            # While a dead worker's file is unknown, suspects run alone.
+            capacity = 1 if suspects else procs
+            while len(in_flight) < capacity:
+                path = retry.popleft() if retry else next(pending, None)
+                if path is None:
+                    break
+                submit(path)
+            if not in_flight:
+                break
+            next_deadline = min(deadline for _, deadline in in_flight.values())
+            wait_seconds = None if next_deadline == math.inf else max(next_deadline - time.monotonic(), 0)
+            done, _ = wait(in_flight, timeout=wait_seconds, return_when=FIRST_COMPLETED)
+            if not done:
+                now = time.monotonic()
+                expired = [future for future, (_, deadline) in in_flight.items() if deadline <= now]
+                for future in expired:
+                    path, _ = in_flight.pop(future)
+                    suspects.discard(path)
+                    yield path, None, f"parse timed out after {timeout:g}s"
+                if expired:
+                    restart()
+                continue
+            broken = False
+            for future in done:
+                exc = future.exception()
+                if isinstance(exc, BrokenProcessPool):
+                    broken = True
+                    continue
+                path, _ = in_flight.pop(future)
+                suspects.discard(path)
+                if exc is not None:
+                    # Raised outside the worker function, e.g. a result that does not pickle.
+                    yield path, None, str(exc) or type(exc).__name__
+                else:
+                    result, error = future.result()
+                    yield path, result, error
+            if broken:
+                if suspects and len(in_flight) == 1:
+                    path, _ = next(iter(in_flight.values()))
+                    in_flight.clear()
+                    suspects.discard(path)
+                    yield path, None, "parse worker died"
+                else:
+                    suspects.update(path for path, _ in in_flight.values())
+                restart()
+    finally:
+        if in_flight:
+            _stop_farm_workers(worker_pids)
+        pool.shutdown(wait=not in_flight, cancel_futures=True)
+
+
 def default_input_path() -> Path:
     root = Path(__file__).resolve().parent.parent
     preferred = [root / "text1.txt", root / "tests" / "test1" / "test1.txt"]
@@ -276,31 +747,176 @@ def default_input_path() -> Path:
     return preferred[0]
 
 
+def iter_input_paths(specs: Iterable[str]) -> Iterator[Path]:
+    """Expand CLI inputs lazily: files, directories (searched recursively for
+    .txt/.pdf), glob patterns, and ``-`` for one path per line on stdin."""
+    for spec in specs:
+        if spec == "-":
+            for line in sys.stdin:
+                if line.strip():
+                    yield Path(line.strip())
+            continue
+        path = Path(spec)
+        if path.is_dir():
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(INPUT_SUFFIXES):
+                        yield Path(root, name)
+        elif any(char in spec for char in "*?["):
+            for match in sorted(glob.iglob(spec, recursive=True)):
+                if os.path.isfile(match):
+                    yield Path(match)
+        else:
+            yield path
+
+
+@contextmanager
+def open_ndjson_output(output: str | None, compress: bool = False) -> Iterator[IO[str]]:
+    """Text handle for NDJSON: stdout for None/``-``, gzip for ``--gzip`` or a ``.gz`` path."""
+    if output in (None, "-"):
+        if not compress:
+            yield sys.stdout
+            sys.stdout.flush()
+            return
+        with io.TextIOWrapper(gzip.GzipFile(fileobj=sys.stdout.buffer, mode="wb"), encoding="utf-8") as handle:
+            yield handle
+        sys.stdout.buffer.flush()
+        return
+    if compress or output.endswith(".gz"):
+        with gzip.open(output, "wt", encoding="utf-8") as handle:
+            yield handle
+    else:
+        with open(output, "w", encoding="utf-8") as handle:
+            yield handle
+
+
+def write_ndjson(
+    paths: Iterable[Path],
+    output: str | None = None,
+    compress: bool = False,
+    parse_procs: int = 1,
+    engine: str | None = None,
+    max_pages: int | None = None,
+) -> tuple[int, int]:
+    """Stream one ``{"path", "parsed"|"error"}`` line per input; returns (parsed, failed) counts.
+
+    With ``parse_procs > 1`` lines are written in completion order.
+    """
+    worker = functools.partial(parse_input_file_to_ndjson, engine=engine, max_pages=max_pages)
+    if parse_procs > 1:
+        results = parse_in_processes(paths, parse_procs, worker=worker)
+    else:
+        results = (_parse_inline(worker, path) for path in paths)
+    parsed = failed = 0
+    with open_ndjson_output(output, compress) as handle:
+        for path, line, error in results:
+            if error is not None:
+                failed += 1
+                line = ndjson_record(path, error=error)
+            else:
+                parsed += 1
+            handle.write(line)
+            handle.write("\n")
+    return parsed, failed
+
+
+def _parse_inline(worker: Callable[[Path], str], path: Path) -> tuple[Path, str | None, str | None]:
+    try:
+        return path, worker(path), None
+    except Exception as exc:  # noqa: BLE001
+        return path, None, str(exc) or type(exc).__name__
+
+
+def write_parsed_json(input_path: Path, parsed: dict[str, Any], output: str | None = None) -> Path:
+    output_path = Path(output) if output else input_path.parent / f"{input_path.stem}.json"
+    output_path.write_text(json.dumps(parsed, indent=2), encoding="utf-8")
+    return output_path
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Parse purchase-order text into JSON.")
     parser.add_argument(
-        "input_path",
-        nargs="?",
-        default=str(default_input_path()),
-        help="Path to the purchase-order input file (.txt or .pdf).",
+        "input_paths",
+        nargs="*",
+        metavar="input_path",
+        help="Purchase-order input file(s) (.txt or .pdf), directories, glob patterns, or - to read paths from stdin.",
     )
     parser.add_argument(
         "--output",
         default=None,
-        help="Optional output JSON path. Defaults to <input_dir>/<input_stem>.json",
+        help=(
+            "Optional output JSON path. Defaults to <input_dir>/<input_stem>.json. "
+            "With --ndjson: the NDJSON file (default: stdout)."
+        ),
+    )
+    parser.add_argument(
+        "--ndjson",
+        action="store_true",
+        help="Stream one compact JSON record per input ({path, parsed|error}) instead of writing a file per input.",
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="Gzip the --ndjson stream (implied by an --output ending in .gz).",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=sorted(PARSER_ENGINES),
+        default=None,
+        help=f"Parser engine (default: PO_PARSER_ENGINE env or {DEFAULT_PARSER_ENGINE}).",
+    )
+    parser.add_argument(
+        "--pdf-max-pages",
+        type=int,
+        default=None,
+        help="Read at most N pages of a PDF (default: PDF_MAX_PAGES env or 100; 0 = no limit).",
+    )
+    parser.add_argument(
+        "--parse-procs",
+        type=int,
+        default=1,
+        help="Parse input files on N worker processes (per-file errors and timeouts are reported, not fatal).",
     )
     args = parser.parse_args()
 
-    input_path = Path(args.input_path)
-    text = load_input_text(input_path)
-    parsed = parse_purchase_order_text(text)
-    output_path = (
-        Path(args.output)
-        if args.output
-        else input_path.parent / f"{input_path.stem}.json"
-    )
-    output_path.write_text(json.dumps(parsed, indent=2), encoding="utf-8")
-    print(str(output_path))
+    if args.ndjson:
+        try:
+            parsed, failed = write_ndjson(
+                iter_input_paths(args.input_paths or ["-"]),
+                output=args.output,
+                compress=args.gzip,
+                parse_procs=args.parse_procs,
+                engine=args.engine,
+                max_pages=args.pdf_max_pages,
+            )
+        except BrokenPipeError:
+            # The reader (e.g. `head`) closed stdout; stop quietly.
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            raise SystemExit(1) from None
+        print(f"Parsed {parsed} file(s), {failed} error(s).", file=sys.stderr)
+        raise SystemExit(1 if failed else 0)
+
+    input_paths = list(iter_input_paths(args.input_paths)) or [default_input_path()]
+    if args.output and len(input_paths) > 1:
+        parser.error("--output can only be used with a single input file.")
+
+    if args.parse_procs <= 1:
+        for input_path in input_paths:
+            parsed = parse_input_file(input_path, engine=args.engine, max_pages=args.pdf_max_pages)
+            print(str(write_parsed_json(input_path, parsed, args.output)))
+        return
+
+    failures = 0
+    worker = functools.partial(parse_input_file, engine=args.engine, max_pages=args.pdf_max_pages)
+    for input_path, parsed, error in parse_in_processes(input_paths, args.parse_procs, worker=worker):
+        if error is not None:
+            failures += 1
+            print(f"ERROR: {input_path}: {error}")
+            continue
+        print(str(write_parsed_json(input_path, parsed, args.output)))
+    if failures:
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":
@@ -1,88 +1,177 @@
-import json
 import os
 import re
-from datetime import UTC, date, datetime, timedelta
+import shutil
+import threading
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from datetime import UTC, datetime
 from pathlib import Path
 from typing import Any
 
+try:
+    import numpy as np  # type: ignore
+except ImportError:
+    np = None
+
+from workflow.artifacts import ArtifactWriter, embed_json
 from workflow.models import PurchaseOrder
+from workflow.rules import attention_rules, date_ordinal, is_default_rule_set, to_number
 
+# Used when a caller has no ArtifactWriter of its own.
+_INLINE_ARTIFACTS = ArtifactWriter(background=False)
 
-def _to_number(value: Any) -> float | None:
-    if value is None:
-        return None
-    if isinstance(value, (int, float)):
-        return float(value)
-    text = str(value).strip()
-    if not text:
-        return None
-    normalized = text.replace("$", "").replace(",", "")
-    try:
-        return float(normalized)
-    except ValueError:
-        return None
+
+def needs_attention(payload: dict[str, Any], due_within_days: int = 7) -> list[str]:
+    """Reasons ``payload`` raises under the active attention rule set."""
+    return attention_rules().current().evaluate(payload, {"due_within_days": due_within_days})
 
 
-def _parse_iso_date(value: Any) -> date | None:
-    if value is None:
-        return None
-    text = str(value).strip()
-    if not text:
-        return None
-    try:
-        return datetime.strptime(text, "%Y-%m-%d").date()
-    except ValueError:
-        return None
+@dataclass
+class AttentionBatch:
+    """Column-per-field view of the payload values ``needs_attention`` reads.
 
+    Columns may be lists or NumPy arrays of equal length, e.g. straight from a
+    ``purchase_orders`` query. ``total`` holds the raw value (number, string or
+    None) so ``missing_fields`` sees exactly what the scalar path sees.
+    """
 
-def needs_attention(payload: dict[str, Any], due_within_days: int = 7) -> list[str]:
-    reasons: list[str] = []
-    po = payload.get("purchase_order", {})
-    email = payload.get("email", {})
-    totals = po.get("totals", {})
-    threshold = float(os.getenv("ATTENTION_TOTAL_THRESHOLD", "15000"))
-
-    due = _parse_iso_date(po.get("due_date"))
-    order_date = _parse_iso_date(po.get("order_date"))
-    if due is not None and order_date is not None and due <= (order_date + timedelta(days=due_within_days)):
-        reasons.append("due_soon")
-
-    subject = (email.get("subject") or "").lower()
-    if "urgent" in subject:
-        reasons.append("urgent")
-
-    required = [
-        po.get("po_number"),
-        po.get("vendor"),
-        po.get("order_date"),
-        po.get("due_date"),
-        totals.get("total"),
+    subject: Sequence[Any]
+    po_number: Sequence[Any]
+    vendor: Sequence[Any]
+    order_date: Sequence[Any]
+    due_date: Sequence[Any]
+    total: Sequence[Any]
+
+    @classmethod
+    def from_payloads(cls, payloads: Iterable[dict[str, Any]]) -> "AttentionBatch":
+        columns: tuple[list[Any], ...] = ([], [], [], [], [], [])
+        subject, po_number, vendor, order_date, due_date, total = columns
+        for payload in payloads:
+            po = payload.get("purchase_order", {})
+            subject.append(payload.get("email", {}).get("subject"))
+            po_number.append(po.get("po_number"))
+            vendor.append(po.get("vendor"))
+            order_date.append(po.get("order_date"))
+            due_date.append(po.get("due_date"))
+            total.append(po.get("totals", {}).get("total"))
+        return cls(*columns)
+
+    def __len__(self) -> int:
+        return len(self.po_number)
+
+    def payloads(self) -> Iterator[dict[str, Any]]:
+        for subject, po_number, vendor, order_date, due_date, total in zip(
+            self.subject, self.po_number, self.vendor, self.order_date, self.due_date, self.total
+        ):
+            yield {
+                "email": {"subject": subject},
+                "purchase_order": {
+                    "po_number": po_number,
+                    "vendor": vendor,
+                    "order_date": order_date,
+                    "due_date": due_date,
+                    "totals": {"total": total},
+                },
+            }
+
+
+_DUE_SOON, _URGENT, _MISSING_FIELDS, _AMOUNT = 1, 2, 4, 8
+# Reason lists for every flag bitmask, in needs_attention() order.
+_REASON_SETS = [
+    tuple(
+        reason
+        for bit, reason in (
+            (_DUE_SOON, "due_soon"),
+            (_URGENT, "urgent"),
+            (_MISSING_FIELDS, "missing_fields"),
+            (_AMOUNT, "amount_exceeds_threshold"),
+        )
+        if mask & bit
+    )
+    for mask in range(16)
+]
+
+
+def _date_ordinals(values: Iterable[Any]) -> list[int]:
+    # 0 marks a missing/invalid date (date.min has ordinal 1).
+    return [date_ordinal(value) or 0 for value in values]
+
+
+def _is_missing(value: Any) -> bool:
+    return value is None or (isinstance(value, str) and value == "")
+
+
+def needs_attention_batch(
+    batch: AttentionBatch,
+    due_within_days: int = 7,
+    threshold: float | None = None,
+) -> list[list[str]]:
+    """Evaluate ``needs_attention`` for every row of ``batch`` in one pass.
+
+    Returns one reason list per row, identical to the scalar function. The
+    built-in rules are evaluated column-wise: the threshold is the rule set's
+    resolved ``ATTENTION_TOTAL_THRESHOLD`` unless given, and comparisons
+    run on NumPy arrays when NumPy is installed (plain lists otherwise). A
+    custom rule file is evaluated row by row and can only see these columns.
+    """
+    rule_set = attention_rules().current()
+    if not is_default_rule_set(rule_set):
+        params = {"due_within_days": due_within_days}
+        return [rule_set.evaluate(payload, params) for payload in batch.payloads()]
+    if threshold is None:
+        resolved = to_number(rule_set.env_value("ATTENTION_TOTAL_THRESHOLD"))
+        # Like the scalar rule: no numeric threshold, no amount reason.
+        threshold = float("inf") if resolved is None else resolved
+    order_ordinals = _date_ordinals(batch.order_date)
+    due_ordinals = _date_ordinals(batch.due_date)
+    urgent = ["urgent" in (subject or "").lower() for subject in batch.subject]
+    totals = [to_number(value) for value in batch.total]
+    missing = [
+        _is_missing(po_number)
+        or _is_missing(vendor)
+        or _is_missing(order_date)
+        or _is_missing(due_date)
+        or _is_missing(total)
+        for po_number, vendor, order_date, due_date, total in zip(
+            batch.po_number, batch.vendor, batch.order_date, batch.due_date, batch.total
+        )
     ]
-    if any(value in (None, "") for value in required):
-        reasons.append("missing_fields")
 
-    total_value = _to_number(totals.get("total"))
-    if total_value is not None and total_value > threshold:
-        reasons.append("amount_exceeds_threshold")
+    if np is not None:
+        order_arr = np.asarray(order_ordinals, dtype=np.int64)
+        due_arr = np.asarray(due_ordinals, dtype=np.int64)
+        total_arr = np.asarray(totals, dtype=np.float64)  # None -> NaN, never > threshold
+        masks = (
+            ((order_arr > 0) & (due_arr > 0) & (due_arr <= order_arr + due_within_days)) * _DUE_SOON
+            + np.asarray(urgent, dtype=bool) * _URGENT
+            + np.asarray(missing, dtype=bool) * _MISSING_FIELDS
+            + (total_arr > threshold) * _AMOUNT
+        ).tolist()
+    else:
+        masks = [
+            (_DUE_SOON if order and due and due <= order + due_within_days else 0)
+            | (_URGENT if is_urgent else 0)
+            | (_MISSING_FIELDS if is_missing else 0)
+            | (_AMOUNT if total is not None and total > threshold else 0)
+            for order, due, is_urgent, is_missing, total in zip(
+                order_ordinals, due_ordinals, urgent, missing, totals
+            )
+        ]
+    return [list(_REASON_SETS[mask]) for mask in masks]
 
-    return reasons
+
+def attention_config_fingerprint(due_within_days: int = 7) -> str:
+    # Everything outside the payload that can change needs_attention() results.
+    return attention_rules().current().fingerprint({"due_within_days": due_within_days})
 
 
 def failure_flags(reasons: list[str]) -> list[str]:
-    fail_set = {"missing_fields", "out_of_stock"}
-    return [reason for reason in reasons if reason in fail_set]
+    return attention_rules().current().failing(reasons)
 
 
 def priority_rank(reasons: list[str]) -> int:
     # Lower is higher queue priority (separate from failure policy).
-    rank_map = {
-        "urgent": 0,
-        "due_soon": 1,
-    }
-    if not reasons:
-        return 2
-    # Only urgent/due_soon influence priority. Everything else is fallback tier.
-    return min(rank_map.get(reason, 2) for reason in reasons)
+    return attention_rules().current().rank_reasons(reasons)
 
 
 def write_alert(
@@ -92,57 +181,113 @@ def write_alert(
     error_message: str | None = None,
     output_path: Path | None = None,
     write_for_unflagged_success: bool = True,
-) -> bool:
+    artifacts: ArtifactWriter | None = None,
+) -> str | None:
+    """Queue the alert file for ``po`` on ``artifacts`` (inline write when omitted).
+
+    Returns the alert JSON, or None when no alert is written. The parsed
+    payload under ``fields`` reuses ``po.req_json`` instead of being dumped again.
+    """
     if not reasons and status == "SUCCESS" and not write_for_unflagged_success:
-        return False
+        return None
 
+    artifacts = artifacts or _INLINE_ARTIFACTS
     po_number = ((po.req or {}).get("purchase_order") or {}).get("po_number")
-    payload = {
+    payload: dict[str, Any] = {
         "po_number": po_number,
         "status": status,
         "reasons": reasons,
-        "fields": po.req or {},
+        "fields": None,
         "timestamp": datetime.now(UTC).isoformat(),
     }
     if error_message:
         payload["error"] = error_message
-    alert_path = output_path or po.alert_path
-    alert_path.parent.mkdir(parents=True, exist_ok=True)
-    alert_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
-    return True
-
-
-def write_suite_response_summary(
-    suite_dir: Path,
-    suite_name: str,
-    ordered_events: list[dict[str, Any]],
-) -> None:
-    response_dir = suite_dir / "response"
-    response_dir.mkdir(parents=True, exist_ok=True)
-
-    # Remove legacy per-task response files.
-    for old in response_dir.glob("*.response.txt"):
-        old.unlink(missing_ok=True)
-
-    suite_status = "SUCCESS"
-    if any(event["status"] in {"FAILED", "PENDING"} for event in ordered_events):
-        suite_status = "FAILED"
-
-    lines = [
-        f"Suite: {suite_name}",
-        f"Status: {suite_status}",
-        "Execution:",
-    ]
+    text = embed_json(payload, "fields", po.req_json(artifacts.indent), artifacts.indent)
+    artifacts.write(output_path or po.alert_path, text)
+    return text
+
+
+def _summary_line(idx: int, event: dict[str, Any]) -> str:
+    reason_text = ", ".join(event.get("reasons", [])) or "none"
+    po_number = event.get("po_number") or "N/A"
+    line = f"{idx}. {event['task']} | {event['status']} | flags={reason_text} | po={po_number}"
+    if event.get("error"):
+        short_error = re.sub(r"\s+", " ", str(event["error"])).strip()
+        if len(short_error) > 120:
+            short_error = short_error[:117] + "..."
+        line += f" | error={short_error}"
+    if event.get("cached"):
+        line += " | cached"
+    return line
+
+
+class SuiteSummaryWriter:
+    """Streams one suite's ``response/summary.txt`` as its tasks finish.
+
+    Events carry the task's position in the suite's planned order. Lines are
+    appended to ``response/summary.txt.partial`` as soon as every earlier task
+    has reported, so only out-of-order events are held in memory and a crash
+    leaves the lines written so far. ``close()`` writes the header (status and
+    cache hits need every event) and swaps the finished file in atomically;
+    ``aborted=True`` marks a run that stopped early as FAILED.
+    """
+
+    def __init__(self, suite_dir: Path, suite_name: str, track_cache: bool = False) -> None:
+        self.suite_name = suite_name
+        self.response_dir = suite_dir / "response"
+        self.summary_path = self.response_dir / "summary.txt"
+        self.partial_path = self.response_dir / "summary.txt.partial"
+        self.track_cache = track_cache
+        self._lock = threading.Lock()
+        self._waiting: dict[int, dict[str, Any]] = {}
+        self._next_position = 0
+        self._written = 0
+        self._cache_hits = 0
+        self._failed = False
+
+        self.response_dir.mkdir(parents=True, exist_ok=True)
+        # Remove legacy per-task response files.
+        for old in self.response_dir.glob("*.response.txt"):
+            old.unlink(missing_ok=True)
+        self.partial_path.write_text("", encoding="utf-8")
+
+    def add(self, position: int, event: dict[str, Any]) -> None:
+        with self._lock:
+            self._waiting[position] = event
+            ready: list[dict[str, Any]] = []
+            while self._next_position in self._waiting:
+                ready.append(self._waiting.pop(self._next_position))
+                self._next_position += 1
+            self._append(ready)
+
+    def _append(self, events: list[dict[str, Any]]) -> None:
+        if not events:
+            return
+        lines = []
+        for event in events:
+            self._written += 1
+            self._failed = self._failed or event["status"] in {"FAILED", "PENDING"}
+            self._cache_hits += 1 if event.get("cached") else 0
+            lines.append(_summary_line(self._written, event) + "\n")
+        with self.partial_path.open("a", encoding="utf-8") as handle:
+            handle.writelines(lines)
+
+    def close(self, aborted: bool = False) -> None:
+        with self._lock:
+            # Tasks that never reported (e.g. an aborted run) leave gaps; keep planned order.
+            self._append([self._waiting[position] for position in sorted(self._waiting)])
+            self._waiting.clear()
+            header = [
+                f"Suite: {self.suite_name}",
+                f"Status: {'FAILED' if self._failed or aborted else 'SUCCESS'}",
+            ]
+            if self.track_cache:
+                header.append(f"Cache hits: {self._cache_hits}/{self._written}")
+            header.append("Execution:")
+            tmp_path = self.summary_path.with_name(self.summary_path.name + ".tmp")
+            with tmp_path.open("w", encoding="utf-8") as out, self.partial_path.open(encoding="utf-8") as lines:
+                out.write("\n".join(header) + "\n")
+                shutil.copyfileobj(lines, out)
+            os.replace(tmp_path, self.summary_path)
+            self.partial_path.unlink(missing_ok=True)
 
-    for idx, event in enumerate(ordered_events, start=1):
-        reason_text = ", ".join(event.get("reasons", [])) or "none"
-        po_number = event.get("po_number") or "N/A"
-        line = f"{idx}. {event['task']} | {event['status']} | flags={reason_text} | po={po_number}"
-        if event.get("error"):
-            short_error = re.sub(r"\s+", " ", str(event["error"])).strip()
-            if len(short_error) > 120:
-                short_error = short_error[:117] + "..."
-            line += f" | error={short_error}"
-        lines.append(line)
-
-    (response_dir / "summary.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
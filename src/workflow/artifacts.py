@@ -0,0 +1,145 @@
+import json
+import os
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any
+
+# Stand-in for a pre-serialized value while the surrounding document is dumped.
+_EMBED_MARKER = "\x00embedded\x00"
+
+
+def embed_json(document: dict[str, Any], key: str, value_text: str, indent: int | None) -> str:
+    """Serialize ``document`` with ``document[key]`` taken from ``value_text`` as-is.
+
+    ``value_text`` must be ``json.dumps(value, indent=indent)`` output (compact
+    separators when ``indent`` is None). Nested one level down, pretty JSON
+    differs from the top-level dump only by one indent step per line, so the
+    result is byte-identical to dumping the whole document.
+    """
+    separators = None if indent is not None else (",", ":")
+    text = json.dumps({**document, key: _EMBED_MARKER}, indent=indent, separators=separators)
+    if indent:
+        value_text = value_text.replace("\n", "\n" + " " * indent)
+    return text.replace(json.dumps(_EMBED_MARKER), value_text, 1)
+
+
+def write_text_atomic(path: Path, text: str) -> None:
+    # Same-directory temp file, so readers see the old file or the new one, never a torn write.
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+class ArtifactWriter:
+    """Writes task artifacts (parsed JSON, alert files) off the task's critical path.
+
+    ``write``/``remove`` queue the change and return immediately; a single
+    background thread applies them with atomic temp-file renames. A path that
+    is queued again before it was written keeps only its latest content.
+    ``flush()`` is the barrier: it returns once everything queued so far is on
+    disk, with any write errors. With ``background=False`` changes are applied
+    inline (still atomically).
+
+    ``indent`` is the JSON indent every artifact is rendered with (None for
+    compact output).
+    """
+
+    def __init__(self, compact: bool = False, background: bool = True, max_pending: int = 1024) -> None:
+        self.indent: int | None = None if compact else 2
+        self.background = background
+        self.max_pending = max(1, max_pending)
+        self._created_dirs: set[Path] = set()
+        self._dirs_lock = threading.Lock()
+        self._cond = threading.Condition()
+        # None marks a queued removal.
+        self._pending: dict[Path, str | None] = {}
+        self._queue: deque[Path] = deque()
+        self._busy = False
+        self._errors: list[str] = []
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    def _ensure_dir(self, directory: Path) -> None:
+        with self._dirs_lock:
+            if directory in self._created_dirs:
+                return
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._dirs_lock:
+            self._created_dirs.add(directory)
+
+    def _apply(self, path: Path, text: str | None) -> None:
+        try:
+            if text is None:
+                path.unlink(missing_ok=True)
+                return
+            self._ensure_dir(path.parent)
+            write_text_atomic(path, text)
+        except Exception as exc:  # noqa: BLE001
+            # Reported at the next barrier; the writer thread must survive it.
+            with self._cond:
+                self._errors.append(f"{path}: {exc or type(exc).__name__}")
+
+    def _submit(self, path: Path, text: str | None) -> None:
+        if not self.background:
+            self._apply(path, text)
+            return
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("ArtifactWriter is closed")
+            if path in self._pending:
+                self._pending[path] = text
+                return
+            while len(self._pending) >= self.max_pending:
+                self._cond.wait()
+            self._pending[path] = text
+            self._queue.append(path)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="artifact-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def write(self, path: Path, text: str) -> None:
+        self._submit(path, text)
+
+    def remove(self, path: Path) -> None:
+        self._submit(path, None)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                path = self._queue.popleft()
+                text = self._pending.pop(path)
+                self._busy = True
+                self._cond.notify_all()
+            try:
+                self._apply(path, text)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def flush(self) -> list[str]:
+        """Wait until every queued change is applied; return (and clear) write errors."""
+        with self._cond:
+            while self._queue or self._busy:
+                self._cond.wait()
+            errors, self._errors = self._errors, []
+        return errors
+
+    def close(self) -> list[str]:
+        errors = self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        return errors
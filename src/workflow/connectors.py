@@ -1,10 +1,17 @@
+import io
 import json
+import os
+import threading
+import time
 from abc import ABC, abstractmethod
 from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Any
 
 from parse_txt import load_input_text, parse_purchase_order_text
+from workflow.documents import DocumentCache
 from workflow.models import PurchaseOrder
 
 try:
@@ -21,6 +28,31 @@ except ImportError:
         psycopg2 = None
         DB_DRIVER = None
 
+_REPO_ROOT = Path(__file__).resolve().parents[2]
+_DB_INIT_DIR = _REPO_ROOT / "db" / "init"
+
+WORKFLOW_SCHEMA_COMPONENT = "workflow"
+WORKFLOW_SCHEMA_VERSION = 6
+WORKFLOW_SCHEMA_PATH = _DB_INIT_DIR / "002_workflow.sql"
+# --resume refuses runs with task activity this recent: a classic run holds no lease to prove it is dead.
+RESUME_IDLE_SECONDS = 300
+
+PO_SCHEMA_COMPONENT = "purchase_orders"
+PO_SCHEMA_VERSION = 3
+PO_SCHEMA_PATH = _DB_INIT_DIR / "001_schema.sql"
+
+STOCK_SCHEMA_COMPONENT = "stock"
+STOCK_SCHEMA_VERSION = 2
+STOCK_SCHEMA_PATH = _DB_INIT_DIR / "003_stock.sql"
+
+BULK_LOAD_SCHEMA_COMPONENT = "bulk_load"
+BULK_LOAD_SCHEMA_VERSION = 2
+BULK_LOAD_SCHEMA_PATH = _DB_INIT_DIR / "005_bulk_load.sql"
+
+# (DSN, component) pairs whose schema has been verified by this process.
+_schema_ready: set[tuple[str, str]] = set()
+_schema_lock = threading.Lock()
+
 
 class EmailConnectorBase(ABC):
     @abstractmethod
@@ -31,6 +63,13 @@ class EmailConnectorBase(ABC):
     def extract_purchase_order(self, path: Path | None = None) -> dict[str, Any]:
         raise NotImplementedError
 
+    def pages_read(self, path: Path | None = None) -> int | None:
+        """PDF pages read to extract the purchase order at ``path``; None when not tracked."""
+        return None
+
+    def release(self, path: Path | None = None) -> None:
+        """Drop anything cached for ``path`` once its task is finished."""
+
 
 class DatabaseConnectorBase(ABC):
     @abstractmethod
@@ -45,6 +84,10 @@ class DatabaseConnectorBase(ABC):
     def create_purchase_order_run(self, workflow_run_id: int, po: PurchaseOrder) -> int:
         raise NotImplementedError
 
+    def create_purchase_order_runs(self, workflow_run_id: int, pos: list[PurchaseOrder]) -> dict[str, int]:
+        """Create PENDING runs for every task and return ``{task name: run id}``."""
+        return {po.name: self.create_purchase_order_run(workflow_run_id, po) for po in pos}
+
     @abstractmethod
     def set_purchase_order_request(
         self,
@@ -69,7 +112,12 @@ class DatabaseConnectorBase(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    def upsert_purchase_order(self, payload: dict[str, Any]) -> int:
+    def upsert_purchase_order(self, payload: dict[str, Any]) -> tuple[int, bool]:
+        """Store the parsed PO; return ``(purchase order id, changed)``.
+
+        ``changed`` is False when the stored payload was already identical and
+        nothing was written.
+        """
         raise NotImplementedError
 
     @abstractmethod
@@ -80,10 +128,107 @@ class DatabaseConnectorBase(ABC):
     def reserve_stock(self, po_number: str, line_items: list[dict[str, Any]]) -> tuple[bool, list[str]]:
         raise NotImplementedError
 
+    def bulk_upsert_purchase_orders(
+        self,
+        payloads: list[dict[str, Any]],
+        reasons: list[list[str]],
+    ) -> dict[str, int]:
+        """Upsert many parsed POs, inserting an alert for each changed PO with reasons.
+
+        Same result as calling ``upsert_purchase_order`` (then ``insert_alert``
+        when it reports a change) for each payload in order. Returns counts
+        keyed ``inserted``, ``updated``, ``unchanged`` and ``alerts``;
+        connectors that cannot tell an insert from an update count both as
+        ``updated``. Connectors with a set-based path should override this.
+        """
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0, "alerts": 0}
+        for payload, po_reasons in zip(payloads, reasons):
+            po_id, changed = self.upsert_purchase_order(payload)
+            if not changed:
+                counts["unchanged"] += 1
+                continue
+            counts["updated"] += 1
+            if po_reasons:
+                po_number = (payload.get("purchase_order") or {}).get("po_number") or ""
+                self.insert_alert(po_id, po_number, po_reasons, payload)
+                counts["alerts"] += 1
+        return counts
+
+    def apply_purchase_order_run_updates(self, updates: list[dict[str, Any]]) -> None:
+        """Apply journaled purchase_order_runs updates in order.
+
+        Each update is a dict with an ``op`` of ``attempts``, ``request``,
+        ``output`` or ``transition`` plus that op's arguments. Connectors that
+        can apply the whole list in one round-trip should override this.
+        """
+        for update in updates:
+            op = update["op"]
+            run_id = update["run_id"]
+            if op == "attempts":
+                self.set_attempts(run_id, update["attempts"])
+            elif op == "request":
+                self.set_purchase_order_request(run_id, update["req"], update.get("po_number"))
+            elif op == "output":
+                self.set_output(run_id, update["output"])
+            elif op == "transition":
+                self.transition_purchase_order(run_id, update["state"], update.get("error_message"))
+            else:
+                raise ValueError(f"unknown purchase_order_run update: {op}")
+
+    # Task-queue mode (``--enqueue`` / ``--worker``). Only connectors backed by a
+    # shared database can support it.
+    def enqueue_purchase_order_runs(
+        self,
+        workflow_run_id: int,
+        pos: list[PurchaseOrder],
+        input_root: Path,
+    ) -> dict[str, int]:
+        """Create claimable PENDING runs (planned order, dependencies, input path) and return their ids."""
+        raise NotImplementedError(f"{type(self).__name__} does not support the task queue")
+
+    def claim_purchase_order_run(
+        self, workflow_run_id: int, worker: str, lease_seconds: int
+    ) -> dict[str, Any] | None:
+        """Lease the next runnable task: ``{"run_id", "test_name", "input_path", "dependencies"}``."""
+        raise NotImplementedError(f"{type(self).__name__} does not support the task queue")
+
+    def heartbeat_purchase_order_runs(self, worker: str, lease_seconds: int) -> int:
+        raise NotImplementedError(f"{type(self).__name__} does not support the task queue")
+
+    def apply_leased_purchase_order_run_updates(self, worker: str, updates: list[dict[str, Any]]) -> list[int]:
+        """Apply updates only to runs ``worker`` still holds the lease on; return the run ids it lost."""
+        raise NotImplementedError(f"{type(self).__name__} does not support the task queue")
+
+    def recover_expired_purchase_order_runs(self, workflow_run_id: int) -> int:
+        raise NotImplementedError(f"{type(self).__name__} does not support the task queue")
+
+    def finish_queued_workflow_run(self, workflow_run_id: int) -> tuple[str, list[dict[str, Any]]] | None:
+        """Close the run if nothing is left to claim; return its final state and blocked tasks."""
+        raise NotImplementedError(f"{type(self).__name__} does not support the task queue")
+
+    def workflow_run_state(self, workflow_run_id: int) -> str | None:
+        raise NotImplementedError(f"{type(self).__name__} does not support the task queue")
+
+    def resume_workflow_run(self, workflow_run_id: int, force: bool = False) -> list[dict[str, Any]]:
+        """Reopen an interrupted run: reset orphaned RUNNING tasks, return every task in planned order.
+
+        Refuses a run with task activity in the last ``RESUME_IDLE_SECONDS``
+        (it may still be executing elsewhere) unless ``force`` is set.
+        Rows: ``{"run_id", "test_name", "state", "input_path", "dependencies", "recovered"}``.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support resuming workflow runs")
+
+    def flush(self) -> None:
+        """Write any buffered task updates; connectors that write through have nothing to do."""
+
+    def close(self) -> None:
+        """Release any long-lived resources held by the connector."""
+
 
 class TxtEmailConnector(EmailConnectorBase):
-    def __init__(self, default_path: Path | None = None) -> None:
+    def __init__(self, default_path: Path | None = None, document_cache: DocumentCache | None = None) -> None:
         self.default_path = default_path
+        self.document_cache = document_cache
 
     def _resolve_path(self, path: Path | None) -> Path:
         if path is not None:
@@ -99,56 +244,215 @@ class TxtEmailConnector(EmailConnectorBase):
         return load_input_text(resolved)
 
     def extract_purchase_order(self, path: Path | None = None) -> dict[str, Any]:
-        raw = self.read_text(path)
-        return parse_purchase_order_text(raw)
+        if self.document_cache is None:
+            raw = self.read_text(path)
+            return parse_purchase_order_text(raw)
+        resolved = self._resolve_path(path)
+        if not resolved.exists():
+            raise FileNotFoundError(f"Email input file not found: {resolved}")
+        return self.document_cache.get(resolved).require_payload()
+
+    def pages_read(self, path: Path | None = None) -> int | None:
+        if self.document_cache is None:
+            return None
+        try:
+            return self.document_cache.get(self._resolve_path(path)).pages_read
+        except OSError:
+            return None
+
+    def release(self, path: Path | None = None) -> None:
+        if self.document_cache is not None:
+            self.document_cache.release(self._resolve_path(path))
+
+
+class PostgresConnectionPool:
+    """Thread-safe pool of long-lived connections shared by one connector.
+
+    Connections are opened lazily up to ``max_size``. A connection that has been
+    idle for longer than ``health_check_interval`` seconds is pinged with
+    ``SELECT 1`` on checkout and replaced if the ping fails.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        max_size: int = 4,
+        health_check_interval: float = 30.0,
+        checkout_timeout: float = 30.0,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.dsn = dsn
+        self.max_size = max_size
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+        self._idle: list[tuple[Any, float]] = []
+        self._open_count = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _open(self):
+        if DB_DRIVER == "psycopg":
+            return psycopg.connect(self.dsn)  # type: ignore[union-attr]
+        return psycopg2.connect(self.dsn)  # type: ignore[union-attr]
+
+    @staticmethod
+    def _discard(conn) -> None:
+        try:
+            conn.close()
+        except Exception:  # noqa: BLE001
+            pass
+
+    def _is_healthy(self, conn, idle_seconds: float) -> bool:
+        # psycopg exposes `closed` as a bool, psycopg2 as a non-zero int.
+        if conn.closed:
+            return False
+        if idle_seconds < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+                cur.fetchone()
+            conn.rollback()
+        except Exception:  # noqa: BLE001
+            return False
+        return True
+
+    def _checkout(self):
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Database connection pool is closed.")
+                    if self._idle:
+                        conn, released_at = self._idle.pop()
+                        break
+                    if self._open_count < self.max_size:
+                        self._open_count += 1
+                        conn, released_at = None, None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise RuntimeError(f"Timed out waiting for a database connection (pool size {self.max_size}).")
+                    self._cond.wait(remaining)
+
+            if conn is None:
+                try:
+                    return self._open()
+                except Exception:
+                    self._forget()
+                    raise
+            if self._is_healthy(conn, time.monotonic() - released_at):
+                return conn
+            self._discard(conn)
+            self._forget()
+
+    def _forget(self) -> None:
+        with self._cond:
+            self._open_count -= 1
+            self._cond.notify()
+
+    def _checkin(self, conn) -> None:
+        try:
+            # No-op without an open transaction; clears state left by a failed block.
+            conn.rollback()
+        except Exception:  # noqa: BLE001
+            self._discard(conn)
+            self._forget()
+            return
+        with self._cond:
+            if self._closed or conn.closed:
+                self._open_count -= 1
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._checkin(conn)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open_count -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
 
 
 class PostgresDatabaseConnector(DatabaseConnectorBase):
-    def __init__(self, dsn: str) -> None:
+    def __init__(self, dsn: str, pool_size: int | None = None) -> None:
         if DB_DRIVER is None:
             raise RuntimeError("Install psycopg or psycopg2 to run workflow.")
         self.dsn = dsn
+        if pool_size is None:
+            pool_size = int(os.getenv("POSTGRES_POOL_SIZE", "4"))
+        self._pool = PostgresConnectionPool(dsn, max_size=pool_size)
 
     def _connect(self):
-        if DB_DRIVER == "psycopg":
-            return psycopg.connect(self.dsn)  # type: ignore[union-attr]
-        return psycopg2.connect(self.dsn)  # type: ignore[union-attr]
+        return self._pool.connection()
+
+    def close(self) -> None:
+        self._pool.close()
+
+    @staticmethod
+    def _recorded_schema_version(cur, component: str) -> int | None:
+        cur.execute("SELECT to_regclass('schema_versions') IS NOT NULL;")
+        if not cur.fetchone()[0]:
+            return None
+        cur.execute("SELECT version FROM schema_versions WHERE component = %s;", (component,))
+        row = cur.fetchone()
+        return int(row[0]) if row else None
+
+    def _ensure_schema(self, component: str, version: int, path: Path) -> None:
+        # Checked once per process and component: regular calls never run DDL.
+        key = (self.dsn, component)
+        if key in _schema_ready:
+            return
+        with _schema_lock:
+            if key in _schema_ready:
+                return
+            with self._connect() as conn:
+                with conn.cursor() as cur:
+                    recorded = self._recorded_schema_version(cur, component)
+                    if recorded is None or recorded < version:
+                        # Workers on other processes and hosts may upgrade at the same time. One
+                        # transaction-scoped lock for every component (the files share
+                        # schema_versions); whoever waited finds the new version and skips the DDL.
+                        cur.execute("SELECT pg_advisory_xact_lock(hashtext('schema_versions'));")
+                        recorded = self._recorded_schema_version(cur, component)
+                        if recorded is None or recorded < version:
+                            # The db/init file is idempotent and records its own version.
+                            cur.execute(path.read_text(encoding="utf-8"))
+                conn.commit()
+            _schema_ready.add(key)
 
     def _ensure_stock_schema(self) -> None:
-        sql_statements = [
-            """
-            CREATE TABLE IF NOT EXISTS inventory_items (
-                sku TEXT PRIMARY KEY,
-                description TEXT NOT NULL,
-                available_qty INTEGER NOT NULL CHECK (available_qty >= 0),
-                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
-            );
-            """,
-            """
-            CREATE TABLE IF NOT EXISTS purchase_order_stock_usage (
-                po_number TEXT NOT NULL,
-                sku TEXT NOT NULL REFERENCES inventory_items(sku) ON DELETE CASCADE,
-                reserved_qty INTEGER NOT NULL CHECK (reserved_qty >= 0),
-                updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
-                PRIMARY KEY (po_number, sku)
-            );
-            """,
-            """
-            INSERT INTO inventory_items (sku, description, available_qty) VALUES
-                ('label_roll', 'General label rolls', 5000),
-                ('sleeve_pack', 'Shrink sleeve packs', 3000),
-                ('neck_band', 'Tamper neck bands', 4000),
-                ('generic_label', 'Fallback label stock', 2000)
-            ON CONFLICT (sku) DO NOTHING;
-            """,
-        ]
-        with self._connect() as conn:
-            with conn.cursor() as cur:
-                for sql in sql_statements:
-                    cur.execute(sql)
-            conn.commit()
+        self._ensure_schema(STOCK_SCHEMA_COMPONENT, STOCK_SCHEMA_VERSION, STOCK_SCHEMA_PATH)
+
+    def _ensure_workflow_schema(self) -> None:
+        self._ensure_schema(WORKFLOW_SCHEMA_COMPONENT, WORKFLOW_SCHEMA_VERSION, WORKFLOW_SCHEMA_PATH)
+
+    def _ensure_purchase_order_schema(self) -> None:
+        self._ensure_schema(PO_SCHEMA_COMPONENT, PO_SCHEMA_VERSION, PO_SCHEMA_PATH)
+
+    @staticmethod
+    def _copy_from_text(cur, sql: str, text: str) -> None:
+        if DB_DRIVER == "psycopg":
+            with cur.copy(sql) as copy:
+                copy.write(text)
+        else:
+            cur.copy_expert(sql, io.StringIO(text))
 
     def create_workflow_run(self) -> int:
+        self._ensure_workflow_schema()
         sql = "INSERT INTO workflow_runs (state) VALUES ('PENDING') RETURNING id;"
         with self._connect() as conn:
             with conn.cursor() as cur:
@@ -174,6 +478,124 @@ class PostgresDatabaseConnector(DatabaseConnectorBase):
             conn.commit()
         return int(row[0])
 
+    def create_purchase_order_runs(self, workflow_run_id: int, pos: list[PurchaseOrder]) -> dict[str, int]:
+        if not pos:
+            return {}
+        tasks = _run_rows(pos, _REPO_ROOT)
+        sql = "SELECT test_name, purchase_order_run_id FROM create_purchase_order_runs(%s, %s::jsonb);"
+        with self._connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (workflow_run_id, json.dumps(tasks)))
+                rows = cur.fetchall()
+            conn.commit()
+        return {str(name): int(run_id) for name, run_id in rows}
+
+    def enqueue_purchase_order_runs(
+        self,
+        workflow_run_id: int,
+        pos: list[PurchaseOrder],
+        input_root: Path,
+    ) -> dict[str, int]:
+        self._ensure_workflow_schema()
+        if not pos:
+            return {}
+        tasks = _run_rows(pos, input_root)
+        sql = "SELECT test_name, purchase_order_run_id FROM enqueue_purchase_order_runs(%s, %s::jsonb);"
+        with self._connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (workflow_run_id, json.dumps(tasks)))
+                rows = cur.fetchall()
+            conn.commit()
+        return {str(name): int(run_id) for name, run_id in rows}
+
+    def claim_purchase_order_run(
+        self, workflow_run_id: int, worker: str, lease_seconds: int
+    ) -> dict[str, Any] | None:
+        self._ensure_workflow_schema()
+        sql = """
+            SELECT purchase_order_run_id, test_name, input_path, dependencies
+            FROM claim_purchase_order_run(%s, %s, %s);
+        """
+        with self._connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (workflow_run_id, worker, lease_seconds))
+                row = cur.fetchone()
+            conn.commit()
+        if row is None:
+            return None
+        return {"run_id": int(row[0]), "test_name": row[1], "input_path": row[2], "dependencies": list(row[3] or [])}
+
+    def heartbeat_purchase_order_runs(self, worker: str, lease_seconds: int) -> int:
+        with self._connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT heartbeat_purchase_order_runs(%s, %s);", (worker, lease_seconds))
+                row = cur.fetchone()
+            conn.commit()
+        return int(row[0])
+
+    def apply_leased_purchase_order_run_updates(self, worker: str, updates: list[dict[str, Any]]) -> list[int]:
+        if not updates:
+            return []
+        sql = "SELECT apply_leased_purchase_order_run_updates(%s, %s::jsonb);"
+        with self._connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (worker, json.dumps(updates)))
+                row = cur.fetchone()
+            conn.commit()
+        return [int(run_id) for run_id in row[0] or []]
+
+    def recover_expired_purchase_order_runs(self, workflow_run_id: int) -> int:
+        with self._connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT recover_expired_purchase_order_runs(%s);", (workflow_run_id,))
+                row = cur.fetchone()
+            conn.commit()
+        return int(row[0])
+
+    def finish_queued_workflow_run(self, workflow_run_id: int) -> tuple[str, list[dict[str, Any]]] | None:
+        with self._connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT final_state, blocked_tasks FROM finish_queued_workflow_run(%s);", (workflow_run_id,)
+                )
+                row = cur.fetchone()
+            conn.commit()
+        if row is None:
+            return None
+        blocked = row[1] if isinstance(row[1], list) else json.loads(row[1] or "[]")
+        return str(row[0]), blocked
+
+    def workflow_run_state(self, workflow_run_id: int) -> str | None:
+        with self._connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT state FROM workflow_runs WHERE id = %s;", (workflow_run_id,))
+                row = cur.fetchone()
+            conn.commit()
+        return str(row[0]) if row else None
+
+    def resume_workflow_run(self, workflow_run_id: int, force: bool = False) -> list[dict[str, Any]]:
+        self._ensure_workflow_schema()
+        sql = """
+            SELECT purchase_order_run_id, test_name, state, input_path, dependencies, recovered
+            FROM resume_workflow_run(%s, %s);
+        """
+        with self._connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (workflow_run_id, 0 if force else RESUME_IDLE_SECONDS))
+                rows = cur.fetchall()
+            conn.commit()
+        return [
+            {
+                "run_id": int(run_id),
+                "test_name": test_name,
+                "state": state,
+                "input_path": input_path,
+                "dependencies": list(dependencies or []),
+                "recovered": bool(recovered),
+            }
+            for run_id, test_name, state, input_path, dependencies, recovered in rows
+        ]
+
     def set_purchase_order_request(
         self,
         purchase_order_run_id: int,
@@ -216,14 +638,24 @@ class PostgresDatabaseConnector(DatabaseConnectorBase):
                 cur.execute(sql, (json.dumps(output_payload), purchase_order_run_id))
             conn.commit()
 
-    def upsert_purchase_order(self, payload: dict[str, Any]) -> int:
-        sql = "SELECT upsert_purchase_order(%s::jsonb);"
+    def apply_purchase_order_run_updates(self, updates: list[dict[str, Any]]) -> None:
+        if not updates:
+            return
+        sql = "SELECT apply_purchase_order_run_updates(%s::jsonb);"
+        with self._connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (json.dumps(updates),))
+            conn.commit()
+
+    def upsert_purchase_order(self, payload: dict[str, Any]) -> tuple[int, bool]:
+        self._ensure_purchase_order_schema()
+        sql = "SELECT po_id, changed FROM upsert_purchase_order(%s::jsonb);"
         with self._connect() as conn:
             with conn.cursor() as cur:
                 cur.execute(sql, (json.dumps(payload),))
                 row = cur.fetchone()
             conn.commit()
-        return int(row[0])
+        return int(row[0]), bool(row[1])
 
     def insert_alert(self, purchase_order_id: int, po_number: str, reasons: list[str], fields: dict[str, Any]) -> None:
         sql = """
@@ -235,6 +667,28 @@ class PostgresDatabaseConnector(DatabaseConnectorBase):
                 cur.execute(sql, (purchase_order_id, po_number, reasons, json.dumps(fields)))
             conn.commit()
 
+    def bulk_upsert_purchase_orders(
+        self,
+        payloads: list[dict[str, Any]],
+        reasons: list[list[str]],
+    ) -> dict[str, int]:
+        if not payloads:
+            return {"inserted": 0, "updated": 0, "unchanged": 0, "alerts": 0}
+        self._ensure_purchase_order_schema()
+        self._ensure_schema(BULK_LOAD_SCHEMA_COMPONENT, BULK_LOAD_SCHEMA_VERSION, BULK_LOAD_SCHEMA_PATH)
+        rows = "".join(
+            f"{seq}\t{_copy_text(json.dumps(payload))}\t{_copy_text(_text_array(po_reasons))}\n"
+            for seq, (payload, po_reasons) in enumerate(zip(payloads, reasons))
+        )
+        with self._connect() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT create_purchase_order_stage();")
+                self._copy_from_text(cur, "COPY po_stage (seq, payload, reasons) FROM STDIN", rows)
+                cur.execute("SELECT inserted, updated, unchanged, alerts FROM merge_staged_purchase_orders();")
+                inserted, updated, unchanged, alerts = cur.fetchone()
+            conn.commit()
+        return {"inserted": int(inserted), "updated": int(updated), "unchanged": int(unchanged), "alerts": int(alerts)}
+
     @staticmethod
     def _sku_from_description(description: str) -> str:
         normalized = description.lower()
@@ -259,57 +713,50 @@ class PostgresDatabaseConnector(DatabaseConnectorBase):
         if not sku_qty:
             return True, []
 
+        # Check, delta, decrement and usage upsert all happen server-side in one call.
+        items = [{"sku": sku, "qty": qty} for sku, qty in sku_qty.items()]
         try:
             with self._connect() as conn:
                 with conn.cursor() as cur:
-                    plan: list[tuple[str, int, int]] = []
-                    insufficient: list[str] = []
-                    for sku, requested_qty in sku_qty.items():
-                        cur.execute("SELECT available_qty FROM inventory_items WHERE sku = %s FOR UPDATE;", (sku,))
-                        stock_row = cur.fetchone()
-                        if stock_row is None:
-                            insufficient.append(f"{sku}(unknown)")
-                            continue
-                        available_qty = int(stock_row[0])
-
-                        cur.execute(
-                            "SELECT reserved_qty FROM purchase_order_stock_usage WHERE po_number = %s AND sku = %s FOR UPDATE;",
-                            (po_number, sku),
-                        )
-                        reserved_row = cur.fetchone()
-                        existing_reserved = int(reserved_row[0]) if reserved_row else 0
-                        delta = requested_qty - existing_reserved
-                        if delta > available_qty:
-                            insufficient.append(f"{sku}(need_delta={delta},available={available_qty})")
-                            continue
-                        plan.append((sku, requested_qty, delta))
-
-                    if insufficient:
-                        conn.rollback()
-                        return False, insufficient
-
-                    for sku, requested_qty, delta in plan:
-                        if delta != 0:
-                            cur.execute(
-                                "UPDATE inventory_items SET available_qty = available_qty - %s, updated_at = NOW() WHERE sku = %s;",
-                                (delta, sku),
-                            )
-                        cur.execute(
-                            """
-                            INSERT INTO purchase_order_stock_usage (po_number, sku, reserved_qty, updated_at)
-                            VALUES (%s, %s, %s, NOW())
-                            ON CONFLICT (po_number, sku)
-                            DO UPDATE SET reserved_qty = EXCLUDED.reserved_qty, updated_at = NOW();
-                            """,
-                            (po_number, sku, requested_qty),
-                        )
-
+                    cur.execute("SELECT ok, details FROM reserve_stock(%s, %s::jsonb);", (po_number, json.dumps(items)))
+                    ok, details = cur.fetchone()
                 conn.commit()
-            return True, []
+            return bool(ok), list(details or [])
         except Exception as exc:  # noqa: BLE001
             return False, [f"stock_error:{exc}"]
 
 
+def _copy_text(value: str) -> str:
+    # COPY text format: escape the escape character and the column/row separators.
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _text_array(values: list[str]) -> str:
+    # Postgres array literal with every element quoted.
+    quoted = ('"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"' for value in values)
+    return "{" + ",".join(quoted) + "}"
+
+
+def _run_rows(pos: list[PurchaseOrder], input_root: Path) -> list[dict[str, Any]]:
+    rows = []
+    for po in pos:
+        try:
+            # Relative to the checkout, so a worker or a resume elsewhere resolves it against its own.
+            input_path = po.txt_path.resolve().relative_to(input_root.resolve()).as_posix()
+        except ValueError:
+            input_path = str(po.txt_path.resolve())
+        rows.append(
+            {
+                "test_name": po.name,
+                "po_number": ((po.req or {}).get("purchase_order") or {}).get("po_number"),
+                "req": po.req or {},
+                "input_path": input_path,
+                "dependencies": po.dependencies,
+            }
+        )
+    return rows
+
+
 # Backward-compatible names used by the workflow runner.
 EmailConnector = TxtEmailConnector
 DatabaseConnector = PostgresDatabaseConnector
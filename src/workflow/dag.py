@@ -1,76 +1,284 @@
+import heapq
 import json
-import re
+import os
+from collections.abc import Iterable
 from datetime import date
 from pathlib import Path
 
 from parse_txt import load_input_text, parse_purchase_order_text
-from workflow.alerts import needs_attention, priority_rank
+from workflow.documents import DocumentCache, order_date_hint_from_text
 from workflow.models import PurchaseOrder
+from workflow.rules import attention_rules
 
-ORDER_DATE_PATTERN = re.compile(r"^Order Date:\s*(\d{4}-\d{2}-\d{2})\s*$", re.IGNORECASE | re.MULTILINE)
 
-
-def extract_order_date_hint(path: Path) -> date | None:
+def extract_order_date_hint(path: Path, documents: DocumentCache | None = None) -> date | None:
     try:
+        if documents is not None:
+            return documents.hint(path).order_date_hint
         raw = load_input_text(path)
     except Exception:
         return None
+    return order_date_hint_from_text(raw)
 
-    match = ORDER_DATE_PATTERN.search(raw)
-    if not match:
-        return None
-    try:
-        return date.fromisoformat(match.group(1))
-    except ValueError:
-        return None
 
-
-def derive_attention_priority_hint(path: Path) -> int:
+def derive_attention_priority_hint(path: Path, documents: DocumentCache | None = None) -> int:
     try:
-        raw = load_input_text(path)
-        payload = parse_purchase_order_text(raw)
-        reasons = needs_attention(payload)
+        if documents is not None:
+            payload = documents.get(path).require_payload()
+        else:
+            payload = parse_purchase_order_text(load_input_text(path))
+        # Planning only needs the rank, so fail-only rules are never evaluated here.
+        # Rule params (due_within_days) take the defaults declared in the rule file.
+        return attention_rules().current().priority_rank(payload)
     except Exception:
         return 4
-    return priority_rank(reasons)
+
+
+DEPENDENCY_INDEX_NAME = ".dependency_index.json"
+DEPENDENCY_INDEX_VERSION = 2
+
+
+class DependencyConfigError(ValueError):
+    """dependencies.json entries that name tasks with no input file."""
+
+    def __init__(self, problems: list[str]) -> None:
+        self.problems = problems
+        shown = "; ".join(problems[:20])
+        more = f" (+{len(problems) - 20} more)" if len(problems) > 20 else ""
+        super().__init__(f"Invalid dependency config: {shown}{more}")
+
+
+def suite_input_paths(suite_dir: Path) -> list[Path]:
+    txt_paths = sorted(suite_dir.glob("input/*.txt")) + sorted(suite_dir.glob("input/*.pdf"))
+    if not txt_paths:
+        txt_paths = sorted(suite_dir.glob("*.txt")) + sorted(suite_dir.glob("*.pdf"))
+    return txt_paths
+
+
+def _file_stamp(path: Path) -> list[int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _suite_names(tests_root: Path) -> list[str]:
+    with os.scandir(tests_root) as entries:
+        # tests/ also holds the pytest modules; their __pycache__ is not a suite.
+        return sorted(entry.name for entry in entries if entry.is_dir() and not entry.name.startswith(("_", ".")))
+
+
+def _stamped_paths(tests_root: Path, suites: list[str]) -> list[str]:
+    # Every input file plus every dependencies.json (present or not), relative to tests_root.
+    paths = ["dependencies.json"]
+    for suite in suites:
+        suite_dir = tests_root / suite
+        paths.append(f"{suite}/dependencies.json")
+        paths.extend(path.relative_to(tests_root).as_posix() for path in suite_input_paths(suite_dir))
+    return paths
+
+
+def _in_scope(task_name: str, suite: str | None) -> bool:
+    return suite is None or task_name.split("/", 1)[0] == suite
+
+
+class DependencyIndex:
+    """Every task's resolved dependencies, compiled from ``tests/dependencies.json``
+    (full task IDs) and each ``tests/<suite>/dependencies.json`` (file stems,
+    overriding the global entry for the same task).
+
+    Compiling records every config problem: a key or dependency that names
+    no input file, and cycles. ``load`` raises ``DependencyConfigError`` or
+    ``CycleError`` only for problems that involve the requested suite (all
+    suites when None), so a broken entry in one suite does not stop another.
+    The result is cached in ``tests/.dependency_index.json`` and reused while
+    the suite list, the set of input files and the mtime/size of every input
+    file and dependencies.json stay the same.
+    """
+
+    def __init__(
+        self,
+        dependencies: dict[str, list[str]],
+        suites: list[str],
+        stamps: dict[str, list[int] | None],
+        problems: dict[str, list[str]] | None = None,
+        cycles: list[list[str]] | None = None,
+    ) -> None:
+        self.dependencies = dependencies
+        self.suites = suites
+        self.stamps = stamps
+        # Task name -> config problems of its entry.
+        self.problems = problems or {}
+        self.cycles = cycles or []
+
+    @classmethod
+    def load(cls, tests_root: Path, suite: str | None = None) -> "DependencyIndex":
+        cache_path = tests_root / DEPENDENCY_INDEX_NAME
+        index = cls._read_cache(tests_root, cache_path)
+        if index is None:
+            index = cls.compile(tests_root)
+            try:
+                index.save(cache_path)
+            except OSError:
+                pass
+        index.check(suite)
+        return index
+
+    def check(self, suite: str | None = None) -> None:
+        problems = [
+            problem for name, entries in self.problems.items() if _in_scope(name, suite) for problem in entries
+        ]
+        if problems:
+            raise DependencyConfigError(problems)
+        cycles = [cycle for cycle in self.cycles if any(_in_scope(name, suite) for name in cycle)]
+        if cycles:
+            raise CycleError(cycles)
+
+    @classmethod
+    def _read_cache(cls, tests_root: Path, cache_path: Path) -> "DependencyIndex | None":
+        try:
+            cached = json.loads(cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        suites = _suite_names(tests_root)
+        if cached.get("version") != DEPENDENCY_INDEX_VERSION or cached.get("suites") != suites:
+            return None
+        stamps = cached["stamps"]
+        # An input file that was added or removed changes the set of stamped paths.
+        if set(stamps) != set(_stamped_paths(tests_root, suites)):
+            return None
+        for relative_path, stamp in stamps.items():
+            if _file_stamp(tests_root / relative_path) != stamp:
+                return None
+        return cls(cached["dependencies"], suites, stamps, cached["problems"], cached["cycles"])
+
+    @classmethod
+    def compile(cls, tests_root: Path) -> "DependencyIndex":
+        suites = _suite_names(tests_root)
+        stamps = {path: _file_stamp(tests_root / path) for path in _stamped_paths(tests_root, suites)}
+        known: set[str] = set()
+        for suite in suites:
+            known.update(f"{suite}/{path.stem}" for path in suite_input_paths(tests_root / suite))
+
+        dependencies: dict[str, list[str]] = {}
+        sources: dict[str, Path] = {}
+        global_dependency_file = tests_root / "dependencies.json"
+        if global_dependency_file.exists():
+            for name, deps in json.loads(global_dependency_file.read_text(encoding="utf-8")).items():
+                dependencies[name] = list(deps)
+                sources[name] = global_dependency_file
+        for suite in suites:
+            suite_dependency_file = tests_root / suite / "dependencies.json"
+            if not suite_dependency_file.exists():
+                continue
+            for stem, deps in json.loads(suite_dependency_file.read_text(encoding="utf-8")).items():
+                dependencies[f"{suite}/{stem}"] = [f"{suite}/{dep}" for dep in deps]
+                sources[f"{suite}/{stem}"] = suite_dependency_file
+
+        problems: dict[str, list[str]] = {}
+        for name, deps in dependencies.items():
+            source = sources[name].relative_to(tests_root).as_posix()
+            entries = [f"{source}: no input file for task '{name}'"] if name not in known else []
+            entries.extend(f"{source}: '{name}' depends on unknown task '{dep}'" for dep in deps if dep not in known)
+            if entries:
+                problems[name] = entries
+        # Unknown tasks are already reported above; cycles can only run through known ones.
+        graph = {name: [dep for dep in dependencies.get(name, []) if dep in known] for name in known}
+        cycles = find_cycles(graph)
+        return cls(dependencies, suites, stamps, problems, cycles)
+
+    def save(self, cache_path: Path) -> None:
+        payload = {
+            "version": DEPENDENCY_INDEX_VERSION,
+            "suites": self.suites,
+            "stamps": self.stamps,
+            "dependencies": self.dependencies,
+            "problems": self.problems,
+            "cycles": self.cycles,
+        }
+        tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+        tmp_path.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp_path, cache_path)
+
+    def dependencies_for(self, task_names: Iterable[str]) -> dict[str, list[str]]:
+        """Dependencies of each task, limited to tasks in this run (as ``load_dependencies`` did)."""
+        ordered_names = list(task_names)
+        names = set(ordered_names)
+        return {name: [dep for dep in self.dependencies.get(name, []) if dep in names] for name in ordered_names}
 
 
 def load_dependencies(tests_root: Path, task_names: list[str], suite_name: str | None = None) -> dict[str, list[str]]:
-    dependencies: dict[str, list[str]] = {name: [] for name in task_names}
-
-    # Global dependencies file supports full task IDs, e.g. "suite_name/file_name".
-    global_dependency_file = tests_root / "dependencies.json"
-    if global_dependency_file.exists():
-        parsed = json.loads(global_dependency_file.read_text(encoding="utf-8"))
-        for name, deps in parsed.items():
-            if name in dependencies:
-                dependencies[name] = [dep for dep in deps if dep in dependencies]
-
-    # Suite-local dependencies file supports file stems only.
-    # Example in tests/attention_suite/dependencies.json:
-    # { "urgent_only": ["no_flags"] }
-    if suite_name is not None:
-        suite_dirs = [tests_root / suite_name]
-    else:
-        suite_dirs = sorted([p for p in tests_root.iterdir() if p.is_dir()])
+    # Kept for callers of the old API; tasks outside ``task_names`` (e.g. other suites) are dropped.
+    return DependencyIndex.load(tests_root, suite_name).dependencies_for(task_names)
 
-    for suite_dir in suite_dirs:
-        if not suite_dir.exists() or not suite_dir.is_dir():
-            continue
-        suite_dependency_file = suite_dir / "dependencies.json"
-        if not suite_dependency_file.exists():
+
+class CycleError(ValueError):
+    """The dependency graph has cycles; ``cycles`` lists the tasks of each one (sorted)."""
+
+    def __init__(self, cycles: list[list[str]]) -> None:
+        self.cycles = cycles
+        self.nodes = {name for cycle in cycles for name in cycle}
+        shown = "; ".join(" <-> ".join(cycle) for cycle in cycles[:10])
+        more = f" (+{len(cycles) - 10} more)" if len(cycles) > 10 else ""
+        super().__init__(f"Cycle detected in purchase order DAG: {shown}{more}")
+
+
+def find_cycles(graph: dict[str, list[str]]) -> list[list[str]]:
+    """Strongly connected components that form cycles (size > 1, or a self-loop), via iterative Tarjan."""
+    index: dict[str, int] = {}
+    lowlink: dict[str, int] = {}
+    on_stack: set[str] = set()
+    stack: list[str] = []
+    cycles: list[list[str]] = []
+    counter = 0
+
+    for root in sorted(graph):
+        if root in index:
             continue
-        parsed = json.loads(suite_dependency_file.read_text(encoding="utf-8"))
-        for stem, deps in parsed.items():
-            task_id = f"{suite_dir.name}/{stem}"
-            if task_id not in dependencies:
-                continue
-            expanded = [f"{suite_dir.name}/{dep}" for dep in deps]
-            dependencies[task_id] = [dep for dep in expanded if dep in dependencies]
-    return dependencies
+        work = [(root, iter(graph[root]))]
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, edges = work[-1]
+            for nxt in edges:
+                if nxt not in index:
+                    index[nxt] = lowlink[nxt] = counter
+                    counter += 1
+                    stack.append(nxt)
+                    on_stack.add(nxt)
+                    work.append((nxt, iter(graph[nxt])))
+                    break
+                if nxt in on_stack:
+                    lowlink[node] = min(lowlink[node], index[nxt])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component: list[str] = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in graph[node]:
+                        cycles.append(sorted(component))
+    return sorted(cycles)
 
 
 def topo_sort(tasks: dict[str, PurchaseOrder]) -> list[str]:
+    """Dependency order; among ready tasks the lowest
+    (attention priority, undated last, order date, name) goes first.
+
+    Each task's key is computed once and turned into a rank by a single sort;
+    ready tasks sit in a heap of ranks, so planning is O((V + E) log V).
+    Raises ``CycleError`` naming the tasks on each cycle.
+    """
     indegree = {name: 0 for name in tasks}
     children: dict[str, list[str]] = {name: [] for name in tasks}
 
@@ -81,51 +289,60 @@ def topo_sort(tasks: dict[str, PurchaseOrder]) -> list[str]:
             indegree[name] += 1
             children[dep].append(name)
 
-    def task_sort_key(task_name: str) -> tuple[int, bool, date, str]:
-        task = tasks[task_name]
-        return (
-            task.attention_priority_hint,
-            task.order_date_hint is None,
-            task.order_date_hint or date.max,
-            task_name,
-        )
-
-    ready = sorted([name for name, count in indegree.items() if count == 0], key=task_sort_key)
+    # Rank every task by its key once; the heap then only compares ints.
+    by_key = sorted(
+        tasks,
+        key=lambda name: (
+            tasks[name].attention_priority_hint,
+            tasks[name].order_date_hint is None,
+            tasks[name].order_date_hint or date.max,
+            name,
+        ),
+    )
+    rank = {name: position for position, name in enumerate(by_key)}
+    ready = [rank[name] for name, count in indegree.items() if count == 0]
+    heapq.heapify(ready)
     ordered: list[str] = []
 
     while ready:
-        node = ready.pop(0)
+        node = by_key[heapq.heappop(ready)]
         ordered.append(node)
-        for child in sorted(children[node], key=task_sort_key):
+        for child in children[node]:
             indegree[child] -= 1
             if indegree[child] == 0:
-                ready.append(child)
-                ready.sort(key=task_sort_key)
+                heapq.heappush(ready, rank[child])
 
     if len(ordered) != len(tasks):
-        raise ValueError("Cycle detected in purchase order DAG.")
+        # Unplaced tasks are the cycles plus everything downstream of them.
+        blocked = {name: children[name] for name, count in indegree.items() if count}
+        raise CycleError(find_cycles(blocked))
     return ordered
 
 
-def discover_purchase_orders(tests_root: Path, suite_name: str | None = None) -> dict[str, PurchaseOrder]:
+def discover_purchase_orders(
+    tests_root: Path,
+    suite_name: str | None = None,
+    documents: DocumentCache | None = None,
+    parse_procs: int = 1,
+) -> dict[str, PurchaseOrder]:
     tasks: dict[str, PurchaseOrder] = {}
     if suite_name is not None:
-        suite_dir = tests_root / suite_name
-        txt_paths = sorted(suite_dir.glob("input/*.txt")) + sorted(suite_dir.glob("input/*.pdf"))
-        if not txt_paths:
-            txt_paths = sorted(suite_dir.glob("*.txt")) + sorted(suite_dir.glob("*.pdf"))
+        txt_paths = suite_input_paths(tests_root / suite_name)
     else:
         txt_paths = sorted(tests_root.glob("*/input/*.txt")) + sorted(tests_root.glob("*/input/*.pdf"))
         if not txt_paths:
             txt_paths = sorted(tests_root.glob("*/*.txt")) + sorted(tests_root.glob("*/*.pdf"))
 
+    if documents is not None and parse_procs > 1:
+        documents.prefetch(txt_paths, parse_procs)
+
     for txt_path in txt_paths:
         current_suite_name = txt_path.parent.parent.name if txt_path.parent.name == "input" else txt_path.parent.name
         task_name = f"{current_suite_name}/{txt_path.stem}"
         tasks[task_name] = PurchaseOrder(
             name=task_name,
             txt_path=txt_path,
-            attention_priority_hint=derive_attention_priority_hint(txt_path),
-            order_date_hint=extract_order_date_hint(txt_path),
+            attention_priority_hint=derive_attention_priority_hint(txt_path, documents),
+            order_date_hint=extract_order_date_hint(txt_path, documents),
         )
     return tasks
@@ -0,0 +1,227 @@
+import hashlib
+import io
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+from parse_txt import (
+    PdfLineSource,
+    decode_input_bytes,
+    parse_in_processes,
+    parse_purchase_order_stream,
+    parse_purchase_order_text,
+)
+
+ORDER_DATE_PATTERN = re.compile(r"^Order Date:\s*(\d{4}-\d{2}-\d{2})\s*$", re.IGNORECASE | re.MULTILINE)
+
+
+def order_date_hint_from_text(raw: str) -> date | None:
+    match = ORDER_DATE_PATTERN.search(raw)
+    if not match:
+        return None
+    try:
+        return date.fromisoformat(match.group(1))
+    except ValueError:
+        return None
+
+
+@dataclass(frozen=True)
+class ParsedDocument:
+    path: Path
+    size: int
+    mtime_ns: int
+    digest: str
+    payload: dict[str, Any] | None
+    order_date_hint: date | None
+    error: str | None = None
+    pages_read: int | None = None
+    payload_bytes: int = 0
+
+    def require_payload(self) -> dict[str, Any]:
+        if self.payload is None:
+            raise RuntimeError(self.error or f"Could not parse {self.path}")
+        return self.payload
+
+
+def payload_size(value: Any) -> int:
+    """Approximate in-memory size of a parsed payload (nested dicts, lists and scalars)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += payload_size(key) + payload_size(item)
+    elif isinstance(value, list):
+        for item in value:
+            size += payload_size(item)
+    return size
+
+
+def load_document(path: Path, stat: os.stat_result | None = None) -> ParsedDocument:
+    """Read, hash and parse one input file. Parse errors are captured, not raised."""
+    stat = stat or path.stat()
+    data = path.read_bytes()
+    return _parse_document(path, stat, data, hashlib.sha256(data).hexdigest())
+
+
+def _parse_document(path: Path, stat: os.stat_result, data: bytes, digest: str) -> ParsedDocument:
+    if path.suffix.lower() == ".pdf":
+        return _load_pdf_document(path, stat, data, digest)
+    try:
+        raw = decode_input_bytes(data, path.suffix)
+    except Exception as exc:  # noqa: BLE001
+        return ParsedDocument(path, stat.st_size, stat.st_mtime_ns, digest, None, None, str(exc))
+    order_date_hint = order_date_hint_from_text(raw)
+    try:
+        payload = parse_purchase_order_text(raw)
+    except Exception as exc:  # noqa: BLE001
+        return ParsedDocument(path, stat.st_size, stat.st_mtime_ns, digest, None, order_date_hint, str(exc))
+    return ParsedDocument(
+        path, stat.st_size, stat.st_mtime_ns, digest, payload, order_date_hint, payload_bytes=payload_size(payload)
+    )
+
+
+def _load_pdf_document(path: Path, stat: os.stat_result, data: bytes, digest: str) -> ParsedDocument:
+    # Pages are extracted only as the parser reaches them, up to the sign-off page.
+    try:
+        pdf = PdfLineSource(io.BytesIO(data))
+    except Exception as exc:  # noqa: BLE001
+        return ParsedDocument(path, stat.st_size, stat.st_mtime_ns, digest, None, None, str(exc))
+    payload: dict[str, Any] | None = None
+    error: str | None = None
+    try:
+        payload = parse_purchase_order_stream(pdf, on_signoff=pdf.stop_after_next_page)
+    except Exception as exc:  # noqa: BLE001
+        error = str(exc)
+    order_date_hint = order_date_hint_from_text(pdf.text())
+    return ParsedDocument(
+        path,
+        stat.st_size,
+        stat.st_mtime_ns,
+        digest,
+        payload,
+        order_date_hint,
+        error,
+        pdf.pages_read,
+        payload_size(payload) if payload is not None else 0,
+    )
+
+
+def failed_document(path: Path, error: str) -> ParsedDocument:
+    """Error entry for a file whose load failed outside ``load_document`` (e.g. a parse worker timeout)."""
+    stat = path.stat()
+    digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    return ParsedDocument(path, stat.st_size, stat.st_mtime_ns, digest, None, None, error)
+
+
+class DocumentCache:
+    """Bounded cache of parsed input files shared by discovery and task execution.
+
+    Entries are keyed on path and revalidated against the file's mtime/size on
+    every lookup; when those changed but the content hash did not, the parsed
+    payload is reused. ``max_bytes`` bounds the estimated in-memory size of the
+    cached payloads. A document that does not fit keeps only its hints (digest,
+    order date, pages read): discovery of a run larger than the cache plans
+    from those and the task parses the file again when it runs, instead of
+    evicting documents that are still waiting for their task. ``release()``
+    drops a finished task's payload. Hints are a few hundred bytes each; the
+    oldest are evicted beyond ``max_hints``. Payloads are shared between
+    callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_hints: int = 100_000) -> None:
+        self.max_bytes = max_bytes
+        self.max_hints = max_hints
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._documents: dict[str, ParsedDocument] = {}
+        self._hints: OrderedDict[str, ParsedDocument] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def get(self, path: Path) -> ParsedDocument:
+        key = os.fspath(path)
+        stat = os.stat(key)
+        with self._lock:
+            cached = self._documents.get(key)
+            if cached is not None and cached.size == stat.st_size and cached.mtime_ns == stat.st_mtime_ns:
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        data = Path(path).read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        if cached is not None and cached.digest == digest:
+            # Touched but unchanged: keep the already-parsed payload, skip the parse.
+            document = replace(cached, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        else:
+            document = _parse_document(Path(path), stat, data, digest)
+        self.put(document)
+        return document
+
+    def hint(self, path: Path) -> ParsedDocument:
+        """``path``'s digest and planning hints; the payload may be absent. Parses only if nothing is cached."""
+        key = os.fspath(path)
+        stat = os.stat(key)
+        with self._lock:
+            cached = self._documents.get(key) or self._hints.get(key)
+            if cached is not None and cached.size == stat.st_size and cached.mtime_ns == stat.st_mtime_ns:
+                if key in self._hints:
+                    self._hints.move_to_end(key)
+                return cached
+        return self.get(path)
+
+    def put(self, document: ParsedDocument) -> None:
+        key = os.fspath(document.path)
+        with self._lock:
+            self._forget(key)
+            if self._total_bytes + document.payload_bytes <= self.max_bytes:
+                self._documents[key] = document
+                self._total_bytes += document.payload_bytes
+            else:
+                # No room for the payload: keep the hints, the task parses the file again.
+                self._keep_hints(key, document)
+
+    def release(self, path: Path) -> None:
+        """Drop ``path``'s payload once its task is done, keeping its hints."""
+        key = os.fspath(path)
+        with self._lock:
+            document = self._documents.get(key)
+            if document is None:
+                return
+            self._forget(key)
+            self._keep_hints(key, document)
+
+    def _keep_hints(self, key: str, document: ParsedDocument) -> None:
+        self._hints[key] = replace(document, payload=None, payload_bytes=0)
+        while len(self._hints) > self.max_hints:
+            self._hints.popitem(last=False)
+            self.evictions += 1
+
+    def _forget(self, key: str) -> None:
+        document = self._documents.pop(key, None)
+        if document is not None:
+            self._total_bytes -= document.payload_bytes
+        self._hints.pop(key, None)
+
+    def prefetch(self, paths: list[Path], procs: int, timeout: float | None = None) -> None:
+        """Load ``paths`` on ``procs`` worker processes and cache the results.
+
+        Files whose worker failed or timed out are cached as error entries, so
+        the task that owns the file fails instead of parsing it again in-process.
+        """
+        for path, document, error in parse_in_processes(paths, procs, worker=load_document, timeout=timeout):
+            if error is not None:
+                try:
+                    document = failed_document(path, error)
+                except OSError:
+                    continue
+            self.put(document)
@@ -0,0 +1,68 @@
+import heapq
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+
+class DagExecutor:
+    """Dispatch DAG tasks as soon as every upstream task has finished.
+
+    ``order`` is the priority order produced by ``topo_sort``; among tasks that
+    are ready at the same time the one earliest in ``order`` is dispatched
+    first. A task is handed to ``run_task`` once all of its dependencies have
+    reached a terminal outcome (SUCCESS, FAILED or PENDING-blocked); ``run_task``
+    decides what an unmet dependency means and returns the task's final state.
+
+    With ``workers=1`` tasks run inline in exactly ``order``; with more workers
+    up to ``workers`` tasks run at once on a thread pool.
+
+    An exception raised by ``run_task`` resolves that task as FAILED and is
+    kept in ``errors``; every other task is still dispatched.
+    """
+
+    def __init__(self, order: list[str], dependencies: dict[str, list[str]], workers: int = 1) -> None:
+        self.order = order
+        self.workers = max(1, workers)
+        self._rank = {name: idx for idx, name in enumerate(order)}
+        self._children: dict[str, list[str]] = {name: [] for name in order}
+        self._waiting: dict[str, int] = {}
+        self.errors: dict[str, Exception] = {}
+        for name in order:
+            deps = dependencies.get(name, [])
+            self._waiting[name] = len(deps)
+            for dep in deps:
+                self._children[dep].append(name)
+
+    def run(self, run_task: Callable[[str], str]) -> dict[str, str]:
+        results: dict[str, str] = {}
+        ready = [self._rank[name] for name in self.order if self._waiting[name] == 0]
+        heapq.heapify(ready)
+
+        def resolve(name: str, outcome: Callable[[], str]) -> None:
+            try:
+                state = outcome()
+            except Exception as exc:  # noqa: BLE001
+                # Keep draining: the tasks behind this one still need their terminal outcome.
+                self.errors[name] = exc
+                state = "FAILED"
+            results[name] = state
+            for child in self._children[name]:
+                self._waiting[child] -= 1
+                if self._waiting[child] == 0:
+                    heapq.heappush(ready, self._rank[child])
+
+        if self.workers == 1:
+            while ready:
+                name = self.order[heapq.heappop(ready)]
+                resolve(name, lambda: run_task(name))
+            return results
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="po-task") as pool:
+            running: dict[Future[str], str] = {}
+            while ready or running:
+                while ready and len(running) < self.workers:
+                    name = self.order[heapq.heappop(ready)]
+                    running[pool.submit(run_task, name)] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in sorted(done, key=lambda item: self._rank[running[item]]):
+                    resolve(running.pop(future), future.result)
+        return results
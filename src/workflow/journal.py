@@ -0,0 +1,214 @@
+import threading
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from workflow.connectors import DatabaseConnectorBase
+from workflow.models import PurchaseOrder
+
+TERMINAL_STATES = {"SUCCESS", "FAILED"}
+
+
+class JournalFlushError(RuntimeError):
+    """Journaled updates of ``run_ids`` could not be written; they stay journaled."""
+
+    def __init__(self, errors: dict[int, Exception]) -> None:
+        self.run_ids = frozenset(errors)
+        shown = "; ".join(f"run {run_id}: {exc}" for run_id, exc in sorted(errors.items())[:20])
+        more = f" (+{len(errors) - 20} more)" if len(errors) > 20 else ""
+        super().__init__(f"write-behind flush failed for {len(errors)} run(s): {shown}{more}")
+
+
+class WriteBehindDatabaseConnector(DatabaseConnectorBase):
+    """Journal purchase_order_runs updates and write them to the inner connector in batches.
+
+    ``set_attempts``, ``set_purchase_order_request``, ``set_output`` and
+    ``transition_purchase_order`` are buffered in call order and flushed through
+    ``apply_purchase_order_run_updates`` once ``max_batch`` updates are pending,
+    ``flush_interval`` seconds have passed, or a task reaches SUCCESS/FAILED.
+    The terminal flush is synchronous, so a task is durable once its final
+    transition call returns. Everything else is forwarded unchanged.
+
+    When a batch fails, each run's updates are written on their own, so one
+    run's bad update cannot fail the others. Updates of a run that still
+    fails are never dropped: they stay journaled, in order, and are retried by
+    every later flush. Only that run's terminal transition raises
+    ``JournalFlushError``, and ``flush()``/``close()`` raise while any are left,
+    so the caller fails the workflow run instead of losing history.
+    """
+
+    def __init__(
+        self,
+        inner: DatabaseConnectorBase,
+        max_batch: int = 200,
+        flush_interval: float = 1.0,
+    ) -> None:
+        self.inner = inner
+        self.max_batch = max(1, max_batch)
+        self.flush_interval = flush_interval
+        self.flushes = 0
+        self._pending: list[dict[str, Any]] = []
+        # Runs whose updates failed on their own at the last flush.
+        self._failed: dict[int, Exception] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher: threading.Thread | None = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_periodically, name="write-behind", daemon=True)
+            self._flusher.start()
+
+    def _flush_periodically(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except JournalFlushError:
+                # Still journaled; reported to the owning task by its terminal flush.
+                pass
+
+    def _journal(self, update: dict[str, Any], force_flush: bool = False) -> None:
+        update["at"] = datetime.now(UTC).isoformat()
+        with self._lock:
+            self._pending.append(update)
+            should_flush = force_flush or len(self._pending) >= self.max_batch
+        if not should_flush:
+            return
+        try:
+            self.flush()
+        except JournalFlushError as exc:
+            # Other runs' failures belong to their own tasks; a non-terminal write must not
+            # raise into a task attempt, whose retry would repeat its side effects.
+            if force_flush and update["run_id"] in exc.run_ids:
+                raise
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            held = [update for update in batch if update["run_id"] in self._failed]
+            rest = [update for update in batch if update["run_id"] not in self._failed]
+            failed: dict[int, Exception] = {}
+            if rest:
+                try:
+                    self.inner.apply_purchase_order_run_updates(rest)
+                except Exception:  # noqa: BLE001
+                    failed.update(self._apply_per_run(rest))
+            # Runs that failed before are written on their own, never in the shared batch.
+            failed.update(self._apply_per_run(held))
+            self._failed = failed
+            if failed:
+                # Keep the failed runs' updates, in order and ahead of newer ones.
+                with self._lock:
+                    self._pending[:0] = [update for update in batch if update["run_id"] in failed]
+                raise JournalFlushError(failed)
+            self.flushes += 1
+
+    def _apply_per_run(self, updates: list[dict[str, Any]]) -> dict[int, Exception]:
+        by_run: dict[int, list[dict[str, Any]]] = {}
+        for update in updates:
+            by_run.setdefault(update["run_id"], []).append(update)
+        failed: dict[int, Exception] = {}
+        for run_id, run_updates in by_run.items():
+            try:
+                self.inner.apply_purchase_order_run_updates(run_updates)
+            except Exception as exc:  # noqa: BLE001
+                failed[run_id] = exc
+        return failed
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        try:
+            self.flush()
+        finally:
+            self.inner.close()
+
+    def set_purchase_order_request(
+        self,
+        purchase_order_run_id: int,
+        req_payload: dict[str, Any],
+        po_number: str | None = None,
+    ) -> None:
+        self._journal({"op": "request", "run_id": purchase_order_run_id, "req": req_payload, "po_number": po_number})
+
+    def set_attempts(self, purchase_order_run_id: int, attempts: int) -> None:
+        self._journal({"op": "attempts", "run_id": purchase_order_run_id, "attempts": attempts})
+
+    def transition_purchase_order(
+        self, purchase_order_run_id: int, new_state: str, error_message: str | None = None
+    ) -> None:
+        self._journal(
+            {"op": "transition", "run_id": purchase_order_run_id, "state": new_state, "error_message": error_message},
+            force_flush=new_state in TERMINAL_STATES,
+        )
+
+    def set_output(self, purchase_order_run_id: int, output_payload: dict[str, Any]) -> None:
+        self._journal({"op": "output", "run_id": purchase_order_run_id, "output": output_payload})
+
+    def apply_purchase_order_run_updates(self, updates: list[dict[str, Any]]) -> None:
+        for update in updates:
+            self._journal(dict(update))
+
+    def create_workflow_run(self) -> int:
+        return self.inner.create_workflow_run()
+
+    def transition_workflow(self, run_id: int, new_state: str, error_message: str | None = None) -> None:
+        # Task state must be durable before the workflow reports success; a failure is
+        # recorded even while some task updates are stuck in the journal.
+        try:
+            self.flush()
+        except JournalFlushError:
+            if new_state == "SUCCESS":
+                raise
+        self.inner.transition_workflow(run_id, new_state, error_message)
+
+    def create_purchase_order_run(self, workflow_run_id: int, po: PurchaseOrder) -> int:
+        return self.inner.create_purchase_order_run(workflow_run_id, po)
+
+    def create_purchase_order_runs(self, workflow_run_id: int, pos: list[PurchaseOrder]) -> dict[str, int]:
+        return self.inner.create_purchase_order_runs(workflow_run_id, pos)
+
+    def upsert_purchase_order(self, payload: dict[str, Any]) -> tuple[int, bool]:
+        return self.inner.upsert_purchase_order(payload)
+
+    def insert_alert(self, purchase_order_id: int, po_number: str, reasons: list[str], fields: dict[str, Any]) -> None:
+        self.inner.insert_alert(purchase_order_id, po_number, reasons, fields)
+
+    def reserve_stock(self, po_number: str, line_items: list[dict[str, Any]]) -> tuple[bool, list[str]]:
+        return self.inner.reserve_stock(po_number, line_items)
+
+    def enqueue_purchase_order_runs(
+        self,
+        workflow_run_id: int,
+        pos: list[PurchaseOrder],
+        input_root: Path,
+    ) -> dict[str, int]:
+        return self.inner.enqueue_purchase_order_runs(workflow_run_id, pos, input_root)
+
+    def claim_purchase_order_run(
+        self, workflow_run_id: int, worker: str, lease_seconds: int
+    ) -> dict[str, Any] | None:
+        return self.inner.claim_purchase_order_run(workflow_run_id, worker, lease_seconds)
+
+    def heartbeat_purchase_order_runs(self, worker: str, lease_seconds: int) -> int:
+        return self.inner.heartbeat_purchase_order_runs(worker, lease_seconds)
+
+    def apply_leased_purchase_order_run_updates(self, worker: str, updates: list[dict[str, Any]]) -> list[int]:
+        return self.inner.apply_leased_purchase_order_run_updates(worker, updates)
+
+    def recover_expired_purchase_order_runs(self, workflow_run_id: int) -> int:
+        return self.inner.recover_expired_purchase_order_runs(workflow_run_id)
+
+    def finish_queued_workflow_run(self, workflow_run_id: int) -> tuple[str, list[dict[str, Any]]] | None:
+        # Every journaled transition must be visible before the run can be judged finished.
+        self.flush()
+        return self.inner.finish_queued_workflow_run(workflow_run_id)
+
+    def workflow_run_state(self, workflow_run_id: int) -> str | None:
+        return self.inner.workflow_run_state(workflow_run_id)
+
+    def resume_workflow_run(self, workflow_run_id: int, force: bool = False) -> list[dict[str, Any]]:
+        return self.inner.resume_workflow_run(workflow_run_id, force)
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+from workflow.documents import DocumentCache
+from workflow.models import PurchaseOrder
+
+MANIFEST_NAME = ".run_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def _file_digest(path: Path) -> str | None:
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+class IncrementalManifest:
+    """Content-hash manifest that lets re-runs skip tasks whose inputs are unchanged.
+
+    Each suite directory keeps a ``.run_manifest.json`` mapping task stems to the
+    fingerprint of their last SUCCESS (input hash + attention config + upstream
+    fingerprints), the hashes of the parsed/alert files it wrote, and the
+    reasons/output needed to report it again. A task is a cache hit only when
+    its fingerprint matches and those output files are still intact.
+    """
+
+    def __init__(
+        self,
+        tasks: dict[str, PurchaseOrder],
+        order: list[str],
+        documents: DocumentCache,
+        config_fingerprint: str,
+    ) -> None:
+        self.tasks = tasks
+        self.hits = 0
+        self._lock = threading.Lock()
+        self._fingerprints: dict[str, str | None] = {}
+        for task_name in order:
+            po = tasks[task_name]
+            try:
+                input_digest = documents.hint(po.txt_path).digest
+            except OSError:
+                input_digest = None
+            upstream = [self._fingerprints.get(dep) for dep in sorted(po.dependencies)]
+            if input_digest is None or any(fp is None for fp in upstream):
+                self._fingerprints[task_name] = None
+                continue
+            material = json.dumps(
+                [MANIFEST_VERSION, input_digest, config_fingerprint, sorted(po.dependencies), upstream]
+            )
+            self._fingerprints[task_name] = hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+        self._manifests: dict[Path, dict[str, Any]] = {}
+        for po in tasks.values():
+            manifest_path = po.test_dir / MANIFEST_NAME
+            if manifest_path in self._manifests:
+                continue
+            entries: dict[str, Any] = {}
+            if manifest_path.exists():
+                try:
+                    loaded = json.loads(manifest_path.read_text(encoding="utf-8"))
+                    if loaded.get("version") == MANIFEST_VERSION:
+                        entries = loaded.get("tasks", {})
+                except (OSError, ValueError):
+                    entries = {}
+            self._manifests[manifest_path] = entries
+        self._dirty: set[Path] = set()
+        self._unhashed: dict[str, dict[str, Any]] = {}
+
+    def _entries(self, po: PurchaseOrder) -> tuple[Path, dict[str, Any]]:
+        manifest_path = po.test_dir / MANIFEST_NAME
+        return manifest_path, self._manifests[manifest_path]
+
+    def cached_entry(self, task_name: str) -> dict[str, Any] | None:
+        fingerprint = self._fingerprints.get(task_name)
+        if fingerprint is None:
+            return None
+        po = self.tasks[task_name]
+        with self._lock:
+            entry = self._entries(po)[1].get(po.txt_path.stem)
+        if not entry or entry.get("fingerprint") != fingerprint:
+            return None
+        for relative_path, digest in entry.get("outputs", {}).items():
+            if _file_digest(po.test_dir / relative_path) != digest:
+                return None
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def record_success(
+        self,
+        task_name: str,
+        reasons: list[str],
+        po_number: str | None,
+        output: dict[str, Any],
+    ) -> None:
+        fingerprint = self._fingerprints.get(task_name)
+        po = self.tasks[task_name]
+        if fingerprint is None:
+            self.forget(task_name)
+            return
+        entry = {
+            "fingerprint": fingerprint,
+            "outputs": {},
+            "reasons": reasons,
+            "po_number": po_number,
+            "output": output,
+        }
+        with self._lock:
+            manifest_path, entries = self._entries(po)
+            entries[po.txt_path.stem] = entry
+            self._dirty.add(manifest_path)
+            # Output files may still be queued on the artifact writer; hash them in save().
+            self._unhashed[task_name] = entry
+
+    def _hash_outputs(self, task_name: str, entry: dict[str, Any]) -> None:
+        po = self.tasks[task_name]
+        for path in (po.json_path, po.alert_path):
+            digest = _file_digest(path)
+            if digest is not None:
+                entry["outputs"][path.relative_to(po.test_dir).as_posix()] = digest
+
+    def forget(self, task_name: str) -> None:
+        po = self.tasks[task_name]
+        with self._lock:
+            self._unhashed.pop(task_name, None)
+            manifest_path, entries = self._entries(po)
+            if entries.pop(po.txt_path.stem, None) is not None:
+                self._dirty.add(manifest_path)
+
+    def save(self) -> None:
+        """Write changed manifests; call once the task outputs are on disk."""
+        with self._lock:
+            unhashed, self._unhashed = self._unhashed, {}
+            for task_name, entry in unhashed.items():
+                self._hash_outputs(task_name, entry)
+            dirty, self._dirty = self._dirty, set()
+            for manifest_path in sorted(dirty):
+                payload = {"version": MANIFEST_VERSION, "tasks": self._manifests[manifest_path]}
+                tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+                tmp_path.write_text(json.dumps(payload, indent=2, sort_keys=True), encoding="utf-8")
+                os.replace(tmp_path, manifest_path)
@@ -1,39 +1,134 @@
-from dataclasses import dataclass, field
+import json
+import sys
+import zlib
 from datetime import date
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
 VALID_STATES = {"PENDING", "RUNNING", "SUCCESS", "FAILED"}
 
 
-@dataclass
+@lru_cache(maxsize=4096)
+def _test_dir_for(input_dir: Path) -> Path:
+    # One shared Path per suite directory instead of one per task.
+    if input_dir.name == "input":
+        return input_dir.parent
+    return input_dir
+
+
 class PurchaseOrder:
-    name: str
-    txt_path: Path
-    attention_priority_hint: int = 2
-    order_date_hint: date | None = None
-    req: dict[str, Any] | None = None
-    state: str = "PENDING"
-    dependencies: list[str] = field(default_factory=list)
-
-    def __post_init__(self) -> None:
-        if self.state not in VALID_STATES:
-            raise ValueError(f"invalid state: {self.state}")
+    """One planned task: its input file, planning hints, state and parsed payload.
+
+    Slotted so a 100k-task plan stays small: the suite name is interned, the
+    suite directory is shared between tasks, and output paths are built once
+    on first use. Once a task is finished, ``compact()`` swaps the parsed dict
+    for a zlib-compressed JSON blob that ``req`` decodes on demand (each read
+    returns a fresh dict), so only in-flight tasks hold full payloads.
+    """
+
+    __slots__ = (
+        "name",
+        "suite",
+        "txt_path",
+        "attention_priority_hint",
+        "order_date_hint",
+        "state",
+        "dependencies",
+        "_req",
+        "_req_blob",
+        "_req_text",
+        "_req_indent",
+        "_json_path",
+        "_alert_path",
+        "_response_path",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        txt_path: Path,
+        attention_priority_hint: int = 2,
+        order_date_hint: date | None = None,
+        req: dict[str, Any] | None = None,
+        state: str = "PENDING",
+        dependencies: list[str] | None = None,
+    ) -> None:
+        if state not in VALID_STATES:
+            raise ValueError(f"invalid state: {state}")
+        self.name = name
+        self.suite = sys.intern(name.split("/", 1)[0])
+        self.txt_path = txt_path
+        self.attention_priority_hint = attention_priority_hint
+        self.order_date_hint = order_date_hint
+        self.state = state
+        self.dependencies = dependencies if dependencies is not None else []
+        self._req = req
+        self._req_blob: bytes | None = None
+        self._req_text: str | None = None
+        self._req_indent: int | None = None
+        self._json_path: Path | None = None
+        self._alert_path: Path | None = None
+        self._response_path: Path | None = None
+
+    def __repr__(self) -> str:
+        return (
+            f"PurchaseOrder(name={self.name!r}, txt_path={self.txt_path!r}, state={self.state!r}, "
+            f"attention_priority_hint={self.attention_priority_hint!r}, "
+            f"order_date_hint={self.order_date_hint!r}, dependencies={self.dependencies!r})"
+        )
+
+    @property
+    def req(self) -> dict[str, Any] | None:
+        if self._req is None and self._req_blob is not None:
+            return json.loads(zlib.decompress(self._req_blob))
+        return self._req
+
+    @req.setter
+    def req(self, value: dict[str, Any] | None) -> None:
+        self._req = value
+        self._req_blob = None
+        self._req_text = None
+
+    def req_json(self, indent: int | None = None) -> str:
+        """``req`` serialized as JSON, cached so artifacts and compaction dump it once."""
+        separators = None if indent is not None else (",", ":")
+        if self._req is None:
+            # Nothing, or a compacted payload: don't pin a copy on a finished task.
+            return json.dumps(self.req or {}, indent=indent, separators=separators)
+        if self._req_text is None or self._req_indent != indent:
+            self._req_text = json.dumps(self._req, indent=indent, separators=separators)
+            self._req_indent = indent
+        return self._req_text
+
+    def compact(self) -> None:
+        """Shrink a finished task: compress its payload and drop its cached output paths."""
+        self._json_path = self._alert_path = self._response_path = None
+        if self._req is None:
+            return
+        encoded = (self._req_text or json.dumps(self._req, separators=(",", ":"))).encode("utf-8")
+        self._req_blob = zlib.compress(encoded, 1)
+        self._req = None
+        self._req_text = None
 
     @property
     def test_dir(self) -> Path:
-        if self.txt_path.parent.name == "input":
-            return self.txt_path.parent.parent
-        return self.txt_path.parent
+        return _test_dir_for(self.txt_path.parent)
 
     @property
     def json_path(self) -> Path:
-        return self.test_dir / "parsed" / f"{self.txt_path.stem}.json"
+        if self._json_path is None:
+            self._json_path = self.test_dir / "parsed" / f"{self.txt_path.stem}.json"
+        return self._json_path
 
     @property
     def alert_path(self) -> Path:
-        return self.test_dir / "alerts" / f"{self.txt_path.stem}.alerts.json"
+        if self._alert_path is None:
+            self._alert_path = self.test_dir / "alerts" / f"{self.txt_path.stem}.alerts.json"
+        return self._alert_path
 
     @property
     def response_path(self) -> Path:
-        return self.test_dir / "response" / f"{self.txt_path.stem}.response.txt"
+        if self._response_path is None:
+            self._response_path = self.test_dir / "response" / f"{self.txt_path.stem}.response.txt"
+        return self._response_path
@@ -0,0 +1,241 @@
+import os
+import socket
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from workflow.connectors import DatabaseConnectorBase
+from workflow.models import PurchaseOrder
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeasedDatabaseConnector(DatabaseConnectorBase):
+    """Fence a queue worker's purchase_order_runs writes by its lease.
+
+    ``set_attempts``, ``set_purchase_order_request``, ``set_output`` and
+    ``transition_purchase_order`` (and journaled batches of them) go through
+    ``apply_leased_purchase_order_run_updates``: a run whose lease this worker
+    lost to recovery is left alone, and its id is remembered so the caller
+    can drop the task (``lost``). Everything else is forwarded unchanged.
+    """
+
+    def __init__(self, inner: DatabaseConnectorBase, worker_id: str) -> None:
+        self.inner = inner
+        self.worker_id = worker_id
+        self._lost: set[int] = set()
+        self._lock = threading.Lock()
+
+    def lost(self, purchase_order_run_id: int) -> bool:
+        with self._lock:
+            return purchase_order_run_id in self._lost
+
+    def apply_purchase_order_run_updates(self, updates: list[dict[str, Any]]) -> None:
+        lost = self.inner.apply_leased_purchase_order_run_updates(self.worker_id, updates)
+        if lost:
+            with self._lock:
+                self._lost.update(lost)
+
+    def set_purchase_order_request(
+        self,
+        purchase_order_run_id: int,
+        req_payload: dict[str, Any],
+        po_number: str | None = None,
+    ) -> None:
+        self.apply_purchase_order_run_updates(
+            [{"op": "request", "run_id": purchase_order_run_id, "req": req_payload, "po_number": po_number}]
+        )
+
+    def set_attempts(self, purchase_order_run_id: int, attempts: int) -> None:
+        self.apply_purchase_order_run_updates(
+            [{"op": "attempts", "run_id": purchase_order_run_id, "attempts": attempts}]
+        )
+
+    def transition_purchase_order(
+        self, purchase_order_run_id: int, new_state: str, error_message: str | None = None
+    ) -> None:
+        self.apply_purchase_order_run_updates(
+            [{"op": "transition", "run_id": purchase_order_run_id, "state": new_state, "error_message": error_message}]
+        )
+
+    def set_output(self, purchase_order_run_id: int, output_payload: dict[str, Any]) -> None:
+        self.apply_purchase_order_run_updates(
+            [{"op": "output", "run_id": purchase_order_run_id, "output": output_payload}]
+        )
+
+    def flush(self) -> None:
+        self.inner.flush()
+
+    def close(self) -> None:
+        self.inner.close()
+
+    def create_workflow_run(self) -> int:
+        return self.inner.create_workflow_run()
+
+    def transition_workflow(self, run_id: int, new_state: str, error_message: str | None = None) -> None:
+        self.inner.transition_workflow(run_id, new_state, error_message)
+
+    def create_purchase_order_run(self, workflow_run_id: int, po: PurchaseOrder) -> int:
+        return self.inner.create_purchase_order_run(workflow_run_id, po)
+
+    def upsert_purchase_order(self, payload: dict[str, Any]) -> tuple[int, bool]:
+        return self.inner.upsert_purchase_order(payload)
+
+    def insert_alert(self, purchase_order_id: int, po_number: str, reasons: list[str], fields: dict[str, Any]) -> None:
+        self.inner.insert_alert(purchase_order_id, po_number, reasons, fields)
+
+    def reserve_stock(self, po_number: str, line_items: list[dict[str, Any]]) -> tuple[bool, list[str]]:
+        return self.inner.reserve_stock(po_number, line_items)
+
+    def enqueue_purchase_order_runs(
+        self,
+        workflow_run_id: int,
+        pos: list[PurchaseOrder],
+        input_root: Path,
+    ) -> dict[str, int]:
+        return self.inner.enqueue_purchase_order_runs(workflow_run_id, pos, input_root)
+
+    def claim_purchase_order_run(
+        self, workflow_run_id: int, worker: str, lease_seconds: int
+    ) -> dict[str, Any] | None:
+        return self.inner.claim_purchase_order_run(workflow_run_id, worker, lease_seconds)
+
+    def heartbeat_purchase_order_runs(self, worker: str, lease_seconds: int) -> int:
+        return self.inner.heartbeat_purchase_order_runs(worker, lease_seconds)
+
+    def apply_leased_purchase_order_run_updates(self, worker: str, updates: list[dict[str, Any]]) -> list[int]:
+        return self.inner.apply_leased_purchase_order_run_updates(worker, updates)
+
+    def recover_expired_purchase_order_runs(self, workflow_run_id: int) -> int:
+        return self.inner.recover_expired_purchase_order_runs(workflow_run_id)
+
+    def finish_queued_workflow_run(self, workflow_run_id: int) -> tuple[str, list[dict[str, Any]]] | None:
+        return self.inner.finish_queued_workflow_run(workflow_run_id)
+
+    def workflow_run_state(self, workflow_run_id: int) -> str | None:
+        return self.inner.workflow_run_state(workflow_run_id)
+
+
+class QueueWorker:
+    """Claim and run the tasks of one queued workflow run until it is finished.
+
+    Any number of workers, on any number of hosts, can serve the same run:
+    ``claim_purchase_order_run`` hands each runnable task (PENDING, upstream
+    tasks released) to exactly one of them under a lease. A heartbeat thread
+    extends this worker's leases every ``lease_seconds / 3``; a worker that
+    stops heartbeating loses its RUNNING tasks to whichever worker next finds
+    nothing to claim and runs lease-expiry recovery.
+
+    When nothing is left to claim, idle threads try to close the run. The one
+    that succeeds calls ``on_finish(final_state, blocked_tasks)``; every
+    worker stops once the run has left RUNNING. An exception in ``execute``
+    stops this worker (its leases then expire and the task is re-run
+    elsewhere) and is re-raised from ``run``.
+    """
+
+    def __init__(
+        self,
+        db: DatabaseConnectorBase,
+        workflow_run_id: int,
+        worker_id: str | None = None,
+        lease_seconds: int = 60,
+        poll_interval: float = 2.0,
+        threads: int = 1,
+    ) -> None:
+        self.db = db
+        self.workflow_run_id = workflow_run_id
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = max(3, lease_seconds)
+        self.poll_interval = max(0.1, poll_interval)
+        self.threads = max(1, threads)
+        self.claimed = 0
+        self.final_state: str | None = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._error: BaseException | None = None
+
+    def run(
+        self,
+        execute: Callable[[dict[str, Any]], str],
+        on_finish: Callable[[str, list[dict[str, Any]]], None],
+    ) -> str | None:
+        """Serve the run; return its final state (None if it was stopped while still RUNNING)."""
+        heartbeat = threading.Thread(target=self._heartbeat, name="queue-heartbeat", daemon=True)
+        heartbeat.start()
+        loops = [
+            threading.Thread(target=self._guarded_loop, args=(execute, on_finish), name=f"queue-worker-{idx}")
+            for idx in range(1, self.threads)
+        ]
+        for thread in loops:
+            thread.start()
+        try:
+            self._guarded_loop(execute, on_finish)
+        except KeyboardInterrupt:
+            self._stop.set()
+            raise
+        finally:
+            for thread in loops:
+                thread.join()
+            self._stop.set()
+            heartbeat.join()
+        if self._error is not None:
+            raise self._error
+        if self.final_state is None:
+            self.final_state = self.db.workflow_run_state(self.workflow_run_id)
+        return self.final_state
+
+    def _guarded_loop(
+        self,
+        execute: Callable[[dict[str, Any]], str],
+        on_finish: Callable[[str, list[dict[str, Any]]], None],
+    ) -> None:
+        try:
+            self._loop(execute, on_finish)
+        except Exception as exc:  # noqa: BLE001
+            with self._lock:
+                if self._error is None:
+                    self._error = exc
+            self._stop.set()
+
+    def _loop(
+        self,
+        execute: Callable[[dict[str, Any]], str],
+        on_finish: Callable[[str, list[dict[str, Any]]], None],
+    ) -> None:
+        while not self._stop.is_set():
+            claim = self.db.claim_purchase_order_run(self.workflow_run_id, self.worker_id, self.lease_seconds)
+            if claim is not None:
+                with self._lock:
+                    self.claimed += 1
+                execute(claim)
+                continue
+
+            state = self.db.workflow_run_state(self.workflow_run_id)
+            if state != "RUNNING":
+                with self._lock:
+                    self.final_state = self.final_state or state
+                self._stop.set()
+                return
+            if self.db.recover_expired_purchase_order_runs(self.workflow_run_id):
+                continue
+            finished = self.db.finish_queued_workflow_run(self.workflow_run_id)
+            if finished is not None:
+                final_state, blocked = finished
+                with self._lock:
+                    self.final_state = final_state
+                on_finish(final_state, blocked)
+                self._stop.set()
+                return
+            # Other workers still hold the remaining tasks (or their upstreams).
+            self._stop.wait(self.poll_interval)
+
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                self.db.heartbeat_purchase_order_runs(self.worker_id, self.lease_seconds)
+            except Exception as exc:  # noqa: BLE001
+                # A missed beat only matters if the lease runs out before the next one.
+                print(f"WARNING: lease heartbeat failed for {self.worker_id}: {exc}")
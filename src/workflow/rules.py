@@ -0,0 +1,417 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+DEFAULT_RULES_PATH = Path(__file__).with_name("attention_rules.json")
+RULES_VERSION = 1
+
+ISO_DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}", re.ASCII)
+
+Predicate = Callable[[dict[str, Any], dict[str, Any]], bool]
+ValueFn = Callable[[dict[str, Any], dict[str, Any]], Any]
+DateFn = Callable[[dict[str, Any], dict[str, Any]], int | None]
+
+
+class RuleSetError(ValueError):
+    """An attention rule file that cannot be compiled."""
+
+
+def to_number(value: Any) -> float | None:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    if not text:
+        return None
+    normalized = text.replace("$", "").replace(",", "")
+    try:
+        return float(normalized)
+    except ValueError:
+        return None
+
+
+def parse_iso_date(value: Any) -> date | None:
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        return datetime.strptime(text, "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def _date_ordinal(text: str) -> int | None:
+    # Canonical YYYY-MM-DD skips strptime; anything else keeps its exact semantics.
+    stripped = text.strip()
+    if ISO_DATE_PATTERN.fullmatch(stripped):
+        try:
+            return date(int(stripped[:4]), int(stripped[5:7]), int(stripped[8:])).toordinal()
+        except ValueError:
+            return None
+    parsed = parse_iso_date(stripped)
+    return parsed.toordinal() if parsed is not None else None
+
+
+def date_ordinal(value: Any) -> int | None:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return _date_ordinal(value)
+    parsed = parse_iso_date(value)
+    return parsed.toordinal() if parsed is not None else None
+
+
+def _field_getter(path: Any, where: str) -> ValueFn:
+    if not isinstance(path, str) or not path:
+        raise RuleSetError(f"{where}: 'field' must be a dotted path string")
+    keys = tuple(path.split("."))
+
+    def get(payload: dict[str, Any], _params: dict[str, Any]) -> Any:
+        value: Any = payload
+        for key in keys:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value
+
+    return get
+
+
+def _compile_value(spec: Any, where: str) -> tuple[ValueFn, dict[str, Any]]:
+    """Compile a literal, ``{"env": ...}`` or ``{"param": ...}`` operand.
+
+    Environment values are read once, here; the returned dict records them
+    for the rule-set fingerprint.
+    """
+    if isinstance(spec, dict) and "env" in spec:
+        raw = os.getenv(spec["env"])
+        value = spec.get("default") if raw is None else raw
+        return (lambda _payload, _params: value), {spec["env"]: value}
+    if isinstance(spec, dict) and "param" in spec:
+        name, default = spec["param"], spec.get("default")
+        return (lambda _payload, params: params.get(name, default)), {}
+    if isinstance(spec, dict):
+        raise RuleSetError(f"{where}: value objects need 'env' or 'param'")
+    return (lambda _payload, _params: spec), {}
+
+
+def _compile_date_operand(spec: Any, where: str) -> tuple[DateFn, dict[str, Any]]:
+    if isinstance(spec, dict) and "field" in spec:
+        get = _field_getter(spec["field"], where)
+        days, env = _compile_value(spec.get("plus_days", 0), where)
+
+        def shifted(payload: dict[str, Any], params: dict[str, Any]) -> int | None:
+            ordinal = date_ordinal(get(payload, params))
+            if ordinal is None:
+                return None
+            return ordinal + int(days(payload, params))
+
+        return shifted, env
+    value, env = _compile_value(spec, where)
+    return (lambda payload, params: date_ordinal(value(payload, params))), env
+
+
+_NUMERIC_OPS: dict[str, Callable[[float, float], bool]] = {
+    "gt": lambda left, right: left > right,
+    "gte": lambda left, right: left >= right,
+    "lt": lambda left, right: left < right,
+    "lte": lambda left, right: left <= right,
+}
+_DATE_OPS = {f"date_{name}": compare for name, compare in _NUMERIC_OPS.items()}
+_DATE_OPS["date_eq"] = lambda left, right: left == right
+
+
+def _compile_predicate(spec: Any, where: str, env: dict[str, Any]) -> Predicate:
+    if not isinstance(spec, dict):
+        raise RuleSetError(f"{where}: a condition must be an object")
+    if "all" in spec or "any" in spec:
+        combinator = "all" if "all" in spec else "any"
+        parts = [
+            _compile_predicate(part, f"{where}.{combinator}[{idx}]", env)
+            for idx, part in enumerate(spec[combinator])
+        ]
+        if combinator == "all":
+            return lambda payload, params: all(part(payload, params) for part in parts)
+        return lambda payload, params: any(part(payload, params) for part in parts)
+    if "not" in spec:
+        inner = _compile_predicate(spec["not"], f"{where}.not", env)
+        return lambda payload, params: not inner(payload, params)
+
+    get = _field_getter(spec.get("field"), where)
+    op = spec.get("op")
+    if op == "missing":
+        return lambda payload, params: get(payload, params) in (None, "")
+    if op == "present":
+        return lambda payload, params: get(payload, params) not in (None, "")
+    if "value" not in spec:
+        raise RuleSetError(f"{where}: op '{op}' needs a 'value'")
+
+    if op in _DATE_OPS:
+        compare = _DATE_OPS[op]
+        right_date, value_env = _compile_date_operand(spec["value"], where)
+        env.update(value_env)
+
+        def date_predicate(payload: dict[str, Any], params: dict[str, Any]) -> bool:
+            left = date_ordinal(get(payload, params))
+            if left is None:
+                return False
+            right = right_date(payload, params)
+            return right is not None and compare(left, right)
+
+        return date_predicate
+
+    value, value_env = _compile_value(spec["value"], where)
+    env.update(value_env)
+    if op in _NUMERIC_OPS:
+        compare = _NUMERIC_OPS[op]
+        static = spec["value"]
+        if not (isinstance(static, dict) and "param" in static) and to_number(value({}, {})) is None:
+            raise RuleSetError(f"{where}: op '{op}' needs a numeric value")
+
+        def numeric_predicate(payload: dict[str, Any], params: dict[str, Any]) -> bool:
+            left = to_number(get(payload, params))
+            if left is None:
+                return False
+            right = to_number(value(payload, params))
+            return right is not None and compare(left, right)
+
+        return numeric_predicate
+    if op == "contains":
+        if spec.get("ignore_case"):
+            return lambda payload, params: str(value(payload, params)).lower() in (get(payload, params) or "").lower()
+        return lambda payload, params: str(value(payload, params)) in (get(payload, params) or "")
+    if op == "eq":
+        return lambda payload, params: get(payload, params) == value(payload, params)
+    if op == "ne":
+        return lambda payload, params: get(payload, params) != value(payload, params)
+    if op == "in":
+        return lambda payload, params: get(payload, params) in value(payload, params)
+    raise RuleSetError(f"{where}: unknown op '{op}'")
+
+
+@dataclass(slots=True)
+class AttentionRule:
+    name: str
+    fail: bool
+    priority: int | None
+    # None: the reason is raised outside the rule set (e.g. out_of_stock).
+    predicate: Predicate | None
+    calls: int = 0
+    hits: int = 0
+    nanos: int = 0
+
+
+class RuleSet:
+    """Compiled attention rules: which reasons a payload raises, and what they mean.
+
+    Each rule names a reason, an optional ``when`` condition, and its
+    classification: ``fail`` (the task fails when it is raised) and/or
+    ``priority`` (queue rank; lower runs first). Rules without ``when`` only
+    classify reasons raised elsewhere in the task, such as ``out_of_stock``.
+
+    Per-rule call counts and time are only collected with ``collect_timings``;
+    otherwise evaluation does no clock reads or locking.
+    """
+
+    def __init__(self, config: dict[str, Any], source: str = "<rules>", collect_timings: bool = False) -> None:
+        if not isinstance(config, dict) or config.get("version") != RULES_VERSION:
+            raise RuleSetError(f"{source}: expected an object with \"version\": {RULES_VERSION}")
+        rules_spec = config.get("rules")
+        if not isinstance(rules_spec, list):
+            raise RuleSetError(f"{source}: 'rules' must be a list")
+        self.source = source
+        self.collect_timings = collect_timings
+        self.default_priority = int(config.get("default_priority", 2))
+        self.digest = hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()
+        self._env: dict[str, Any] = {}
+        self.rules: list[AttentionRule] = []
+        seen: set[str] = set()
+        for idx, spec in enumerate(rules_spec):
+            where = f"{source}: rules[{idx}]"
+            name = spec.get("name") if isinstance(spec, dict) else None
+            if not isinstance(name, str) or not name:
+                raise RuleSetError(f"{where}: every rule needs a 'name'")
+            if name in seen:
+                raise RuleSetError(f"{where}: duplicate rule '{name}'")
+            seen.add(name)
+            priority = spec.get("priority")
+            if priority is not None and not isinstance(priority, int):
+                raise RuleSetError(f"{where}: 'priority' must be an integer")
+            predicate = _compile_predicate(spec["when"], f"{where}.when", self._env) if "when" in spec else None
+            self.rules.append(AttentionRule(name, bool(spec.get("fail", False)), priority, predicate))
+
+        self._evaluated = [rule for rule in self.rules if rule.predicate is not None]
+        # Planning only needs the best rank, so try priority rules best-first and stop at a hit.
+        self._by_priority = sorted(
+            (rule for rule in self._evaluated if rule.priority is not None), key=lambda rule: rule.priority
+        )
+        self._fail_names = frozenset(rule.name for rule in self.rules if rule.fail)
+        self._priority_of = {rule.name: rule.priority for rule in self.rules if rule.priority is not None}
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: Path, collect_timings: bool = False) -> "RuleSet":
+        try:
+            config = json.loads(path.read_text(encoding="utf-8"))
+        except ValueError as exc:
+            raise RuleSetError(f"{path}: {exc}") from exc
+        return cls(config, source=str(path), collect_timings=collect_timings)
+
+    @property
+    def failure_reasons(self) -> frozenset[str]:
+        return self._fail_names
+
+    def _run(
+        self, rules: list[AttentionRule], payload: dict[str, Any], params: dict[str, Any], first: bool
+    ) -> list[AttentionRule]:
+        if not self.collect_timings:
+            matched: list[AttentionRule] = []
+            for rule in rules:
+                if rule.predicate(payload, params):  # type: ignore[misc]
+                    matched.append(rule)
+                    if first:
+                        break
+            return matched
+
+        clock = time.perf_counter_ns
+        matched = []
+        timings: list[tuple[AttentionRule, bool, int]] = []
+        for rule in rules:
+            started = clock()
+            hit = rule.predicate(payload, params)  # type: ignore[misc]
+            timings.append((rule, hit, clock() - started))
+            if hit:
+                matched.append(rule)
+                if first:
+                    break
+        with self._stats_lock:
+            for rule, hit, elapsed in timings:
+                rule.calls += 1
+                rule.hits += hit
+                rule.nanos += elapsed
+        return matched
+
+    def evaluate(self, payload: dict[str, Any], params: dict[str, Any] | None = None) -> list[str]:
+        """Every reason ``payload`` raises, in rule-file order."""
+        return [rule.name for rule in self._run(self._evaluated, payload, params or {}, first=False)]
+
+    def priority_rank(self, payload: dict[str, Any], params: dict[str, Any] | None = None) -> int:
+        """Same as ``rank_reasons(evaluate(payload))`` without running fail-only rules."""
+        params = params or {}
+        matched = self._run(self._by_priority, payload, params, first=True)
+        if matched and matched[0].priority <= self.default_priority:  # type: ignore[operator]
+            return matched[0].priority  # type: ignore[return-value]
+        # A rank above the default can still be beaten by any other reason.
+        return self.rank_reasons(self.evaluate(payload, params))
+
+    def rank_reasons(self, reasons: list[str]) -> int:
+        if not reasons:
+            return self.default_priority
+        return min(self._priority_of.get(reason, self.default_priority) for reason in reasons)
+
+    def failing(self, reasons: list[str]) -> list[str]:
+        return [reason for reason in reasons if reason in self._fail_names]
+
+    def env_value(self, name: str) -> Any:
+        """The value an ``{"env": name}`` operand resolved to when the rules were compiled."""
+        return self._env.get(name)
+
+    def fingerprint(self, params: dict[str, Any] | None = None) -> str:
+        return json.dumps({"rules": self.digest, "env": self._env, "params": params or {}}, sort_keys=True)
+
+    def timings(self) -> list[dict[str, Any]]:
+        with self._stats_lock:
+            return [
+                {
+                    "rule": rule.name,
+                    "calls": rule.calls,
+                    "hits": rule.hits,
+                    "total_ms": rule.nanos / 1e6,
+                    "avg_us": rule.nanos / rule.calls / 1e3 if rule.calls else 0.0,
+                }
+                for rule in self._evaluated
+            ]
+
+
+class AttentionRules:
+    """Holds the active ``RuleSet`` for a rule file and swaps it when the file changes."""
+
+    def __init__(self, path: Path, collect_timings: bool = False) -> None:
+        self.path = path
+        self.collect_timings = collect_timings
+        self._stamp = self._file_stamp()
+        self._current = RuleSet.from_file(path, collect_timings)
+
+    def _file_stamp(self) -> tuple[int, int] | None:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def current(self) -> RuleSet:
+        return self._current
+
+    def refresh(self) -> bool:
+        """Reload the rule file if it changed; a broken edit keeps the previous rules."""
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        try:
+            self._current = RuleSet.from_file(self.path, self.collect_timings)
+        except (OSError, RuleSetError) as exc:
+            print(f"Attention rules not reloaded, keeping previous rules: {exc}")
+            return False
+        print(f"Attention rules reloaded from {self.path}")
+        return True
+
+
+_active: AttentionRules | None = None
+_active_lock = threading.Lock()
+_default_digest: str | None = None
+
+
+def use_attention_rules(path: str | Path | None = None, collect_timings: bool = False) -> AttentionRules:
+    """Load the rule file (``ATTENTION_RULES_FILE`` or the bundled rules) and make it active."""
+    global _active
+    rules_path = Path(path or os.getenv("ATTENTION_RULES_FILE") or DEFAULT_RULES_PATH)
+    with _active_lock:
+        _active = AttentionRules(rules_path, collect_timings)
+        return _active
+
+
+def attention_rules() -> AttentionRules:
+    if _active is None:
+        return use_attention_rules()
+    return _active
+
+
+def is_default_rule_set(rule_set: RuleSet) -> bool:
+    global _default_digest
+    if _default_digest is None:
+        _default_digest = RuleSet.from_file(DEFAULT_RULES_PATH).digest
+    return rule_set.digest == _default_digest
+
+
+def format_rule_timings(rule_set: RuleSet) -> list[str]:
+    lines = [f"Attention rule timings ({rule_set.source}):"]
+    for row in rule_set.timings():
+        lines.append(
+            f"  {row['rule']}: calls={row['calls']} hits={row['hits']} "
+            f"total={row['total_ms']:.3f}ms avg={row['avg_us']:.2f}us"
+        )
+    return lines
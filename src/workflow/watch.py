@@ -0,0 +1,145 @@
+import json
+import os
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+try:
+    from inotify_simple import INotify, flags  # type: ignore
+except ImportError:
+    INotify = None
+    flags = None
+
+INPUT_SUFFIXES = {".txt", ".pdf"}
+
+
+def _signature(stat: os.stat_result) -> tuple[int, int]:
+    return stat.st_size, stat.st_mtime_ns
+
+
+class ProcessedCheckpoint:
+    """Append-only record of inbox files that reached a terminal task state.
+
+    One JSON line per processed file (name, size, mtime_ns, state); the last
+    line for a name wins. A file is processed again only if it changed since.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._processed: dict[str, tuple[int, int]] = {}
+        if path.exists():
+            for line in path.read_text(encoding="utf-8").splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-append can leave a torn last line.
+                    continue
+                self._processed[entry["name"]] = (int(entry["size"]), int(entry["mtime_ns"]))
+
+    def __len__(self) -> int:
+        return len(self._processed)
+
+    def is_processed(self, path: Path, stat: os.stat_result) -> bool:
+        return self._processed.get(path.name) == _signature(stat)
+
+    def mark(self, path: Path, stat: os.stat_result, state: str) -> None:
+        size, mtime_ns = _signature(stat)
+        self._processed[path.name] = (size, mtime_ns)
+        entry = {"name": path.name, "size": size, "mtime_ns": mtime_ns, "state": state}
+        with self.path.open("a", encoding="utf-8") as handle:
+            handle.write(json.dumps(entry) + "\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+
+
+class InboxWatcher:
+    """Yield batches of new, fully written PO files that land in ``inbox_dir``.
+
+    Uses inotify (``inotify_simple``) when installed, reacting to files that
+    are closed after writing or moved in; otherwise polls every
+    ``poll_interval`` seconds and only reports a file once its size and mtime
+    are unchanged across two scans. Files already in the checkpoint with the
+    same size/mtime are skipped, so a restart does not redo the backlog.
+    """
+
+    def __init__(self, inbox_dir: Path, checkpoint: ProcessedCheckpoint, poll_interval: float = 2.0) -> None:
+        self.inbox_dir = inbox_dir
+        self.checkpoint = checkpoint
+        self.poll_interval = poll_interval
+        self.mode = "inotify" if INotify is not None else "polling"
+        self._last_seen: dict[str, tuple[int, int]] = {}
+        self._queued: set[str] = set()
+
+    def _candidates(self) -> list[Path]:
+        return sorted(
+            path
+            for path in self.inbox_dir.iterdir()
+            if path.suffix.lower() in INPUT_SUFFIXES and not path.name.startswith(".") and path.is_file()
+        )
+
+    def _take(self, paths: list[Path], require_stable: bool) -> list[Path]:
+        ready: list[Path] = []
+        for path in paths:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                self._last_seen.pop(path.name, None)
+                continue
+            signature = _signature(stat)
+            if self.checkpoint.is_processed(path, stat) or path.name in self._queued:
+                continue
+            previous = self._last_seen.get(path.name)
+            self._last_seen[path.name] = signature
+            if require_stable and previous != signature:
+                continue
+            ready.append(path)
+        return ready
+
+    def mark_done(self, path: Path, state: str) -> None:
+        self._queued.discard(path.name)
+        self._last_seen.pop(path.name, None)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return
+        self.checkpoint.mark(path, stat, state)
+
+    def _queue(self, paths: list[Path]) -> list[Path]:
+        self._queued.update(path.name for path in paths)
+        return paths
+
+    def batches(self) -> Iterator[list[Path]]:
+        # Watch before scanning the backlog: a file that lands while the backlog
+        # is processed is then reported by inotify instead of being missed.
+        inotify = None
+        if INotify is not None:
+            inotify = INotify()
+            inotify.add_watch(str(self.inbox_dir), flags.CLOSE_WRITE | flags.MOVED_TO)  # type: ignore[union-attr]
+        try:
+            # Backlog that arrived while the watcher was down is already complete.
+            backlog = self._take(self._candidates(), require_stable=False)
+            if backlog:
+                yield self._queue(backlog)
+
+            while inotify is not None:
+                events = inotify.read(timeout=int(self.poll_interval * 1000))
+                names = sorted({event.name for event in events if event.name})
+                paths = [
+                    self.inbox_dir / name
+                    for name in names
+                    if Path(name).suffix.lower() in INPUT_SUFFIXES and not name.startswith(".")
+                ]
+                ready = self._take(paths, require_stable=False)
+                if ready:
+                    yield self._queue(ready)
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+        while True:
+            time.sleep(self.poll_interval)
+            ready = self._take(self._candidates(), require_stable=True)
+            if ready:
+                yield self._queue(ready)
@@ -0,0 +1,34 @@
+import os
+import uuid
+from pathlib import Path
+
+import pytest
+
+DB_INIT_DIR = Path(__file__).resolve().parents[1] / "db" / "init"
+
+
+@pytest.fixture
+def postgres_dsn():
+    """DSN of a scratch database with db/init applied, created under POSTGRES_DSN and dropped afterwards.
+
+    Tests that use it are skipped unless POSTGRES_DSN points at a server whose
+    user may create databases (the docker compose ``harmony`` user can).
+    """
+    admin_dsn = os.getenv("POSTGRES_DSN")
+    if not admin_dsn:
+        pytest.skip("POSTGRES_DSN is not set")
+    psycopg = pytest.importorskip("psycopg")
+    from psycopg.conninfo import make_conninfo
+
+    name = f"harmony_test_{uuid.uuid4().hex[:12]}"
+    with psycopg.connect(admin_dsn, autocommit=True) as conn:
+        conn.execute(f'CREATE DATABASE "{name}"')
+    dsn = make_conninfo(admin_dsn, dbname=name)
+    try:
+        with psycopg.connect(dsn, autocommit=True) as conn:
+            for path in sorted(DB_INIT_DIR.glob("*.sql")):
+                conn.execute(path.read_text(encoding="utf-8"))
+        yield dsn
+    finally:
+        with psycopg.connect(admin_dsn, autocommit=True) as conn:
+            conn.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from workflow.documents import DocumentCache, load_document  # noqa: E402
+
+SUITE_INPUTS = sorted((Path(__file__).resolve().parent / "attention_suite" / "input").glob("*.txt"))
+
+
+def test_bound_counts_parsed_payloads_not_source_bytes():
+    document = load_document(SUITE_INPUTS[0])
+    assert document.payload_bytes > document.size
+
+    cache = DocumentCache(max_bytes=10 * document.payload_bytes)
+    cache.get(SUITE_INPUTS[0])
+    assert len(cache) == 1
+    assert cache._total_bytes == document.payload_bytes
+
+
+def test_run_larger_than_cache_keeps_hints_and_parses_once_more_at_execution():
+    sizes = [load_document(path).payload_bytes for path in SUITE_INPUTS]
+    cache = DocumentCache(max_bytes=sizes[0] + sizes[1])
+
+    # Discovery: every file is parsed, only what fits keeps its payload.
+    discovered = {path: cache.get(path) for path in SUITE_INPUTS}
+    assert len(cache) == 2
+    assert cache.misses == len(SUITE_INPUTS)
+
+    # Planning hints come back without another parse.
+    for path, document in discovered.items():
+        hint = cache.hint(path)
+        assert (hint.digest, hint.order_date_hint) == (document.digest, document.order_date_hint)
+    assert cache.misses == len(SUITE_INPUTS)
+
+    # Execution (a retry reads each file twice): the payloads kept by discovery are hits,
+    # every other file is parsed once more, into the room released by finished tasks.
+    for path in SUITE_INPUTS:
+        assert cache.get(path).require_payload() == discovered[path].require_payload()
+        cache.get(path)
+        cache.release(path)
+    assert cache.hits == len(SUITE_INPUTS) + 2
+    assert cache.misses == 2 * len(SUITE_INPUTS) - 2
+    assert len(cache) == 0
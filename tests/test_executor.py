@@ -0,0 +1,100 @@
+import sys
+import threading
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from workflow.executor import DagExecutor  # noqa: E402
+from workflow_fakes import SUITES, MemoryDatabase, copy_suites, run_suites  # noqa: E402
+
+
+def run_all(tmp_path: Path, workers: int) -> tuple[int, MemoryDatabase, dict[str, str]]:
+    tests_root = copy_suites(tmp_path / f"workers_{workers}")
+    rc, db, _ = run_suites(tests_root, workers)
+    summaries = {suite: (tests_root / suite / "response" / "summary.txt").read_text() for suite in SUITES}
+    return rc, db, summaries
+
+
+def runs_by_name(db: MemoryDatabase) -> dict[str, dict[str, Any]]:
+    return {run.pop("name"): run for run in db.runs.values()}
+
+
+@pytest.mark.parametrize("workers", [2, 4, 8])
+def test_workers_match_a_single_worker(tmp_path, workers):
+    rc_serial, serial_db, serial_summaries = run_all(tmp_path, 1)
+    rc, db, summaries = run_all(tmp_path, workers)
+
+    assert rc == rc_serial
+    assert db.workflow_states == serial_db.workflow_states
+    # Per task: the same transitions, retries (attempt numbers) and output, PENDING reasons included.
+    serial_runs = runs_by_name(serial_db)
+    assert runs_by_name(db) == serial_runs
+    assert sorted(db.alerts) == sorted(serial_db.alerts)
+    # Summaries list tasks in planned order whatever order they finished in.
+    assert summaries == serial_summaries
+
+    pending_reasons = {
+        run["output"]["reasons"][0] for run in serial_runs.values() if (run["output"] or {}).get("status") == "PENDING"
+    }
+    assert pending_reasons == {"waiting_on_upstream", "waiting_on_dependency"}
+    assert any(run["attempts"] == [1, 2, 3] for run in serial_runs.values())
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_task_error_fails_the_task_and_keeps_draining(workers):
+    order = ["a", "b", "c", "d"]
+    executor = DagExecutor(order, {"b": ["a"], "c": ["b"]}, workers=workers)
+    ran: list[str] = []
+
+    def run_task(name: str) -> str:
+        ran.append(name)
+        if name == "a":
+            raise RuntimeError("database went away")
+        return "SUCCESS"
+
+    results = executor.run(run_task)
+
+    assert results == {"a": "FAILED", "b": "SUCCESS", "c": "SUCCESS", "d": "SUCCESS"}
+    assert sorted(ran) == order
+    assert list(executor.errors) == ["a"]
+
+
+def test_ready_tasks_are_dispatched_in_priority_order():
+    # Ranks: a < b < c < d < e; d waits on a.
+    order = ["a", "b", "c", "d", "e"]
+    executor = DagExecutor(order, {"d": ["a"]}, workers=2)
+    started: list[str] = []
+    started_event = threading.Condition()
+    release = {name: threading.Event() for name in order}
+
+    def run_task(name: str) -> str:
+        with started_event:
+            started.append(name)
+            started_event.notify_all()
+        assert release[name].wait(5)
+        return "SUCCESS"
+
+    def wait_started(count: int) -> list[str]:
+        with started_event:
+            assert started_event.wait_for(lambda: len(started) >= count, timeout=5)
+            return list(started)
+
+    thread = threading.Thread(target=executor.run, args=(run_task,))
+    thread.start()
+    try:
+        assert sorted(wait_started(2)) == ["a", "b"]
+        # a finishing readies d, which outranks e: the freed slot goes to c, the next to d.
+        release["a"].set()
+        assert wait_started(3)[2] == "c"
+        release["b"].set()
+        assert wait_started(4)[3] == "d"
+        release["c"].set()
+        assert wait_started(5)[4] == "e"
+    finally:
+        for event in release.values():
+            event.set()
+        thread.join(5)
+    assert not thread.is_alive()
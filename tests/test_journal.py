@@ -0,0 +1,192 @@
+import sys
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from run_workflow import _close_workflow_run, _make_task_runner  # noqa: E402
+from workflow.connectors import DatabaseConnectorBase, EmailConnector, PostgresDatabaseConnector  # noqa: E402
+from workflow.journal import JournalFlushError, WriteBehindDatabaseConnector  # noqa: E402
+from workflow.models import PurchaseOrder  # noqa: E402
+
+NO_FLAGS = Path(__file__).resolve().parent / "attention_suite" / "input" / "no_flags.txt"
+
+
+class RecordingDatabase(DatabaseConnectorBase):
+    """Applies journaled updates into ``applied``; rejects any batch holding a ``reject`` match."""
+
+    def __init__(self) -> None:
+        self.applied: list[tuple[int, str, Any]] = []
+        self.reject: set[tuple[int, str]] = set()
+        self.reject_all = False
+        self.workflow_states: list[str] = []
+        self.reservations = 0
+
+    def apply_purchase_order_run_updates(self, updates: list[dict[str, Any]]) -> None:
+        for update in updates:
+            value = update.get("state", update["op"])
+            if self.reject_all or (update["run_id"], value) in self.reject:
+                raise RuntimeError(f"rejected {value} for run {update['run_id']}")
+        self.applied.extend((update["run_id"], update["op"], update.get("state")) for update in updates)
+
+    def create_workflow_run(self) -> int:
+        return 1
+
+    def transition_workflow(self, run_id: int, new_state: str, error_message: str | None = None) -> None:
+        self.workflow_states.append(new_state)
+
+    def create_purchase_order_run(self, workflow_run_id: int, po: PurchaseOrder) -> int:
+        raise NotImplementedError
+
+    def set_purchase_order_request(
+        self, purchase_order_run_id: int, req_payload: dict[str, Any], po_number: str | None = None
+    ) -> None:
+        raise NotImplementedError
+
+    def set_attempts(self, purchase_order_run_id: int, attempts: int) -> None:
+        raise NotImplementedError
+
+    def transition_purchase_order(
+        self, purchase_order_run_id: int, new_state: str, error_message: str | None = None
+    ) -> None:
+        raise NotImplementedError
+
+    def set_output(self, purchase_order_run_id: int, output_payload: dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def upsert_purchase_order(self, payload: dict[str, Any]) -> tuple[int, bool]:
+        return 1, True
+
+    def insert_alert(self, purchase_order_id: int, po_number: str, reasons: list[str], fields: dict[str, Any]) -> None:
+        pass
+
+    def reserve_stock(self, po_number: str, line_items: list[dict[str, Any]]) -> tuple[bool, list[str]]:
+        self.reservations += 1
+        return True, []
+
+
+def states(inner: RecordingDatabase, run_id: int) -> list[str]:
+    return [state for rid, op, state in inner.applied if rid == run_id and op == "transition"]
+
+
+def test_one_runs_rejected_update_fails_only_that_run_and_is_never_dropped():
+    inner = RecordingDatabase()
+    journal = WriteBehindDatabaseConnector(inner, max_batch=100, flush_interval=0)
+    inner.reject.add((2, "RUNNING"))
+    journal.transition_purchase_order(1, "RUNNING")
+    journal.transition_purchase_order(2, "RUNNING")
+    journal.set_attempts(2, 1)
+
+    # Run 2's bad update does not fail run 1's terminal flush.
+    journal.transition_purchase_order(1, "SUCCESS")
+    assert states(inner, 1) == ["RUNNING", "SUCCESS"]
+    assert states(inner, 2) == []
+
+    # Run 2's own terminal transition reports it, and so does every flush until it is written.
+    with pytest.raises(JournalFlushError) as raised:
+        journal.transition_purchase_order(2, "FAILED", "boom")
+    assert raised.value.run_ids == {2}
+    with pytest.raises(JournalFlushError):
+        journal.flush()
+
+    inner.reject.clear()
+    journal.close()
+    assert [(op, state) for rid, op, state in inner.applied if rid == 2] == [
+        ("transition", "RUNNING"),
+        ("attempts", None),
+        ("transition", "FAILED"),
+    ]
+
+
+def test_database_outage_keeps_every_update_in_order():
+    inner = RecordingDatabase()
+    journal = WriteBehindDatabaseConnector(inner, max_batch=100, flush_interval=0)
+    inner.reject_all = True
+    journal.transition_purchase_order(1, "RUNNING")
+    journal.transition_purchase_order(2, "RUNNING")
+    with pytest.raises(JournalFlushError) as raised:
+        journal.transition_purchase_order(1, "SUCCESS")
+    assert raised.value.run_ids == {1, 2}
+
+    inner.reject_all = False
+    journal.transition_purchase_order(2, "SUCCESS")
+    assert states(inner, 1) == ["RUNNING", "SUCCESS"]
+    assert states(inner, 2) == ["RUNNING", "SUCCESS"]
+    journal.close()
+
+
+def test_failed_final_write_is_not_retried_and_fails_the_workflow(tmp_path):
+    inner = RecordingDatabase()
+    journal = WriteBehindDatabaseConnector(inner, max_batch=100, flush_interval=0)
+    inner.reject.add((7, "SUCCESS"))
+    input_path = tmp_path / "input" / "no_flags.txt"
+    input_path.parent.mkdir()
+    input_path.write_bytes(NO_FLAGS.read_bytes())
+    tasks = {"suite/no_flags": PurchaseOrder(name="suite/no_flags", txt_path=input_path)}
+    completed: dict[str, str] = {}
+    run_task = _make_task_runner(
+        journal,
+        EmailConnector(),
+        tasks,
+        {"suite/no_flags": 7},
+        completed,
+        lambda *args, **kwargs: None,
+        max_retries=2,
+        simulate_latency_seconds=0.0,
+        single_input_mode=False,
+    )
+
+    assert run_task("suite/no_flags") == "FAILED"
+    # Stock was reserved and the PO stored once; the attempt was not repeated.
+    assert inner.reservations == 1
+    # The SUCCESS transition stays journaled; no FAILED transition was queued behind it.
+    assert _close_workflow_run(journal, 1, completed, []) == 1
+    assert inner.workflow_states == ["FAILED"]
+    inner.reject.clear()
+    journal.close()
+    assert states(inner, 7) == ["RUNNING", "SUCCESS"]
+
+
+def test_batches_write_the_same_history_as_direct_calls(postgres_dsn):
+    direct = PostgresDatabaseConnector(postgres_dsn)
+    journal = WriteBehindDatabaseConnector(PostgresDatabaseConnector(postgres_dsn), max_batch=100, flush_interval=0)
+    try:
+        histories = []
+        for db in (direct, journal):
+            workflow_run_id = db.create_workflow_run()
+            pos = [PurchaseOrder(name=f"suite/task_{idx}", txt_path=NO_FLAGS) for idx in range(3)]
+            run_ids = list(db.create_purchase_order_runs(workflow_run_id, pos).values())
+            good, bad, failed = run_ids
+            for run_id in run_ids:
+                db.transition_purchase_order(run_id, "RUNNING")
+                db.set_attempts(run_id, 1)
+            db.set_output(good, {"reasons": []})
+            db.transition_purchase_order(good, "SUCCESS")
+            db.transition_purchase_order(failed, "FAILED", "missing_fields")
+            # RUNNING -> RUNNING is rejected by the state machine.
+            with pytest.raises(Exception):
+                db.transition_purchase_order(bad, "RUNNING")
+                db.transition_purchase_order(bad, "SUCCESS")
+            histories.append(_history(postgres_dsn, run_ids))
+        assert histories[0] == histories[1]
+        assert histories[0][1] == [(None, "PENDING", None), ("PENDING", "RUNNING", None)]
+    finally:
+        direct.close()
+        with pytest.raises(JournalFlushError):
+            journal.close()
+
+
+def _history(dsn: str, run_ids: list[int]) -> list[list[tuple[str | None, str, str | None]]]:
+    import psycopg
+
+    with psycopg.connect(dsn) as conn:
+        return [
+            conn.execute(
+                "SELECT from_state, to_state, error_message FROM purchase_order_run_state_history "
+                "WHERE purchase_order_run_id = %s ORDER BY id;",
+                (run_id,),
+            ).fetchall()
+            for run_id in run_ids
+        ]
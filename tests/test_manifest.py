@@ -0,0 +1,82 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from workflow.rules import DEFAULT_RULES_PATH, use_attention_rules  # noqa: E402
+from workflow_fakes import copy_suites, run_suites  # noqa: E402
+
+SUITE = "scenario_dependency_branching"
+# root_urgent -> parent_exceeds -> child_blocked; root_urgent -> parallel_after_root -> tail_after_parallel
+TASKS = ["root_urgent", "parent_exceeds", "child_blocked", "parallel_after_root", "tail_after_parallel"]
+
+
+@pytest.fixture
+def suite_root(tmp_path):
+    root = copy_suites(tmp_path / "tests", [SUITE])
+    rc, _, manifest = run_suites(root, incremental=True)
+    assert (rc, manifest.hits) == (0, 0)
+    yield root
+    use_attention_rules()
+
+
+def rerun(root: Path) -> set[str]:
+    """Run the suite again; return the tasks that were cache hits."""
+    rc, db, manifest = run_suites(root, incremental=True)
+    assert rc == 0
+    cached = {run["name"].split("/", 1)[1] for run in db.runs.values() if (run["output"] or {}).get("cached")}
+    assert manifest.hits == len(cached)
+    return cached
+
+
+def test_unchanged_rerun_is_all_hits_and_summary_reports_them(suite_root):
+    assert rerun(suite_root) == set(TASKS)
+
+    summary = (suite_root / SUITE / "response" / "summary.txt").read_text()
+    assert "Cache hits: 5/5" in summary
+    assert summary.count("| cached") == 5
+
+
+def test_changed_input_misses_the_task_and_everything_downstream(suite_root):
+    path = suite_root / SUITE / "input" / "parallel_after_root.txt"
+    path.write_text(path.read_text() + "\n")
+
+    assert rerun(suite_root) == {"root_urgent", "parent_exceeds", "child_blocked"}
+    # Recorded again: the next run is all hits.
+    assert rerun(suite_root) == set(TASKS)
+
+
+def test_upstream_fingerprint_change_misses_downstream(suite_root):
+    path = suite_root / SUITE / "input" / "root_urgent.txt"
+    path.write_text(path.read_text().replace("Root should succeed.", "Root should still succeed."))
+
+    assert rerun(suite_root) == set()
+
+
+def test_threshold_from_the_environment_misses_everything(suite_root, monkeypatch):
+    monkeypatch.setenv("ATTENTION_TOTAL_THRESHOLD", "123456")
+    use_attention_rules()
+
+    assert rerun(suite_root) == set()
+
+
+def test_edited_rule_file_misses_everything(suite_root, tmp_path):
+    rules = json.loads(DEFAULT_RULES_PATH.read_text(encoding="utf-8"))
+    rules["default_priority"] += 1
+    rules_path = tmp_path / "rules.json"
+    rules_path.write_text(json.dumps(rules), encoding="utf-8")
+    use_attention_rules(rules_path)
+
+    assert rerun(suite_root) == set()
+    assert rerun(suite_root) == set(TASKS)
+
+
+@pytest.mark.parametrize("folder", ["parsed", "alerts"])
+def test_edited_output_misses_only_that_task(suite_root, folder):
+    (output,) = (suite_root / SUITE / folder).glob("root_urgent.*")
+    output.write_text(output.read_text().replace("{", "{ ", 1))
+
+    assert rerun(suite_root) == set(TASKS) - {"root_urgent"}
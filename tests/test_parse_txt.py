@@ -0,0 +1,224 @@
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import parse_txt  # noqa: E402
+from parse_txt import (  # noqa: E402
+    load_input_text,
+    parse_in_processes,
+    parse_line_item_rows,
+    parse_line_items,
+    parse_pdf,
+    parse_purchase_order_stream,
+    parse_purchase_order_text,
+    resolve_parser_engine,
+)
+
+TESTS_ROOT = Path(__file__).resolve().parent
+SUITE_INPUTS = sorted(TESTS_ROOT.glob("*/input/*.txt"))
+
+
+def reference_parse(text: str) -> dict[str, Any]:
+    """The original multi-pass parser: slice each section at its marker, then parse it."""
+    return parse_purchase_order_text(text, engine="legacy")
+
+
+SAMPLE = """From: buyer@example.com
+Subject: Purchase order
+
+Hello team,
+Please process the order below.
+
+PURCHASE ORDER
+PO Number: PO-1
+Vendor: Example Supply Co.
+Ship To: Example Plant
+100 Main Street
+
+Springfield, IL 62701
+Order Date: 2024-01-01
+Due Date: 2024-02-01
+Payment Terms: Net 30
+
+LINE ITEMS
+Item Description Qty Unit Price Total
+1  Fastener kit, size 4   1,200  $1.25  $1,500.00
+2  Widget 10 pack  3  12.50  37.50
+3  not a line item
+Subtotal: $1,537.50
+Tax (8%): $123.00
+Shipping: $25.00
+TOTAL: $1,685.50
+
+Notes:
+Deliver to dock 4.
+
+Thank you,
+Pat Buyer
+Purchasing Manager
+Example Plant
+(555) 555-0100
+pat@example.com
+"""
+
+
+@pytest.mark.parametrize("path", SUITE_INPUTS, ids=lambda path: f"{path.parent.parent.name}/{path.name}")
+def test_matches_reference_parser_on_suite_inputs(path: Path) -> None:
+    text = load_input_text(path)
+    assert parse_purchase_order_text(text) == reference_parse(text)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        SAMPLE,
+        SAMPLE.replace("Notes:\n", ""),
+        SAMPLE.replace("PURCHASE ORDER\nPO Number", "PO Number"),
+        SAMPLE.replace("LINE ITEMS\n", ""),
+        SAMPLE.replace("\nThank you,", ""),
+        SAMPLE.replace("\n\nHello team", "\nHello team"),
+    ],
+    ids=["complete", "no-notes", "no-po-marker", "no-line-items", "no-signoff", "no-header-break"],
+)
+def test_matches_reference_parser_on_variants(text: str) -> None:
+    assert parse_purchase_order_text(text) == reference_parse(text)
+
+
+def test_out_of_order_marker_is_an_ordinary_line() -> None:
+    text = SAMPLE.replace("Deliver to dock 4.\n", "Deliver to dock 4.\nPURCHASE ORDER\n")
+    parsed = parse_purchase_order_text(text)["purchase_order"]
+    assert parsed["notes"] == ["Deliver to dock 4.", "PURCHASE ORDER"]
+    assert parsed["po_number"] == "PO-1"
+    assert [item["item_no"] for item in parsed["line_items"]] == [1, 2]
+
+
+def test_stream_reports_signoff_once() -> None:
+    calls: list[int] = []
+    parsed = parse_purchase_order_stream(iter(SAMPLE.splitlines()), on_signoff=lambda: calls.append(1))
+    assert calls == [1]
+    assert parsed == parse_purchase_order_text(SAMPLE)
+
+
+
+class FakePdfReader:
+    """Pages of ``SAMPLE`` split after the "Thank you" line, then terms pages that must not be read."""
+
+    extracted: list[int] = []
+
+    def __init__(self, source: object) -> None:
+        body, closing = SAMPLE.split("Thank you,\n")
+        texts = [body + "Thank you,", closing.rstrip("\n"), "Terms and conditions", "More terms"]
+        self.pages = [FakePdfPage(index, text) for index, text in enumerate(texts)]
+
+
+class FakePdfPage:
+    def __init__(self, index: int, text: str) -> None:
+        self.index = index
+        self.text = text
+
+    def extract_text(self) -> str:
+        FakePdfReader.extracted.append(self.index)
+        return self.text
+
+
+def test_pdf_signoff_continuing_on_the_next_page_is_kept(monkeypatch) -> None:
+    monkeypatch.setattr(parse_txt, "PdfReader", FakePdfReader)
+    FakePdfReader.extracted = []
+
+    parsed, pdf = parse_pdf(Path("po.pdf"), engine="single-pass")
+
+    assert FakePdfReader.extracted == [0, 1]
+    assert pdf.pages_read == 2
+    assert parsed == parse_purchase_order_text(SAMPLE)
+    assert parsed["purchase_order"]["contact"]["email"] == "pat@example.com"
+
+@pytest.mark.parametrize(
+    "row",
+    [
+        "1  Widget  3  $12.50  $37.50",
+        "12\tWidget, blue\t1,200\t1,234.56\t$1,481,472.00",
+        "3   5  $1.00  $5.00",
+        "4  Widget  3  $,.50  $1.50",
+        "5  Widget  3  $.50  $1.50",
+        "6  Widget  3  $1.5,0  $1.50",
+        "7  Widget  ,  $1.50  $1.50",
+        "8  Widget  3  $$1.50  $1.50",
+        "9  Widget  3  1.50  1e5.00",
+        "10 Widget +3 $1.50 $4.50",
+        "11\u00a0Widget  3  $1.50  $4.50",
+        "\u0661\u0662  Widget  \u0663  $1.50  $4.50",
+        "13  Widget  3  $1.50",
+        "14",
+    ],
+)
+def test_line_item_rows_match_the_pattern(row: str) -> None:
+    try:
+        expected = parse_line_items([row])
+    except ValueError:
+        with pytest.raises(ValueError):
+            parse_line_item_rows([row])
+        return
+    assert parse_line_item_rows([row]) == expected
+
+
+def test_engine_comes_from_the_environment(monkeypatch) -> None:
+    monkeypatch.delenv("PO_PARSER_ENGINE", raising=False)
+    assert resolve_parser_engine() == "single-pass"
+    monkeypatch.setenv("PO_PARSER_ENGINE", "legacy")
+    assert resolve_parser_engine() == "legacy"
+    assert resolve_parser_engine("single-pass") == "single-pass"
+    assert parse_purchase_order_stream(iter(SAMPLE.splitlines()), on_signoff=pytest.fail) == reference_parse(SAMPLE)
+    monkeypatch.setenv("PO_PARSER_ENGINE", "regex")
+    with pytest.raises(ValueError, match="Unknown parser engine"):
+        parse_purchase_order_text(SAMPLE)
+
+
+def farm_worker(path: Path) -> object:
+    if path.name == "raises":
+        raise ValueError("bad input")
+    if path.name == "unpicklable":
+        return threading.Lock()
+    if path.name == "hangs":
+        time.sleep(60)
+    if path.name == "dies":
+        os._exit(1)
+    return path.name.upper()
+
+
+def farm(names: list[str], timeout: float) -> dict[str, tuple[object, str | None]]:
+    results = {}
+    for path, result, error in parse_in_processes([Path(name) for name in names], 2, farm_worker, timeout=timeout):
+        assert path.name not in results
+        results[path.name] = (result, error)
+    return results
+
+
+def test_farm_reports_errors_per_file_without_a_timeout() -> None:
+    results = farm(["a", "raises", "unpicklable", "b"], timeout=0)
+
+    assert results["a"] == ("A", None)
+    assert results["b"] == ("B", None)
+    assert results["raises"] == (None, "bad input")
+    assert results["unpicklable"][0] is None
+    assert "pickle" in results["unpicklable"][1]
+
+
+def test_farm_survives_timeouts_and_worker_deaths() -> None:
+    started = time.monotonic()
+    results = farm(["a", "hangs", "b", "dies", "c"], timeout=2)
+
+    assert time.monotonic() - started < 30
+    assert results == {
+        "a": ("A", None),
+        "b": ("B", None),
+        "c": ("C", None),
+        "hangs": (None, "parse timed out after 2s"),
+        "dies": (None, "parse worker died"),
+    }
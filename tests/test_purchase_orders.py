@@ -0,0 +1,138 @@
+import copy
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from workflow.alerts import failure_flags, needs_attention  # noqa: E402
+from workflow.connectors import DatabaseConnectorBase, PostgresDatabaseConnector  # noqa: E402
+
+TESTS_ROOT = Path(__file__).resolve().parent
+NO_FLAGS = TESTS_ROOT / "attention_suite" / "parsed" / "no_flags.json"
+
+
+def load_payload() -> dict[str, Any]:
+    payload = json.loads(NO_FLAGS.read_text(encoding="utf-8"))
+    items = payload["purchase_order"]["line_items"]
+    items.append({"item_no": 3, "description": "Pallet Wrap", "qty": 4, "unit_price": 12.5, "total": 50.0})
+    return payload
+
+
+def stored(dsn: str, po_id: int) -> tuple[Any, dict[int, tuple[Any, ...]]]:
+    import psycopg
+
+    with psycopg.connect(dsn) as conn:
+        (updated_at,) = conn.execute("SELECT updated_at FROM purchase_orders WHERE id = %s;", (po_id,)).fetchone()
+        rows = conn.execute(
+            "SELECT item_no, id, description, qty, unit_price, line_total "
+            "FROM purchase_order_line_items WHERE purchase_order_id = %s;",
+            (po_id,),
+        ).fetchall()
+    return updated_at, {row[0]: tuple(row[1:]) for row in rows}
+
+
+@pytest.fixture
+def db(postgres_dsn):
+    connector = PostgresDatabaseConnector(postgres_dsn)
+    yield connector
+    connector.close()
+
+
+def test_identical_payload_writes_nothing(db):
+    payload = load_payload()
+    po_id, changed = db.upsert_purchase_order(payload)
+    assert changed is True
+    before = stored(db.dsn, po_id)
+
+    assert db.upsert_purchase_order(copy.deepcopy(payload)) == (po_id, False)
+    assert stored(db.dsn, po_id) == before
+
+
+def test_line_items_are_merged_by_item_no(db):
+    payload = load_payload()
+    po_id, _ = db.upsert_purchase_order(payload)
+    updated_at, items = stored(db.dsn, po_id)
+
+    edited = copy.deepcopy(payload)
+    line_items = edited["purchase_order"]["line_items"]
+    del line_items[1]
+    line_items[1].update(qty=5, total=62.5)
+    line_items.append({"item_no": 4, "description": "Tape", "qty": 2, "unit_price": 1.25, "total": 2.5})
+    assert db.upsert_purchase_order(edited) == (po_id, True)
+
+    edited_at, edited_items = stored(db.dsn, po_id)
+    assert edited_at > updated_at
+    assert sorted(edited_items) == [1, 3, 4]
+    # Unchanged and changed items keep their rows.
+    assert edited_items[1] == items[1]
+    assert edited_items[3][0] == items[3][0]
+    assert edited_items[3][2:] == (5, items[3][3], 62.5)
+
+    edited["purchase_order"]["line_items"] = []
+    db.upsert_purchase_order(edited)
+    assert stored(db.dsn, po_id)[1] == {}
+
+
+def parsed_payloads() -> list[dict[str, Any]]:
+    payloads = [json.loads(path.read_text(encoding="utf-8")) for path in sorted(TESTS_ROOT.glob("*/parsed/*.json"))]
+    # load_parsed skips payloads with a failure flag; there is nothing to store for them.
+    return [payload for payload in payloads if not failure_flags(needs_attention(payload))]
+
+
+def batches() -> list[list[dict[str, Any]]]:
+    payloads = parsed_payloads()
+    first = payloads[: len(payloads) // 2]
+    # A PO with alerts repeated within one batch: identical, then with a line item removed and one changed.
+    repeated = next(payload for payload in first if needs_attention(payload))
+    edited = copy.deepcopy(repeated)
+    del edited["purchase_order"]["line_items"][0]
+    edited["purchase_order"]["line_items"][0]["qty"] += 1
+    edited["email"]["subject"] += " (revised)"
+    first += [copy.deepcopy(repeated), edited]
+    # The second batch reloads everything: stored POs are updated or left alone, new ones inserted.
+    second = payloads + [copy.deepcopy(payloads[-1])]
+    return [first, second]
+
+
+def snapshot(dsn: str) -> dict[str, list[tuple[Any, ...]]]:
+    import psycopg
+
+    with psycopg.connect(dsn) as conn:
+        orders = conn.execute(
+            "SELECT to_jsonb(po) - 'id' - 'created_at' - 'updated_at' FROM purchase_orders po ORDER BY po_number;"
+        ).fetchall()
+        items = conn.execute(
+            "SELECT po.po_number, li.item_no, li.description, li.qty, li.unit_price, li.line_total "
+            "FROM purchase_order_line_items li JOIN purchase_orders po ON po.id = li.purchase_order_id "
+            "ORDER BY po.po_number, li.item_no;"
+        ).fetchall()
+        # The merge inserts a round's alerts together, so only each PO's own alerts keep the per-row order.
+        alerts = conn.execute(
+            "SELECT a.po_number, a.reasons, a.fields, po.po_number "
+            "FROM po_alerts a JOIN purchase_orders po ON po.id = a.purchase_order_id ORDER BY a.po_number, a.id;"
+        ).fetchall()
+        conn.execute("TRUNCATE purchase_orders, purchase_order_line_items, po_alerts;")
+    return {"purchase_orders": orders, "purchase_order_line_items": items, "po_alerts": alerts}
+
+
+def test_bulk_load_matches_per_row_upserts(db):
+    loads = batches()
+    reasons = [[needs_attention(payload) for payload in payloads] for payloads in loads]
+
+    row_counts = [DatabaseConnectorBase.bulk_upsert_purchase_orders(db, *load) for load in zip(loads, reasons)]
+    per_row = snapshot(db.dsn)
+    bulk_counts = [db.bulk_upsert_purchase_orders(*load) for load in zip(loads, reasons)]
+    bulk = snapshot(db.dsn)
+
+    assert bulk == per_row
+    assert [row_count["alerts"] for row_count in row_counts] == [bulk_count["alerts"] for bulk_count in bulk_counts]
+    # The per-row path cannot tell an insert from an update.
+    assert [(c["unchanged"], c["updated"]) for c in row_counts] == [
+        (c["unchanged"], c["inserted"] + c["updated"]) for c in bulk_counts
+    ]
+    assert bulk_counts[0]["unchanged"] == 1 and bulk_counts[1]["inserted"] > 0 and bulk_counts[1]["unchanged"] > 0
+    assert len(per_row["po_alerts"]) > 0
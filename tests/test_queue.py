@@ -0,0 +1,140 @@
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from workflow_fakes import copy_suites  # noqa: E402
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+# Five tasks in a dependency tree that succeed, and a pair whose upstream fails.
+SUITES = ["scenario_dependency_branching", "scenario_dependency_waiting"]
+LEASE_SECONDS = 3
+
+
+def workspace(tmp_path: Path) -> Path:
+    """A checkout of src/ and db/init/ whose workers write their artifacts under tmp_path."""
+    shutil.copytree(REPO_ROOT / "src", tmp_path / "src", ignore=shutil.ignore_patterns("__pycache__"))
+    shutil.copytree(REPO_ROOT / "db" / "init", tmp_path / "db" / "init")
+    copy_suites(tmp_path / "tests", SUITES)
+    return tmp_path
+
+
+def start(root: Path, dsn: str, *args: str) -> subprocess.Popen:
+    env = {**os.environ, "POSTGRES_DSN": dsn, "PYTHONUNBUFFERED": "1"}
+    return subprocess.Popen(
+        [sys.executable, str(root / "src" / "run_workflow.py"), *args],
+        cwd=root,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+
+
+def worker(root: Path, dsn: str, workflow_run_id: int, latency: float) -> subprocess.Popen:
+    return start(
+        root,
+        dsn,
+        *("--worker", str(workflow_run_id), "--simulate-latency", str(latency)),
+        *("--lease-seconds", str(LEASE_SECONDS), "--poll-interval", "0.2"),
+    )
+
+
+def query(dsn: str, sql: str, *params: Any) -> list[tuple[Any, ...]]:
+    import psycopg
+
+    with psycopg.connect(dsn) as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+def test_workers_share_a_run_and_recover_a_killed_workers_task(postgres_dsn, tmp_path):
+    root = workspace(tmp_path)
+    enqueue = start(root, postgres_dsn, "--enqueue")
+    out, _ = enqueue.communicate(timeout=120)
+    assert enqueue.returncode == 0, out
+    workflow_run_id = int(re.search(r"Workflow run (\d+) created", out).group(1))
+
+    # The first worker stalls on its first task after moving it to RUNNING, and is killed there.
+    doomed = worker(root, postgres_dsn, workflow_run_id, latency=600)
+    doomed_id = None
+    deadline = time.monotonic() + 60
+    while doomed_id is None and time.monotonic() < deadline:
+        rows = query(
+            postgres_dsn,
+            "SELECT id, test_name, lease_owner FROM purchase_order_runs "
+            "WHERE workflow_run_id = %s AND state = 'RUNNING';",
+            workflow_run_id,
+        )
+        if rows:
+            ((stalled_run_id, stalled_task, doomed_id),) = rows
+        else:
+            time.sleep(0.1)
+    doomed.kill()
+    doomed.communicate()
+    assert doomed_id is not None and doomed_id.endswith(f":{doomed.pid}")
+
+    # Slow enough that the two released branches of the tree go to different workers.
+    workers = [worker(root, postgres_dsn, workflow_run_id, latency=0.5) for _ in range(2)]
+    outputs = [proc.communicate(timeout=180)[0] for proc in workers]
+    assert [proc.returncode for proc in workers] == [1, 1], outputs
+
+    runs = {
+        name: (run_id, state, lease_owner, dependencies)
+        for run_id, name, state, lease_owner, dependencies in query(
+            postgres_dsn,
+            "SELECT id, test_name, state, lease_owner, dependencies FROM purchase_order_runs "
+            "WHERE workflow_run_id = %s;",
+            workflow_run_id,
+        )
+    }
+    history: dict[int, list[tuple[Any, ...]]] = {}
+    for run_id, from_state, to_state, changed_at, error_message in query(
+        postgres_dsn,
+        "SELECT h.purchase_order_run_id, h.from_state, h.to_state, h.changed_at, h.error_message "
+        "FROM purchase_order_run_state_history h JOIN purchase_order_runs r ON r.id = h.purchase_order_run_id "
+        "WHERE r.workflow_run_id = %s ORDER BY h.id;",
+        workflow_run_id,
+    ):
+        history.setdefault(run_id, []).append((from_state, to_state, changed_at, error_message))
+
+    # Same outcome as a classic run of the same plan.
+    classic = start(root, postgres_dsn)
+    out, _ = classic.communicate(timeout=180)
+    classic_run_id = int(re.search(r"Workflow run (\d+) created", out).group(1))
+    run_states = "SELECT test_name, state FROM purchase_order_runs WHERE workflow_run_id = %s;"
+    states = {name: state for name, (_, state, _, _) in runs.items()}
+    assert states == dict(query(postgres_dsn, run_states, classic_run_id))
+    assert {"SUCCESS", "FAILED", "PENDING"} <= set(states.values())
+    workflow_state = "SELECT state FROM workflow_runs WHERE id = %s;"
+    assert query(postgres_dsn, workflow_state, workflow_run_id) == query(postgres_dsn, workflow_state, classic_run_id)
+    assert all(lease_owner is None for _, _, lease_owner, _ in runs.values())
+
+    # Each task ran once; the killed worker's task was handed back once and run again.
+    started = {name: [h for h in history[run_id] if h[1] == "RUNNING"] for name, (run_id, *_) in runs.items()}
+    expected_starts = {name: 0 if state == "PENDING" else 1 for name, state in states.items()}
+    expected_starts[stalled_task] = 2
+    assert {name: len(starts) for name, starts in started.items()} == expected_starts
+    recovered = [h for h in history[stalled_run_id] if h[0] == "RUNNING" and h[1] == "PENDING"]
+    assert [h[3] for h in recovered] == [f"lease_expired: {doomed_id}"]
+    claims = [int(re.search(r"Tasks claimed by this worker: (\d+)", out).group(1)) for out in outputs]
+    assert sum(claims) == sum(expected_starts.values()) - 1
+    assert min(claims) > 0
+
+    # A downstream task only started after every upstream task reached SUCCESS.
+    finished = {
+        name: next(h[2] for h in history[run_id] if h[1] == "SUCCESS")
+        for name, (run_id, state, _, _) in runs.items()
+        if state == "SUCCESS"
+    }
+    for name, (_, state, _, dependencies) in runs.items():
+        for upstream in dependencies:
+            if state == "PENDING":
+                assert states[upstream] != "SUCCESS"
+            else:
+                assert started[name][-1][2] >= finished[upstream]
@@ -0,0 +1,173 @@
+import itertools
+import json
+import os
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from workflow.alerts import (  # noqa: E402
+    AttentionBatch,
+    failure_flags,
+    needs_attention,
+    needs_attention_batch,
+    priority_rank,
+)
+from workflow.rules import DEFAULT_RULES_PATH, AttentionRules, use_attention_rules  # noqa: E402
+
+
+# The hard-coded checks the rule file replaced, kept as the reference.
+def _old_to_number(value: Any) -> float | None:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    if not text:
+        return None
+    normalized = text.replace("$", "").replace(",", "")
+    try:
+        return float(normalized)
+    except ValueError:
+        return None
+
+
+def _old_parse_iso_date(value: Any) -> date | None:
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        return datetime.strptime(text, "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def old_needs_attention(payload: dict[str, Any], due_within_days: int = 7) -> list[str]:
+    reasons: list[str] = []
+    po = payload.get("purchase_order", {})
+    email = payload.get("email", {})
+    totals = po.get("totals", {})
+    threshold = float(os.getenv("ATTENTION_TOTAL_THRESHOLD", "15000"))
+
+    due = _old_parse_iso_date(po.get("due_date"))
+    order_date = _old_parse_iso_date(po.get("order_date"))
+    if due is not None and order_date is not None and due <= (order_date + timedelta(days=due_within_days)):
+        reasons.append("due_soon")
+
+    subject = (email.get("subject") or "").lower()
+    if "urgent" in subject:
+        reasons.append("urgent")
+
+    required = [po.get("po_number"), po.get("vendor"), po.get("order_date"), po.get("due_date"), totals.get("total")]
+    if any(value in (None, "") for value in required):
+        reasons.append("missing_fields")
+
+    total_value = _old_to_number(totals.get("total"))
+    if total_value is not None and total_value > threshold:
+        reasons.append("amount_exceeds_threshold")
+    return reasons
+
+
+def old_failure_flags(reasons: list[str]) -> list[str]:
+    fail_set = {"missing_fields", "out_of_stock"}
+    return [reason for reason in reasons if reason in fail_set]
+
+
+def old_priority_rank(reasons: list[str]) -> int:
+    rank_map = {"urgent": 0, "due_soon": 1}
+    if not reasons:
+        return 2
+    return min(rank_map.get(reason, 2) for reason in reasons)
+
+
+ORDER_DATE = date(2024, 2, 26)
+# Days from the order date to the due date, around the 0 and 7 day windows.
+DUE_OFFSETS = [-1, 0, 1, 6, 7, 8]
+BAD_DATES = [None, "", "2024-02-30", "2024/03/01", " 2024-03-01 ", "2024-3-1"]
+SUBJECTS = [None, "", "Purchase order", "URGENT: Purchase order", "re: Urgently needed"]
+TOTALS = [None, "", 0, 15000, 15000.01, "15,000.00", "$15,000.01", "1e3", "n/a", 99.5]
+
+
+def payloads() -> list[dict[str, Any]]:
+    dates = [(ORDER_DATE.isoformat(), (ORDER_DATE + timedelta(days=days)).isoformat()) for days in DUE_OFFSETS]
+    dates += [(ORDER_DATE.isoformat(), bad) for bad in BAD_DATES] + [(bad, "2024-03-01") for bad in BAD_DATES]
+    rows = []
+    for (order_date, due_date), subject, total, po_number in itertools.product(
+        dates, SUBJECTS, TOTALS, ["PO-1", None, ""]
+    ):
+        rows.append(
+            {
+                "email": {"subject": subject},
+                "purchase_order": {
+                    "po_number": po_number,
+                    "vendor": "Example Supply Co.",
+                    "order_date": order_date,
+                    "due_date": due_date,
+                    "totals": {"total": total},
+                },
+            }
+        )
+    return rows
+
+
+@pytest.fixture
+def default_rules(monkeypatch):
+    monkeypatch.delenv("ATTENTION_RULES_FILE", raising=False)
+    monkeypatch.delenv("ATTENTION_TOTAL_THRESHOLD", raising=False)
+    yield monkeypatch
+    monkeypatch.undo()
+    use_attention_rules()
+
+
+@pytest.mark.parametrize("threshold", [None, "0", "100", "15000.005", "1e3"])
+@pytest.mark.parametrize("due_within_days", [0, 7])
+def test_rule_file_matches_the_hard_coded_checks(default_rules, threshold, due_within_days):
+    if threshold is not None:
+        default_rules.setenv("ATTENTION_TOTAL_THRESHOLD", threshold)
+    # env operands are read when the rules are compiled.
+    rule_set = use_attention_rules().current()
+    rows = payloads()
+
+    expected = [old_needs_attention(payload, due_within_days) for payload in rows]
+    assert [needs_attention(payload, due_within_days) for payload in rows] == expected
+    assert needs_attention_batch(AttentionBatch.from_payloads(rows), due_within_days) == expected
+    for payload, reasons in zip(rows, expected):
+        params = {"due_within_days": due_within_days}
+        assert rule_set.priority_rank(payload, params) == old_priority_rank(reasons)
+        for extra in ([], ["out_of_stock"], ["unknown_reason"]):
+            assert failure_flags(reasons + extra) == old_failure_flags(reasons + extra)
+            assert priority_rank(reasons + extra) == old_priority_rank(reasons + extra)
+
+
+def test_refresh_reloads_an_edited_rule_file(default_rules, tmp_path, capsys):
+    config = json.loads(DEFAULT_RULES_PATH.read_text(encoding="utf-8"))
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(config), encoding="utf-8")
+    rules = AttentionRules(path)
+    original = rules.current()
+    payload = payloads()[0]
+    assert rules.refresh() is False
+
+    config["rules"] = [rule for rule in config["rules"] if rule["name"] != "urgent"]
+    no_vendor = {"field": "purchase_order.vendor", "op": "missing"}
+    config["rules"].append({"name": "no_vendor", "fail": True, "when": no_vendor})
+    path.write_text(json.dumps(config, indent=2), encoding="utf-8")
+    assert rules.refresh() is True
+    reloaded = rules.current()
+    assert reloaded is not original and reloaded.digest != original.digest
+    assert reloaded.failing(["no_vendor", "urgent"]) == ["no_vendor"]
+    assert reloaded.rank_reasons(["urgent"]) == 2
+    assert rules.refresh() is False
+
+    # A broken edit keeps the rules that were loaded last.
+    path.write_text("{ not json", encoding="utf-8")
+    assert rules.refresh() is False
+    assert rules.current() is reloaded
+    assert reloaded.evaluate(payload) == original.evaluate(payload)
+    assert "keeping previous rules" in capsys.readouterr().out
@@ -0,0 +1,45 @@
+import multiprocessing
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from workflow import connectors  # noqa: E402
+from workflow.connectors import PostgresDatabaseConnector  # noqa: E402
+
+PROCESSES = 12
+ROUNDS = 6
+
+
+def _upgrade(dsn: str, barrier) -> str:
+    # Pool processes are reused across rounds: forget that this process already checked.
+    connectors._schema_ready.clear()
+    db = PostgresDatabaseConnector(dsn)
+    try:
+        with db._connect():
+            pass
+        barrier.wait()
+        db._ensure_workflow_schema()
+        db._ensure_purchase_order_schema()
+        db._ensure_stock_schema()
+        return "ok"
+    except Exception as exc:  # noqa: BLE001
+        return f"{type(exc).__name__}: {exc}"
+    finally:
+        db.close()
+
+
+def test_processes_upgrading_at_once_do_not_collide(postgres_dsn):
+    import psycopg
+
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Manager() as manager, ctx.Pool(PROCESSES) as pool:
+        for _ in range(ROUNDS):
+            with psycopg.connect(postgres_dsn, autocommit=True) as conn:
+                conn.execute("UPDATE schema_versions SET version = 1;")
+            barrier = manager.Barrier(PROCESSES, timeout=60)
+            results = pool.starmap(_upgrade, [(postgres_dsn, barrier)] * PROCESSES, chunksize=1)
+            assert results == ["ok"] * PROCESSES
+            with psycopg.connect(postgres_dsn) as conn:
+                versions = dict(conn.execute("SELECT component, version FROM schema_versions;").fetchall())
+            assert min(versions[name] for name in ("workflow", "purchase_orders", "stock")) > 1
@@ -0,0 +1,102 @@
+import shutil
+import sys
+import threading
+import zlib
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from run_workflow import _discover_suite_tasks, _execute_workflow  # noqa: E402
+from workflow.alerts import attention_config_fingerprint  # noqa: E402
+from workflow.connectors import DatabaseConnectorBase, EmailConnector  # noqa: E402
+from workflow.dag import topo_sort  # noqa: E402
+from workflow.documents import DocumentCache  # noqa: E402
+from workflow.manifest import IncrementalManifest  # noqa: E402
+from workflow.models import PurchaseOrder  # noqa: E402
+
+TESTS_ROOT = Path(__file__).resolve().parent
+SUITES = sorted(path.name for path in TESTS_ROOT.iterdir() if (path / "input").is_dir())
+
+
+class MemoryDatabase(DatabaseConnectorBase):
+    """Records every purchase_order_runs write; stock is always available so outcomes do not depend on timing."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.workflow_states: list[str] = ["PENDING"]
+        self.runs: dict[int, dict[str, Any]] = {}
+        self.alerts: list[tuple[str, list[str]]] = []
+
+    def create_workflow_run(self) -> int:
+        return 1
+
+    def transition_workflow(self, run_id: int, new_state: str, error_message: str | None = None) -> None:
+        self.workflow_states.append(new_state)
+
+    def create_purchase_order_run(self, workflow_run_id: int, po: PurchaseOrder) -> int:
+        with self._lock:
+            run_id = len(self.runs) + 1
+            self.runs[run_id] = {"name": po.name, "states": ["PENDING"], "attempts": [], "output": None}
+            return run_id
+
+    def set_purchase_order_request(
+        self, purchase_order_run_id: int, req_payload: dict[str, Any], po_number: str | None = None
+    ) -> None:
+        self.runs[purchase_order_run_id]["po_number"] = po_number
+
+    def set_attempts(self, purchase_order_run_id: int, attempts: int) -> None:
+        self.runs[purchase_order_run_id]["attempts"].append(attempts)
+
+    def transition_purchase_order(
+        self, purchase_order_run_id: int, new_state: str, error_message: str | None = None
+    ) -> None:
+        self.runs[purchase_order_run_id]["states"].append((new_state, error_message))
+
+    def set_output(self, purchase_order_run_id: int, output_payload: dict[str, Any]) -> None:
+        self.runs[purchase_order_run_id]["output"] = output_payload
+
+    def upsert_purchase_order(self, payload: dict[str, Any]) -> tuple[int, bool]:
+        # Ids derived from the PO number, not from upsert order, which depends on timing.
+        po_number = payload["purchase_order"]["po_number"]
+        return zlib.crc32(po_number.encode("utf-8")), True
+
+    def insert_alert(self, purchase_order_id: int, po_number: str, reasons: list[str], fields: dict[str, Any]) -> None:
+        with self._lock:
+            self.alerts.append((po_number, reasons))
+
+    def reserve_stock(self, po_number: str, line_items: list[dict[str, Any]]) -> tuple[bool, list[str]]:
+        return True, []
+
+
+def copy_suites(tests_root: Path, suites: list[str] = SUITES) -> Path:
+    """Copy the inputs and dependency configs of ``suites`` so a run cannot touch the checked-in outputs."""
+    for suite in suites:
+        shutil.copytree(TESTS_ROOT / suite / "input", tests_root / suite / "input")
+        if (TESTS_ROOT / suite / "dependencies.json").exists():
+            shutil.copy(TESTS_ROOT / suite / "dependencies.json", tests_root / suite)
+    return tests_root
+
+
+def run_suites(
+    tests_root: Path, workers: int = 1, incremental: bool = False
+) -> tuple[int, MemoryDatabase, IncrementalManifest | None]:
+    """Plan and run every suite under ``tests_root`` the way run_workflow() does, against a MemoryDatabase."""
+    documents = DocumentCache()
+    tasks = _discover_suite_tasks(tests_root, None, documents, parse_procs=1)
+    order = topo_sort(tasks)
+    manifest = IncrementalManifest(tasks, order, documents, attention_config_fingerprint()) if incremental else None
+    db = MemoryDatabase()
+    rc = _execute_workflow(
+        db,
+        EmailConnector(document_cache=documents),
+        tasks,
+        order,
+        tests_root,
+        single_input_mode=False,
+        max_retries=2,
+        simulate_latency_seconds=0.0,
+        workers=workers,
+        manifest=manifest,
+    )
+    return rc, db, manifest